@@ -1,4 +1,3 @@
-from cacheops import invalidate_obj
 from django.contrib.contenttypes.models import ContentType
 from django.db import transaction
 from django.db.models import Q
@@ -8,7 +7,6 @@ from django.utils import timezone
 
 from .models import Circuit, CircuitTermination
 from nautobot.dcim.models import CablePath
-from nautobot.dcim.signals import create_cablepath
 
 
 def rebuild_paths_circuits(obj):
@@ -24,11 +22,7 @@ def rebuild_paths_circuits(obj):
     )
 
     with transaction.atomic():
-        for cp in cable_paths:
-            invalidate_obj(cp.origin)
-            cp.delete()
-            # Prevent looping back to rebuild_paths during the atomic transaction.
-            create_cablepath(cp.origin, rebuild=False)
+        CablePath.retrace(cable_paths, obj)
 
 
 @receiver((post_save, post_delete), sender=CircuitTermination)
@@ -69,3 +69,35 @@ class TokenPermissions(DjangoObjectPermissions):
             return False
 
         return super().has_object_permission(request, view, obj)
+
+
+class TokenViewPermissions(TokenPermissions):
+    """
+    Permissions handler for actions which only retrieve data, but which accept POST requests (for example, because the
+    request specifies too many objects to fit within a query string). View permission is required for all methods, and
+    a Token need not allow write operations.
+    """
+
+    perms_map = {
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "OPTIONS": [],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+        "POST": ["%(app_label)s.view_%(model_name)s"],
+    }
+
+    def _verify_write_permission(self, request):
+        return True
+
+
+class TokenChangePermissions(TokenPermissions):
+    """
+    Permissions handler for actions which modify existing objects, but which accept POST requests (for example,
+    because they operate on many objects at once). Change permission is required for POST requests.
+    """
+
+    perms_map = {
+        "GET": ["%(app_label)s.view_%(model_name)s"],
+        "OPTIONS": [],
+        "HEAD": ["%(app_label)s.view_%(model_name)s"],
+        "POST": ["%(app_label)s.change_%(model_name)s"],
+    }
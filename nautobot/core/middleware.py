@@ -77,11 +77,10 @@ class ObjectChangeMiddleware(object):
         2. Enqueue any relevant webhooks.
         3. Increment the metric counter for the event type.
 
-    The post_save and post_delete signals are employed to catch object modifications, however changes are recorded a bit
-    differently for each. Objects being saved are cached into thread-local storage for action *after* the response has
-    completed. This ensures that serialization of the object is performed only after any related objects (e.g. tags)
-    have been created. Conversely, deletions are acted upon immediately, so that the serialized representation of the
-    object is recorded before it (and any related objects) are actually deleted from the database.
+    The post_save, m2m_changed, and pre_delete signals are employed to catch object modifications. Each object is
+    serialized as it is modified (for deletions, before it and any related objects are actually deleted from the
+    database), and a single change is retained for each object, so that any later update to it (e.g. the assignment of
+    tags) supersedes an earlier one. The retained changes are saved together *after* the response has completed.
     """
 
     def __init__(self, get_response):
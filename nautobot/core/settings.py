@@ -54,7 +54,11 @@ BANNER_TOP = ""
 # Base directory wherein all created files (jobs, git repositories, file uploads, static files) will be stored)
 NAUTOBOT_ROOT = os.getenv("NAUTOBOT_ROOT", os.path.expanduser("~/.nautobot"))
 
+CHANGELOG_DIFFS_CHECKPOINT_INTERVAL = 10
+CHANGELOG_DIFFS_ENABLED = False
 CHANGELOG_RETENTION = 90
+CHANGELOG_RETENTION_BATCH_DELAY = 0.1
+CHANGELOG_RETENTION_BATCH_SIZE = 1000
 DOCS_ROOT = os.path.join(BASE_DIR, "docs")
 HIDE_RESTRICTED_UI = False
 
@@ -524,3 +528,11 @@ CELERY_ACCEPT_CONTENT = ["nautobot_json"]
 CELERY_RESULT_ACCEPT_CONTENT = ["nautobot_json"]
 CELERY_TASK_SERIALIZER = "nautobot_json"
 CELERY_RESULT_SERIALIZER = "nautobot_json"
+
+# Periodic tasks run by `nautobot-server celery beat`
+CELERY_BEAT_SCHEDULE = {
+    "purge-changelog": {
+        "task": "nautobot.extras.tasks.purge_changelog",
+        "schedule": 60 * 60,
+    },
+}
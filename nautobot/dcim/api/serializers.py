@@ -776,6 +776,16 @@ class DeviceNAPALMSerializer(serializers.Serializer):
     method = serializers.DictField()
 
 
+class DeviceMoveSerializer(serializers.Serializer):
+    """
+    A list of Devices to be moved, along with their child Devices, to a Site and (optionally) a Rack.
+    """
+
+    devices = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    site = NestedSiteSerializer()
+    rack = NestedRackSerializer(required=False, allow_null=True)
+
+
 class ConsoleServerPortSerializer(
     TaggedObjectSerializer,
     CableTerminationSerializer,
@@ -1269,6 +1279,16 @@ class InterfaceConnectionSerializer(ValidatedModelSerializer):
         return None
 
 
+class ConnectedDeviceSerializer(serializers.Serializer):
+    """
+    A peer Interface, identified by the names of its Device and itself, and the Device connected to it (if any).
+    """
+
+    peer_device = serializers.CharField()
+    peer_interface = serializers.CharField()
+    device = DeviceSerializer(read_only=True, allow_null=True)
+
+
 #
 # Virtual chassis
 #
@@ -2,13 +2,17 @@ import socket
 from collections import OrderedDict
 
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
 from django.db.models import F
-from django.http import HttpResponseForbidden, HttpResponse
+from django.http import Http404, HttpResponseForbidden, HttpResponse
 from django.shortcuts import get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.openapi import Parameter
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError as SerializerValidationError
+from rest_framework.fields import ListField, UUIDField
 from rest_framework.mixins import ListModelMixin
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -16,6 +20,7 @@ from rest_framework.routers import APIRootView
 from rest_framework.viewsets import GenericViewSet, ViewSet
 
 from nautobot.circuits.models import Circuit
+from nautobot.core.api.authentication import TokenChangePermissions, TokenViewPermissions
 from nautobot.core.api.views import ModelViewSet
 from nautobot.core.api.exceptions import ServiceUnavailable
 from nautobot.core.api.metadata import ContentTypeMetadata
@@ -81,12 +86,18 @@ class DCIMRootView(APIRootView):
 
 
 class PathEndpointMixin(object):
-    @action(detail=True, url_path="trace")
-    def trace(self, request, pk):
+    @staticmethod
+    def _serialize_trace(obj, request, serializer_classes):
         """
-        Trace a complete cable path and return each segment as a three-tuple of (termination, cable, termination).
+        Serialize the complete cable path of `obj` as a list of three-tuples of (termination, cable, termination).
+        `serializer_classes` caches the nested serializer class of each model encountered.
         """
-        obj = get_object_or_404(self.queryset, pk=pk)
+
+        def serialize(node):
+            model = type(node)
+            if model not in serializer_classes:
+                serializer_classes[model] = get_serializer_for_model(node, prefix="Nested")
+            return serializer_classes[model](node, context={"request": request}).data
 
         # Initialize the path array
         path = []
@@ -97,21 +108,59 @@ class PathEndpointMixin(object):
                 break
 
             # Serialize each object
-            serializer_a = get_serializer_for_model(near_end, prefix="Nested")
-            x = serializer_a(near_end, context={"request": request}).data
+            x = serialize(near_end)
             if cable is not None:
                 y = serializers.TracedCableSerializer(cable, context={"request": request}).data
             else:
                 y = None
             if far_end is not None:
-                serializer_b = get_serializer_for_model(far_end, prefix="Nested")
-                z = serializer_b(far_end, context={"request": request}).data
+                z = serialize(far_end)
             else:
                 z = None
 
             path.append((x, y, z))
 
-        return Response(path)
+        return path
+
+    @action(detail=True, url_path="trace")
+    def trace(self, request, pk):
+        """
+        Trace a complete cable path and return each segment as a three-tuple of (termination, cable, termination).
+        """
+        obj = get_object_or_404(self.queryset, pk=pk)
+
+        return Response(self._serialize_trace(obj, request, {}))
+
+    @swagger_auto_schema(
+        method="post",
+        request_body=openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING)),
+    )
+    @action(detail=False, url_path="trace", methods=["post"], permission_classes=[TokenViewPermissions])
+    def bulk_trace(self, request):
+        """
+        Trace the complete cable paths of many objects in a single request. Accepts a list of object IDs, and returns a
+        list of objects each containing an `id` and its `trace`, in the same format as returned by the `trace`
+        endpoint. The objects in each path are retrieved together for all of the requested objects.
+        """
+        pks = ListField(child=UUIDField()).run_validation(request.data)
+
+        # Objects must be visible to the user; note that the view's queryset has been restricted to objects which the
+        # user may add, as this is a POST request
+        model = self.queryset.model
+        queryset = model.objects.restrict(request.user, "view").filter(pk__in=pks).select_related("_path")
+        for field_name in ("device", "circuit"):
+            if hasattr(model, field_name):
+                queryset = queryset.prefetch_related(field_name)
+        objects = {obj.pk: obj for obj in queryset}
+        if len(objects) != len(set(pks)):
+            raise Http404
+
+        CablePath.prefetch_paths(obj._path for obj in objects.values() if obj._path is not None)
+
+        serializer_classes = {}
+        return Response(
+            [{"id": pk, "trace": self._serialize_trace(objects[pk], request, serializer_classes)} for pk in pks]
+        )
 
 
 class PassThroughPortMixin(object):
@@ -407,6 +456,46 @@ class DeviceViewSet(ConfigContextQuerySetMixin, StatusViewSetMixin, CustomFieldM
 
         return serializers.DeviceWithConfigContextSerializer
 
+    def perform_create(self, serializer):
+        # When creating many Devices in a single request, create their components together
+        with transaction.atomic(), Device.defer_component_instantiation():
+            super().perform_create(serializer)
+
+    @swagger_auto_schema(
+        method="post",
+        request_body=serializers.DeviceMoveSerializer,
+        responses={"200": serializers.DeviceSerializer(many=True)},
+    )
+    @action(detail=False, url_path="move", methods=["post"], permission_classes=[TokenChangePermissions])
+    def move(self, request):
+        """
+        Move many devices, along with any child devices installed within them, to a site and rack in a single request.
+        Accepts a list of `devices` IDs, a `site`, and optionally a `rack`, and returns the moved devices. Devices moved
+        to a different rack lose their position and face within the rack.
+        """
+        serializer = serializers.DeviceMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        pks = set(serializer.validated_data["devices"])
+
+        # Note that the view's queryset has been restricted to objects which the user may add, as this is a POST request
+        devices = Device.objects.restrict(request.user, "change").filter(pk__in=pks)
+        if devices.count() != len(pks):
+            raise Http404
+
+        # Enforce object-level permissions on the moved devices
+        try:
+            with transaction.atomic():
+                Device.move_devices(devices, serializer.validated_data["site"], serializer.validated_data.get("rack"))
+                if devices.count() != len(pks):
+                    raise ObjectDoesNotExist
+        except ValidationError as e:
+            raise SerializerValidationError(e.message_dict)
+        except ObjectDoesNotExist:
+            raise PermissionDenied()
+
+        devices = DeviceViewSet.queryset.filter(pk__in=pks)
+        return Response(serializers.DeviceSerializer(devices, many=True, context={"request": request}).data)
+
     @swagger_auto_schema(
         manual_parameters=[Parameter(name="method", in_="query", required=True, type=openapi.TYPE_STRING)],
         responses={"200": serializers.DeviceNAPALMSerializer},
@@ -719,15 +808,43 @@ class ConnectedDeviceViewSet(ViewSet):
         if not peer_device_name or not peer_interface_name:
             raise MissingFilterException(detail='Request must include "peer_device" and "peer_interface" filters.')
 
-        # Determine local interface from peer interface's connection
-        peer_interface = get_object_or_404(
-            Interface.objects.all(),
-            device__name=peer_device_name,
-            name=peer_interface_name,
-        )
-        local_interface = peer_interface.connected_endpoint
-
-        if local_interface is None:
+        # Determine local device from peer interface's connection
+        peer = (peer_device_name, peer_interface_name)
+        connected_device_ids = Interface.get_connected_device_ids([peer])
+        if peer not in connected_device_ids:
+            raise Http404
+        if connected_device_ids[peer] is None:
             return Response()
 
-        return Response(serializers.DeviceSerializer(local_interface.device, context={"request": request}).data)
+        device = get_object_or_404(DeviceViewSet.queryset, pk=connected_device_ids[peer])
+
+        return Response(serializers.DeviceSerializer(device, context={"request": request}).data)
+
+    @swagger_auto_schema(
+        method="post",
+        request_body=serializers.ConnectedDeviceSerializer(many=True),
+        responses={"200": serializers.ConnectedDeviceSerializer(many=True)},
+    )
+    @action(detail=False, url_path="bulk", methods=["post"])
+    def bulk(self, request):
+        """
+        Determine the devices connected to many peer devices and peer interfaces in a single request. Accepts a list of
+        objects each specifying a `peer_device` and `peer_interface`, and returns the same list with the connected
+        `device` of each added (null if the peer interface does not exist or is not connected to a device).
+        """
+        serializer = serializers.ConnectedDeviceSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        peers = [(item["peer_device"], item["peer_interface"]) for item in serializer.validated_data]
+        connected_device_ids = Interface.get_connected_device_ids(peers)
+        devices = DeviceViewSet.queryset.in_bulk({pk for pk in connected_device_ids.values() if pk is not None})
+
+        results = [
+            {
+                "peer_device": peer_device_name,
+                "peer_interface": peer_interface_name,
+                "device": devices.get(connected_device_ids.get((peer_device_name, peer_interface_name))),
+            }
+            for peer_device_name, peer_interface_name in peers
+        ]
+        return Response(serializers.ConnectedDeviceSerializer(results, many=True, context={"request": request}).data)
@@ -26,7 +26,7 @@ class PathContains(Lookup):
         # Mapping of vendor => expr
         sql_map = {
             "postgresql": "%s::jsonb ? '%s'",
-            "mysql": "JSON_CONTAINS(%s, '\"%s\"','$')",
+            "mysql": "JSON_CONTAINS(%s, '\"%s\"')",
         }
 
         if vendor not in sql_map:
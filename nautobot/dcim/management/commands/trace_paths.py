@@ -1,6 +1,10 @@
+import multiprocessing
+import time
+
+from django.core.cache import cache
 from django.core.management.base import BaseCommand
 from django.core.management.color import no_style
-from django.db import connection
+from django.db import connection, connections
 
 from nautobot.circuits.models import CircuitTermination
 from nautobot.dcim.models import (
@@ -12,7 +16,7 @@ from nautobot.dcim.models import (
     PowerOutlet,
     PowerPort,
 )
-from nautobot.dcim.signals import create_cablepath
+from nautobot.dcim.tracing import CableGraph, bulk_trace_paths
 
 ENDPOINT_MODELS = (
     CircuitTermination,
@@ -24,6 +28,37 @@ ENDPOINT_MODELS = (
     PowerPort,
 )
 
+CHECKPOINT_CACHE_KEY = "nautobot.dcim.trace_paths.checkpoint"
+
+# The CableGraph used by worker processes, which inherit it from the parent process when forked
+_graph = None
+
+
+def _trace_batch(args):
+    """
+    Trace and save the CablePaths originating from a batch of objects. Returns a tuple of (batch size, last origin ID
+    in the batch, number of CablePaths created, list of (origin ID, error message) tuples).
+    """
+    model, origin_ids = args
+    created, failures = bulk_trace_paths(
+        model, model.objects.filter(pk__in=origin_ids), _graph, batch_size=len(origin_ids)
+    )
+    return len(origin_ids), origin_ids[-1], created, [(pk, str(error)) for pk, error in failures]
+
+
+def _iter_batches(queryset, batch_size):
+    """
+    Yield lists of up to `batch_size` consecutive primary keys from the given QuerySet, in order.
+    """
+    batch = []
+    for pk in queryset.order_by("pk").values_list("pk", flat=True).iterator():
+        batch.append(pk)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
 class Command(BaseCommand):
     help = "Generate any missing cable paths among all cable termination objects in Nautobot"
@@ -41,6 +76,23 @@ class Command(BaseCommand):
             dest="no_input",
             help="Do not prompt user for any input/confirmation",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes among which to divide the cable path origins (default: 1)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of cable path origins to trace and save at a time (default: 1000)",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Discard the progress of any previously interrupted run instead of resuming it",
+        )
 
     def draw_progress_bar(self, percentage):
         """
@@ -50,9 +102,19 @@ class Command(BaseCommand):
         self.stdout.write(f"\r  [{'#' * bar_size}{' ' * (20-bar_size)}] {int(percentage)}%", ending="")
 
     def handle(self, *model_names, **options):
+        if options["restart"]:
+            cache.delete(CHECKPOINT_CACHE_KEY)
+
+        # Resume any previously interrupted run, recalculating paths in the same way as that run
+        checkpoint = cache.get(CHECKPOINT_CACHE_KEY)
+        if checkpoint is not None:
+            self.stdout.write(
+                self.style.WARNING("Resuming interrupted run (use --restart to start over instead)"),
+            )
+            options["force"] = checkpoint["force"]
 
         # If --force was passed, first delete all existing CablePaths
-        if options["force"]:
+        elif options["force"]:
             cable_paths = CablePath.objects.all()
             paths_count = cable_paths.count()
 
@@ -79,22 +141,74 @@ class Command(BaseCommand):
                 for sql in sequence_sql:
                     cursor.execute(sql)
 
-        # Retrace paths
+        if checkpoint is None:
+            checkpoint = {"force": options["force"], "completed": {}}
+            cache.set(CHECKPOINT_CACHE_KEY, checkpoint, timeout=None)
+
+        # Determine which origins remain to be traced
+        to_trace = []
         for model in ENDPOINT_MODELS:
             origins = model.objects.filter(cable__isnull=False)
             if not options["force"]:
                 origins = origins.filter(_path__isnull=True)
+            if model._meta.label_lower in checkpoint["completed"]:
+                origins = origins.filter(pk__gt=checkpoint["completed"][model._meta.label_lower])
             origins_count = origins.count()
             if not origins_count:
                 self.stdout.write(f"Found no missing {model._meta.verbose_name} paths; skipping")
                 continue
-            self.stdout.write(f"Retracing {origins_count} cabled {model._meta.verbose_name_plural}...")
-            i = 0
-            for i, obj in enumerate(origins, start=1):
-                create_cablepath(obj)
-                if not i % 100:
-                    self.draw_progress_bar(i * 100 / origins_count)
-            self.draw_progress_bar(100)
-            self.stdout.write(self.style.SUCCESS(f"\n  Retraced {i} {model._meta.verbose_name_plural}"))
+            to_trace.append((model, origins, origins_count))
+
+        # Load an in-memory graph of all cables, which (if using multiple workers) is shared with the worker processes
+        global _graph
+        pool = None
+        if to_trace:
+            self.stdout.write("Loading cables...")
+            _graph = CableGraph()
+            if options["workers"] > 1:
+                # Worker processes must not share the parent's database connections
+                connections.close_all()
+                pool = multiprocessing.get_context("fork").Pool(options["workers"])
+
+        start_time = time.monotonic()
+        total_created = 0
+        all_failures = []
+        try:
+            for model, origins, origins_count in to_trace:
+                label = model._meta.label_lower
+                self.stdout.write(f"Retracing {origins_count} cabled {model._meta.verbose_name_plural}...")
+                batches = ((model, batch) for batch in _iter_batches(origins, options["batch_size"]))
+                results = pool.imap(_trace_batch, batches) if pool is not None else map(_trace_batch, batches)
+
+                # Results are returned in order, so once a batch is complete, all origins up to its last one have been traced
+                processed = created = 0
+                for batch_size, last_pk, batch_created, failures in results:
+                    processed += batch_size
+                    created += batch_created
+                    all_failures.extend((model, pk, error) for pk, error in failures)
+                    checkpoint["completed"][label] = last_pk
+                    cache.set(CHECKPOINT_CACHE_KEY, checkpoint, timeout=None)
+                    self.draw_progress_bar(processed * 100 / origins_count)
+
+                self.draw_progress_bar(100)
+                self.stdout.write(self.style.SUCCESS(f"\n  Retraced {created} {model._meta.verbose_name_plural}"))
+                total_created += created
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        cache.delete(CHECKPOINT_CACHE_KEY)
+
+        elapsed = time.monotonic() - start_time
+        if total_created:
+            self.stdout.write(
+                f"Traced {total_created} paths in {elapsed:.1f} seconds "
+                f"({total_created / max(elapsed, 0.001):.0f} paths/s)"
+            )
+        for model, pk, error in all_failures:
+            self.stdout.write(self.style.ERROR(f"Unable to trace path from {model._meta.verbose_name} {pk}: {error}"))
+        if all_failures:
+            self.stdout.write(self.style.ERROR(f"Failed to trace {len(all_failures)} paths"))
 
         self.stdout.write(self.style.SUCCESS("Finished."))
@@ -0,0 +1,47 @@
+from django.db import DatabaseError, migrations
+
+
+INDEX_NAME = "dcim_cablepath_path_nodes"
+
+
+def create_path_index(apps, schema_editor):
+    """
+    Index the nodes within each CablePath's `path`, so that `path__contains` lookups (finding the CablePaths which
+    traverse a given object) need not scan every CablePath.
+
+    On PostgreSQL, this is a GIN index, which supports the `?` (key exists) operator. On MySQL, this is a multi-valued
+    index, which supports `JSON_CONTAINS()`; it requires MySQL 8.0.17 or later, and is skipped on older versions.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS "{INDEX_NAME}" ON "dcim_cablepath" USING gin ("path")')
+    elif vendor == "mysql":
+        try:
+            schema_editor.execute(f"CREATE INDEX `{INDEX_NAME}` ON `dcim_cablepath` ((CAST(`path` AS CHAR(64) ARRAY)))")
+        except DatabaseError:
+            pass
+
+
+def drop_path_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{INDEX_NAME}"')
+    elif vendor == "mysql":
+        try:
+            schema_editor.execute(f"DROP INDEX `{INDEX_NAME}` ON `dcim_cablepath`")
+        except DatabaseError:
+            pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dcim", "0005_device_local_context_schema"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=create_path_index,
+            reverse_code=drop_path_index,
+        ),
+    ]
@@ -1,5 +1,6 @@
 from collections import defaultdict
 
+from cacheops import invalidate_model, invalidate_obj
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
@@ -11,6 +12,7 @@ from django.utils.functional import classproperty
 from nautobot.dcim.choices import *
 from nautobot.dcim.constants import *
 from nautobot.dcim.fields import JSONPathField
+from nautobot.dcim.querysets import CablePathQuerySet
 from nautobot.dcim.utils import (
     decompile_path_node,
     object_to_path_node,
@@ -22,7 +24,7 @@ from nautobot.core.models.generics import BaseModel, PrimaryModel
 from nautobot.utilities.fields import ColorField
 from nautobot.utilities.utils import to_meters
 from .devices import Device
-from .device_components import FrontPort, RearPort
+from .device_components import FrontPort, Interface, RearPort
 
 
 __all__ = (
@@ -334,6 +336,8 @@ class CablePath(BaseModel):
     is_active = models.BooleanField(default=False)
     is_split = models.BooleanField(default=False)
 
+    objects = CablePathQuerySet.as_manager()
+
     class Meta:
         unique_together = ("origin_type", "origin_id")
 
@@ -348,6 +352,19 @@ class CablePath(BaseModel):
         model = self.origin._meta.model
         model.objects.filter(pk=self.origin.pk).update(_path=self.pk)
 
+    @property
+    def path_nodes(self):
+        """
+        The nodes of `path`, each parsed into a (content type ID, object ID) tuple. The parsed nodes are retained until
+        `path` is changed.
+        """
+        cached = self.__dict__.get("_path_nodes")
+        if cached is None or cached[0] != self.path:
+            # Any objects prefetched for the previous path are no longer valid
+            self.__dict__.pop("_prefetched_path", None)
+            cached = self._path_nodes = (list(self.path), [decompile_path_node(node) for node in self.path])
+        return cached[1]
+
     @property
     def segment_count(self):
         total_length = 1 + len(self.path) + (1 if self.destination else 0)
@@ -361,17 +378,34 @@ class CablePath(BaseModel):
         if origin is None or origin.cable is None:
             return None
 
+        path, destination, is_active, is_split = cls._trace(origin)
+
+        return cls(
+            origin=origin,
+            destination=destination,
+            path=path,
+            is_active=is_active,
+            is_split=is_split,
+        )
+
+    @staticmethod
+    def _trace(node, path=None, position_stack=None, is_active=True, visited_nodes=None):
+        """
+        Trace a path onward from `node`, which is either the path's origin or the last pass-through port reached so far.
+
+        When resuming a partially traced path, `path`, `position_stack`, `is_active`, and `visited_nodes` carry the
+        state accumulated while tracing the portion of the path leading up to `node`. Returns a tuple of (path,
+        destination, is_active, is_split).
+        """
         # Import added here to avoid circular imports with Cable.
         from nautobot.circuits.models import CircuitTermination
 
         destination = None
-        path = []
-        position_stack = []
-        is_active = True
+        path = list(path or [])
+        position_stack = list(position_stack or [])
+        visited_nodes = set(visited_nodes or [])
         is_split = False
 
-        node = origin
-        visited_nodes = set()
         while node.cable is not None:
             if node.id in visited_nodes:
                 raise ValidationError("a loop is detected in the path")
@@ -431,40 +465,198 @@ class CablePath(BaseModel):
         if destination is None:
             is_active = False
 
-        return cls(
-            origin=origin,
-            destination=destination,
-            path=path,
-            is_active=is_active,
-            is_split=is_split,
+        return path, destination, is_active, is_split
+
+    @classmethod
+    def retrace(cls, cable_paths, node):
+        """
+        Update the given CablePaths, each of which traverses (or begins or ends at) `node`, after `node` has changed.
+
+        Each path consists of segments of up to three nodes: a Cable followed by the pair of ports (or circuit
+        terminations) through which the path passes. The segments preceding the one containing `node` are unaffected
+        by the change, so each path is traced onward only from the start of that segment, resuming with the state
+        reconstructed from the preceding segments. Everything needed for this is retrieved in a few queries for all
+        paths at once. Paths whose result is unchanged are left alone; all others are written using `bulk_update()`,
+        except for those whose origin is no longer connected to anything, which are deleted.
+
+        Returns a tuple of (updated paths, number of deleted paths).
+        """
+        node_repr = object_to_path_node(node)
+        node_ct = ContentType.objects.get_for_model(node)
+        frontport_ct_id = ContentType.objects.get_for_model(FrontPort).pk
+        rearport_ct_id = ContentType.objects.get_for_model(RearPort).pk
+
+        # Determine the segment of each path at which retracing must begin
+        to_retrace = []
+        for cp in cable_paths:
+            if node_repr in cp.path:
+                index = cp.path.index(node_repr)
+            elif cp.origin_type_id == node_ct.pk and cp.origin_id == node.pk:
+                index = 0
+            else:
+                # The node is the path's destination, which follows its final segment
+                index = len(cp.path) - 1
+            to_retrace.append((cp, cp.path_nodes, max(index, 0) // 3 * 3))
+
+        # Retrieve the objects from which tracing resumes, along with the attributes of the preceding nodes which
+        # determine the state of the trace
+        resume_ids = defaultdict(set)
+        cable_ids, frontport_ids, rearport_ids = set(), set(), set()
+        for cp, nodes, start in to_retrace:
+            if start:
+                ct_id, object_id = nodes[start - 1]
+                resume_ids[ct_id].add(object_id)
+            for i, (ct_id, object_id) in enumerate(nodes[:start]):
+                if i % 3 == 0:
+                    cable_ids.add(object_id)
+                elif ct_id == frontport_ct_id:
+                    frontport_ids.add(object_id)
+                elif ct_id == rearport_ct_id:
+                    rearport_ids.add(object_id)
+
+        resume_nodes = {}
+        for ct_id, object_ids in resume_ids.items():
+            model_class = ContentType.objects.get_for_id(ct_id).model_class()
+            resume_nodes.update({(ct_id, obj.pk): obj for obj in model_class.objects.filter(pk__in=object_ids)})
+        inactive_cable_ids = set(
+            Cable.objects.filter(pk__in=cable_ids).exclude(status=Cable.STATUS_CONNECTED).values_list("pk", flat=True)
+        )
+        frontport_positions = dict(
+            FrontPort.objects.filter(pk__in=frontport_ids).values_list("pk", "rear_port_position")
+        )
+        rearport_positions = dict(RearPort.objects.filter(pk__in=rearport_ids).values_list("pk", "positions"))
+
+        updated = []
+        deleted = 0
+        for cp, nodes, start in to_retrace:
+            if not start:
+                origin = cp.origin
+                if origin is None or origin.cable is None:
+                    if origin is not None:
+                        invalidate_obj(origin)
+                    cp.delete()
+                    deleted += 1
+                    continue
+                path, destination, is_active, is_split = cls._trace(origin)
+            else:
+                # Replay the unchanged segments to reconstruct the state of the trace. (The node from which tracing
+                # resumes is marked as visited by `_trace()` itself.)
+                position_stack = []
+                visited_nodes = {cp.origin_id}
+                for i in range(0, start, 3):
+                    (near_ct_id, near_id), (_, far_id) = nodes[i + 1 : i + 3]
+                    if near_ct_id == frontport_ct_id and rearport_positions[far_id] > 1:
+                        position_stack.append(frontport_positions[near_id])
+                    elif near_ct_id == rearport_ct_id and rearport_positions[near_id] > 1:
+                        position_stack.pop()
+                    if i + 3 < start:
+                        visited_nodes.add(far_id)
+                path, destination, is_active, is_split = cls._trace(
+                    resume_nodes[nodes[start - 1]],
+                    path=cp.path[:start],
+                    position_stack=position_stack,
+                    is_active=not any(cable_id in inactive_cable_ids for _, cable_id in nodes[:start:3]),
+                    visited_nodes=visited_nodes,
+                )
+
+            destination_type = ContentType.objects.get_for_model(destination) if destination else None
+            destination_id = destination.pk if destination else None
+            if (
+                cp.path == path
+                and cp.destination_type_id == getattr(destination_type, "pk", None)
+                and cp.destination_id == destination_id
+                and cp.is_active == is_active
+                and cp.is_split == is_split
+            ):
+                continue
+
+            cp.path = path
+            cp.destination_type = destination_type
+            cp.destination_id = destination_id
+            cp.is_active = is_active
+            cp.is_split = is_split
+            updated.append(cp)
+
+        cls.objects.bulk_update(updated, ["path", "destination_type", "destination_id", "is_active", "is_split"])
+
+        # bulk_update() bypasses cacheops, so discard the cached CablePaths and the cached state of their origins here
+        if updated:
+            invalidate_model(cls)
+            origin_ids = defaultdict(set)
+            for cp in updated:
+                origin_ids[cp.origin_type_id].add(cp.origin_id)
+            for ct_id, object_ids in origin_ids.items():
+                model_class = ContentType.objects.get_for_id(ct_id).model_class()
+                for origin in model_class.objects.filter(pk__in=object_ids).nocache():
+                    invalidate_obj(origin)
+
+        # bulk_update() does not send post_save, so discard the cached connected Devices of any affected Interfaces here
+        interface_ct_id = ContentType.objects.get_for_model(Interface).pk
+        Interface.invalidate_connected_device_ids(
+            interface_ids=[cp.origin_id for cp in updated if cp.origin_type_id == interface_ct_id]
         )
 
-    def get_path(self):
+        return updated, deleted
+
+    @staticmethod
+    def _prefetch_nodes(nodes):
         """
-        Return the path as a list of prefetched objects.
+        Fetch the objects identified by the given (content type ID, object ID) tuples, using one query per model type,
+        and return them as a dictionary mapping each content type ID to a dictionary of objects keyed by ID. Prefetch
+        related devices and circuits where appropriate.
         """
-        # Compile a list of IDs to prefetch for each type of model in the path
-        to_prefetch = defaultdict(list)
-        for node in self.path:
-            ct_id, object_id = decompile_path_node(node)
-            to_prefetch[ct_id].append(object_id)
+        # Compile a list of IDs to prefetch for each type of model
+        to_prefetch = defaultdict(set)
+        for ct_id, object_id in nodes:
+            to_prefetch[ct_id].add(object_id)
 
-        # Prefetch path objects using one query per model type. Prefetch related devices where appropriate.
         prefetched = {}
         for ct_id, object_ids in to_prefetch.items():
             model_class = ContentType.objects.get_for_id(ct_id).model_class()
             queryset = model_class.objects.filter(pk__in=object_ids)
-            if hasattr(model_class, "device"):
-                queryset = queryset.prefetch_related("device")
+            for field_name in ("device", "circuit"):
+                if hasattr(model_class, field_name):
+                    queryset = queryset.prefetch_related(field_name)
             prefetched[ct_id] = {obj.id: obj for obj in queryset}
 
-        # Replicate the path using the prefetched objects.
-        path = []
-        for node in self.path:
-            ct_id, object_id = decompile_path_node(node)
-            path.append(prefetched[ct_id][object_id])
+        return prefetched
+
+    @classmethod
+    def prefetch_paths(cls, cable_paths):
+        """
+        Prefetch the path objects and destinations of many CablePaths at once, using one query per model type across
+        all of the CablePaths, so that calling `get_path()` or accessing `destination` on any of them requires no
+        further queries. See also `CablePathQuerySet.prefetch_path_objects()`.
+        """
+        cable_paths = list(cable_paths)
+        nodes = []
+        for cable_path in cable_paths:
+            nodes.extend(cable_path.path_nodes)
+            if cable_path.destination_id is not None:
+                nodes.append((cable_path.destination_type_id, cable_path.destination_id))
+        prefetched = cls._prefetch_nodes(nodes)
+
+        destination_field = cls._meta.get_field("destination")
+        for cable_path in cable_paths:
+            cable_path._prefetched_path = [prefetched[ct_id][object_id] for ct_id, object_id in cable_path.path_nodes]
+            if cable_path.destination_id is not None:
+                destination_field.set_cached_value(
+                    cable_path, prefetched[cable_path.destination_type_id][cable_path.destination_id]
+                )
+
+    def get_path(self):
+        """
+        Return the path as a list of prefetched objects.
+        """
+        nodes = self.path_nodes
+        if hasattr(self, "_prefetched_path"):
+            return self._prefetched_path
+
+        # Prefetch path objects using one query per model type
+        prefetched = self._prefetch_nodes(nodes)
 
-        return path
+        # Replicate the path using the prefetched objects.
+        return [prefetched[ct_id][object_id] for ct_id, object_id in nodes]
 
     def get_total_length(self):
         """
@@ -472,8 +664,8 @@ class CablePath(BaseModel):
         """
         cable_ids = [
             # Starting from the first element, every third element in the path should be a Cable
-            decompile_path_node(self.path[i])[1]
-            for i in range(0, len(self.path), 3)
+            object_id
+            for ct_id, object_id in self.path_nodes[::3]
         ]
         return Cable.objects.filter(id__in=cable_ids).aggregate(total=Sum("_abs_length"))["total"]
 
@@ -195,8 +195,14 @@ class PowerOutletTemplate(ComponentTemplateModel):
         if self.power_port and self.power_port.device_type != self.device_type:
             raise ValidationError("Parent power port ({}) must belong to the same device type".format(self.power_port))
 
-    def instantiate(self, device):
-        if self.power_port:
+    def instantiate(self, device, power_ports=None):
+        """
+        `power_ports` optionally maps the names of the Device's PowerPorts to the PowerPorts themselves, to avoid
+        retrieving the PowerPort from the database.
+        """
+        if self.power_port and power_ports is not None:
+            power_port = power_ports[self.power_port.name]
+        elif self.power_port:
             power_port = PowerPort.objects.get(device=device, name=self.power_port.name)
         else:
             power_port = None
@@ -292,8 +298,14 @@ class FrontPortTemplate(ComponentTemplateModel):
                 )
             )
 
-    def instantiate(self, device):
-        if self.rear_port:
+    def instantiate(self, device, rear_ports=None):
+        """
+        `rear_ports` optionally maps the names of the Device's RearPorts to the RearPorts themselves, to avoid
+        retrieving the RearPort from the database.
+        """
+        if self.rear_port and rear_ports is not None:
+            rear_port = rear_ports[self.rear_port.name]
+        elif self.rear_port:
             rear_port = RearPort.objects.get(device=device, name=self.rear_port.name)
         else:
             rear_port = None
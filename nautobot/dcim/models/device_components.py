@@ -1,9 +1,13 @@
+from collections import defaultdict
+from urllib.parse import quote
+
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import connections, models, transaction
+from django.db.models import Q, Sum
 from django.urls import reverse
 from mptt.models import MPTTModel, TreeForeignKey
 from taggit.managers import TaggableManager
@@ -561,9 +565,99 @@ class Interface(CableTermination, PathEndpoint, ComponentModel, BaseInterface):
         ordering = ("device", CollateAsChar("_name"))
         unique_together = ("device", "name")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Remember the original name, for discarding its cached connected Device when it is changed (avoiding loading
+        # the field if it has been deferred)
+        self._original_name = self.__dict__.get("name")
+
     def get_absolute_url(self):
         return reverse("dcim:interface", kwargs={"pk": self.pk})
 
+    @staticmethod
+    def get_connected_device_cache_key(device_name, interface_name):
+        return (
+            f"nautobot.dcim.interface_connected_device.{quote(device_name, safe='')}.{quote(interface_name, safe='')}"
+        )
+
+    @classmethod
+    def get_connected_device_ids(cls, peers):
+        """
+        Given an iterable of (device name, interface name) pairs, each identifying a peer Interface, return a
+        dictionary mapping each pair to the ID of the Device whose Interface is connected to the peer Interface (or
+        None, if the peer Interface is not connected to the Interface of a Device). Pairs which do not identify exactly
+        one Interface are omitted.
+
+        Results are cached, and invalidated whenever the CablePath originating from a peer Interface changes, or a peer
+        Interface or its Device is renamed or deleted. Within a database transaction, they are always retrieved from the
+        database.
+        """
+        peers = set(peers)
+        use_cache = not connections[cls.objects.db].in_atomic_block
+        cache_keys = {peer: cls.get_connected_device_cache_key(*peer) for peer in peers}
+
+        # Cached values are wrapped in a tuple, to distinguish unconnected Interfaces from cache misses
+        connected_device_ids = {}
+        if use_cache:
+            cached = cache.get_many(cache_keys.values())
+            for peer, cache_key in cache_keys.items():
+                if cache_key in cached:
+                    connected_device_ids[peer] = cached[cache_key][0]
+
+        missing = [peer for peer in peers if peer not in connected_device_ids]
+        if not missing:
+            return connected_device_ids
+
+        # Find the connected endpoint of each peer Interface, then the Device of each connected Interface
+        query = Q()
+        for device_name, interface_name in missing:
+            query |= Q(device__name=device_name, name=interface_name)
+        interface_ct_id = ContentType.objects.get_for_model(cls).pk
+        destinations = defaultdict(list)
+        for device_name, interface_name, destination_type_id, destination_id in cls.objects.filter(query).values_list(
+            "device__name", "name", "_path__destination_type", "_path__destination_id"
+        ):
+            destinations[(device_name, interface_name)].append(
+                destination_id if destination_type_id == interface_ct_id else None
+            )
+        device_ids = dict(
+            cls.objects.filter(pk__in=[ids[0] for ids in destinations.values() if ids[0]]).values_list(
+                "pk", "device_id"
+            )
+        )
+
+        found = {}
+        for peer in missing:
+            if len(destinations.get(peer, ())) == 1:
+                found[peer] = device_ids.get(destinations[peer][0])
+        connected_device_ids.update(found)
+
+        if use_cache:
+            cache.set_many({cache_keys[peer]: (device_id,) for peer, device_id in found.items()})
+
+        return connected_device_ids
+
+    @classmethod
+    def invalidate_connected_device_ids(cls, peers=(), interface_ids=()):
+        """
+        Discard the cached connected Device (see `get_connected_device_ids()`) of each of the given (device name,
+        interface name) pairs, and of each Interface with the given IDs, once the current transaction is committed.
+        """
+        peers = set(peers)
+        interface_ids = set(interface_ids)
+        if not peers and not interface_ids:
+            return
+
+        def on_commit_callback():
+            all_peers = peers
+            if interface_ids:
+                all_peers |= set(cls.objects.filter(pk__in=interface_ids).values_list("device__name", "name"))
+            # Interfaces of unnamed Devices cannot be looked up, so are never cached
+            cache.delete_many([cls.get_connected_device_cache_key(*peer) for peer in all_peers if peer[0]])
+
+        transaction.on_commit(on_commit_callback)
+
     def to_csv(self):
         return (
             self.device.identifier if self.device else None,
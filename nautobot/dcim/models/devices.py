@@ -1,4 +1,6 @@
-from collections import OrderedDict
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
 
 import yaml
 from django.conf import settings
@@ -6,8 +8,9 @@ from django.contrib.contenttypes.fields import GenericRelation
 from django.core.exceptions import ValidationError
 from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.db.models import F, ProtectedError
+from django.db.models.signals import post_save
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
@@ -19,6 +22,16 @@ from nautobot.extras.utils import extras_features
 from nautobot.core.models.generics import OrganizationalModel, PrimaryModel
 from nautobot.utilities.choices import ColorChoices
 from nautobot.utilities.fields import ColorField, NaturalOrderingField
+from .device_component_templates import (
+    ConsolePortTemplate,
+    ConsoleServerPortTemplate,
+    DeviceBayTemplate,
+    FrontPortTemplate,
+    InterfaceTemplate,
+    PowerOutletTemplate,
+    PowerPortTemplate,
+    RearPortTemplate,
+)
 from .device_components import *
 
 
@@ -318,6 +331,10 @@ class DeviceType(PrimaryModel):
 #
 
 
+# The new Devices whose components are to be instantiated together, within `Device.defer_component_instantiation()`
+_deferred_component_instantiation = threading.local()
+
+
 @extras_features("custom_fields", "custom_validators", "relationships", "graphql")
 class DeviceRole(OrganizationalModel):
     """
@@ -561,6 +578,13 @@ class Device(PrimaryModel, ConfigContextModel, StatusModel):
             ("virtual_chassis", "vc_position"),
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Remember the original name, for discarding the cached connected Devices of its Interfaces when it is changed
+        # (avoiding loading the field if it has been deferred)
+        self._original_name = self.__dict__.get("name")
+
     def __str__(self):
         return self.display or super().__str__()
 
@@ -714,23 +738,168 @@ class Device(PrimaryModel, ConfigContextModel, StatusModel):
 
         # If this is a new Device, instantiate all of the related components per the DeviceType definition
         if is_new:
-            ConsolePort.objects.bulk_create([x.instantiate(self) for x in self.device_type.consoleporttemplates.all()])
-            ConsoleServerPort.objects.bulk_create(
-                [x.instantiate(self) for x in self.device_type.consoleserverporttemplates.all()]
-            )
-            PowerPort.objects.bulk_create([x.instantiate(self) for x in self.device_type.powerporttemplates.all()])
-            PowerOutlet.objects.bulk_create([x.instantiate(self) for x in self.device_type.poweroutlettemplates.all()])
-            Interface.objects.bulk_create([x.instantiate(self) for x in self.device_type.interfacetemplates.all()])
-            RearPort.objects.bulk_create([x.instantiate(self) for x in self.device_type.rearporttemplates.all()])
-            FrontPort.objects.bulk_create([x.instantiate(self) for x in self.device_type.frontporttemplates.all()])
-            DeviceBay.objects.bulk_create([x.instantiate(self) for x in self.device_type.devicebaytemplates.all()])
+            deferred_devices = getattr(_deferred_component_instantiation, "devices", None)
+            if deferred_devices is not None:
+                deferred_devices.append(self)
+            else:
+                self.instantiate_components([self])
 
         # Update Site and Rack assignment for any child Devices
-        devices = Device.objects.filter(parent_bay__device=self)
-        for device in devices:
-            device.site = self.site
-            device.rack = self.rack
-            device.save()
+        if not is_new:
+            Device._set_site_and_rack(self.get_children(), self.site, self.rack)
+
+    @classmethod
+    def _set_site_and_rack(cls, devices, site, rack):
+        """
+        Assign the given Site and Rack to the given Devices (a QuerySet) and to all child Devices installed within them,
+        at any depth, using a single UPDATE. Devices already assigned to the Site and Rack are not modified.
+
+        The UPDATE is made with cacheops' `invalidated_update()`, so that cached queries matching either the previous or
+        the new Site and Rack of the modified Devices are invalidated. post_save is then sent once for each modified Device, so that a single change record (and webhook) is created
+        for each, without saving every Device in turn. Returns the list of modified Device primary keys.
+        """
+        target = (site.pk, rack.pk if rack is not None else None)
+        changed_pks = []
+        seen_pks = set()
+        while True:
+            parent_pks = []
+            for pk, site_id, rack_id in devices.values_list("pk", "site_id", "rack_id"):
+                if pk in seen_pks:
+                    continue
+                seen_pks.add(pk)
+                parent_pks.append(pk)
+                if (site_id, rack_id) != target:
+                    changed_pks.append(pk)
+            if not parent_pks:
+                break
+            devices = cls.objects.filter(parent_bay__device__in=parent_pks)
+
+        if changed_pks:
+            cls.objects.filter(pk__in=changed_pks).invalidated_update(site=site, rack=rack)
+            for device in cls.objects.filter(pk__in=changed_pks).prefetch_related("tags"):
+                post_save.send(
+                    sender=cls,
+                    instance=device,
+                    created=False,
+                    update_fields=frozenset(["site", "rack"]),
+                    raw=False,
+                    using=device._state.db,
+                )
+
+        return changed_pks
+
+    @classmethod
+    def move_devices(cls, devices, site, rack=None):
+        """
+        Move the given Devices (a QuerySet), along with any child Devices installed within them, to the given Site and
+        Rack (or to no Rack). Any Device moved to a different Rack loses its position and face within the Rack. Returns
+        the list of primary keys of all Devices moved.
+
+        Raises ValidationError if the Rack does not belong to the Site, if any of the Devices is a child Device (which
+        can only be moved along with its parent), or if any of the Devices is assigned to a Cluster in another Site.
+        """
+        if rack is not None and rack.site_id != site.pk:
+            raise ValidationError({"rack": f"Rack {rack} does not belong to site {site}."})
+        child_device = devices.filter(parent_bay__isnull=False).first()
+        if child_device is not None:
+            raise ValidationError(
+                {
+                    "devices": f"{child_device} is installed in a device bay, and can only be moved along with its parent."
+                }
+            )
+        cluster_device = devices.filter(cluster__site__isnull=False).exclude(cluster__site=site).first()
+        if cluster_device is not None:
+            raise ValidationError(
+                {
+                    "devices": f"{cluster_device} is assigned to a cluster in a different site ({cluster_device.cluster.site})."
+                }
+            )
+
+        with transaction.atomic():
+            devices.exclude(rack=rack).invalidated_update(position=None, face="")
+            return cls._set_site_and_rack(devices, site, rack)
+
+    @classmethod
+    def instantiate_components(cls, devices, batch_size=1000):
+        """
+        Create all of the related components of the given new Devices per their DeviceTypes' definitions. The component
+        templates of each DeviceType are retrieved once, and the components of each type are created for all of the
+        Devices using a single `bulk_create()` (in batches of `batch_size`).
+        """
+        devices = list(devices)
+        device_type_ids = {device.device_type_id for device in devices}
+
+        # The names of each Device's power ports and rear ports, mapped to the ports themselves once instantiated, for
+        # the power outlets and front ports which refer to them
+        power_ports = defaultdict(dict)
+        rear_ports = defaultdict(dict)
+
+        for component_model, template_model in (
+            (ConsolePort, ConsolePortTemplate),
+            (ConsoleServerPort, ConsoleServerPortTemplate),
+            (PowerPort, PowerPortTemplate),
+            (PowerOutlet, PowerOutletTemplate),
+            (Interface, InterfaceTemplate),
+            (RearPort, RearPortTemplate),
+            (FrontPort, FrontPortTemplate),
+            (DeviceBay, DeviceBayTemplate),
+        ):
+            templates = defaultdict(list)
+            queryset = template_model.objects.filter(device_type_id__in=device_type_ids)
+            if template_model is PowerOutletTemplate:
+                queryset = queryset.select_related("power_port")
+            elif template_model is FrontPortTemplate:
+                queryset = queryset.select_related("rear_port")
+            for template in queryset:
+                templates[template.device_type_id].append(template)
+
+            components = []
+            for device in devices:
+                for template in templates[device.device_type_id]:
+                    if component_model is PowerOutlet:
+                        component = template.instantiate(device, power_ports=power_ports[device.pk])
+                    elif component_model is FrontPort:
+                        component = template.instantiate(device, rear_ports=rear_ports[device.pk])
+                    else:
+                        component = template.instantiate(device)
+                    components.append(component)
+
+                    if component_model is PowerPort:
+                        power_ports[device.pk][component.name] = component
+                    elif component_model is RearPort:
+                        rear_ports[device.pk][component.name] = component
+
+            component_model.objects.bulk_create(components, batch_size=batch_size)
+
+    @classmethod
+    @contextmanager
+    def defer_component_instantiation(cls):
+        """
+        Context manager within which the components of new Devices are not created as each Device is saved, but rather
+        for all of the new Devices together (see `instantiate_components()`) on exit. This should be used when creating
+        many Devices at once, for example:
+
+            with transaction.atomic(), Device.defer_component_instantiation():
+                for data in device_data:
+                    Device(**data).validated_save()
+
+        Components are created only for those new Devices which still exist on exit, and not at all if an exception is
+        raised. If the context is entered again while already active, the outermost context creates the components.
+        """
+        if getattr(_deferred_component_instantiation, "devices", None) is not None:
+            yield
+            return
+
+        _deferred_component_instantiation.devices = []
+        try:
+            yield
+            devices = _deferred_component_instantiation.devices
+        finally:
+            _deferred_component_instantiation.devices = None
+
+        # Any Devices created within a transaction (savepoint) which has since been rolled back no longer exist
+        existing_pks = set(cls.objects.filter(pk__in=[device.pk for device in devices]).values_list("pk", flat=True))
+        cls.instantiate_components(device for device in devices if device.pk in existing_pks)
 
     def to_csv(self):
         return (
@@ -13,6 +13,7 @@ from mptt.models import MPTTModel, TreeForeignKey
 from nautobot.dcim.choices import *
 from nautobot.dcim.constants import *
 from nautobot.dcim.elevations import RackElevationSVG
+from nautobot.dcim.querysets import RackQuerySet
 from nautobot.extras.models import ObjectChange, StatusModel
 from nautobot.extras.utils import extras_features
 from nautobot.core.models.generics import OrganizationalModel, PrimaryModel
@@ -235,6 +236,8 @@ class Rack(PrimaryModel, StatusModel):
     comments = models.TextField(blank=True)
     images = GenericRelation(to="extras.ImageAttachment")
 
+    objects = RackQuerySet.as_manager()
+
     csv_headers = [
         "site",
         "group",
@@ -414,6 +417,48 @@ class Rack(PrimaryModel, StatusModel):
 
         return [u for u in elevation.values()]
 
+    @classmethod
+    def get_occupancy(cls, rack_ids, exclude=None):
+        """
+        Return a dictionary mapping each of the given Rack IDs to the units occupied by Devices within that Rack, using a
+        single query. The occupied units are given as a dictionary mapping each rack face (front or rear) to a bitmask,
+        in which bit N-1 is set if unit N is occupied on that face; full-depth Devices occupy both faces. The key `None`
+        maps to the units occupied on either face.
+
+        :param rack_ids: Iterable of Rack IDs
+        :param exclude: List of devices IDs to exclude (useful when moving a device within a rack)
+        """
+        occupancy = {pk: {None: 0, DeviceFaceChoices.FACE_FRONT: 0, DeviceFaceChoices.FACE_REAR: 0} for pk in rack_ids}
+        devices = Device.objects.filter(rack__in=occupancy.keys(), position__gte=1)
+        if exclude is not None:
+            devices = devices.exclude(pk__in=exclude)
+
+        for rack_id, position, face, u_height, is_full_depth in devices.order_by().values_list(
+            "rack_id", "position", "face", "device_type__u_height", "device_type__is_full_depth"
+        ):
+            mask = ((1 << u_height) - 1) << (position - 1)
+            faces = occupancy[rack_id]
+            faces[None] |= mask
+            if is_full_depth:
+                faces[DeviceFaceChoices.FACE_FRONT] |= mask
+                faces[DeviceFaceChoices.FACE_REAR] |= mask
+            elif face in faces:
+                faces[face] |= mask
+
+        return occupancy
+
+    @classmethod
+    def get_reserved_units_masks(cls, rack_ids):
+        """
+        Return a dictionary mapping each of the given Rack IDs to a bitmask of its reserved units (bit N-1 is set if
+        unit N is reserved), using a single query.
+        """
+        reserved = {pk: 0 for pk in rack_ids}
+        for rack_id, units in RackReservation.objects.filter(rack__in=reserved.keys()).values_list("rack_id", "units"):
+            for u in units:
+                reserved[rack_id] |= 1 << (u - 1)
+        return reserved
+
     def get_available_units(self, u_height=1, rack_face=None, exclude=None):
         """
         Return a list of units within the rack available to accommodate a device of a given U height (default 1).
@@ -424,31 +469,19 @@ class Rack(PrimaryModel, StatusModel):
         :param rack_face: The face of the rack (front or rear) required; 'None' if device is full depth
         :param exclude: List of devices IDs to exclude (useful when moving a device within a rack)
         """
-        # Gather all devices which consume U space within the rack
-        devices = self.devices.prefetch_related("device_type").filter(position__gte=1)
-        if exclude is not None:
-            devices = devices.exclude(pk__in=exclude)
-
-        # Initialize the rack unit skeleton
-        units = list(range(1, self.u_height + 1))
-
-        # Remove units consumed by installed devices
-        for d in devices:
-            if rack_face is None or d.face == rack_face or d.device_type.is_full_depth:
-                for u in range(d.position, d.position + d.device_type.u_height):
-                    try:
-                        units.remove(u)
-                    except ValueError:
-                        # Found overlapping devices in the rack!
-                        pass
+        # Use the occupancy retrieved by RackQuerySet.annotate_utilization(), if available
+        occupancy = getattr(self, "_occupancy", None)
+        if occupancy is None or exclude is not None:
+            occupancy = self.get_occupancy([self.pk], exclude=exclude)[self.pk]
+        # Treat a device with no specific rack face as requiring both faces
+        free = ~occupancy.get(rack_face, occupancy[None]) & ((1 << self.u_height) - 1)
 
-        # Remove units without enough space above them to accommodate a device of the specified height
-        available_units = []
-        for u in units:
-            if set(range(u, u + u_height)).issubset(units):
-                available_units.append(u)
+        # Find the units with enough free space above them to accommodate a device of the specified height
+        fits = free
+        for offset in range(1, u_height):
+            fits &= free >> offset
 
-        return list(reversed(available_units))
+        return [u for u in range(self.u_height, 0, -1) if fits >> (u - 1) & 1]
 
     def get_reserved_units(self):
         """
@@ -496,16 +529,19 @@ class Rack(PrimaryModel, StatusModel):
         Returns:
             UtilizationData: (numerator=Occupied Unit Count, denominator=U Height of the rack)
         """
-        # Determine unoccupied units
-        available_units = self.get_available_units()
+        # Use the occupancy and reservations retrieved by RackQuerySet.annotate_utilization(), if available
+        occupancy = getattr(self, "_occupancy", None)
+        if occupancy is None:
+            occupancy = self.get_occupancy([self.pk])[self.pk]
+        reserved = getattr(self, "_reserved_units_mask", None)
+        if reserved is None:
+            reserved = self.get_reserved_units_masks([self.pk])[self.pk]
 
-        # Remove reserved units
-        for u in self.get_reserved_units():
-            if u in available_units:
-                available_units.remove(u)
+        # Determine units which are neither occupied nor reserved
+        available = ~(occupancy[None] | reserved) & ((1 << self.u_height) - 1)
 
         # Return the numerator and denominator as percentage is to be calculated later where needed
-        return UtilizationData(numerator=self.u_height - len(available_units), denominator=self.u_height)
+        return UtilizationData(numerator=self.u_height - bin(available).count("1"), denominator=self.u_height)
 
     def get_power_utilization(self):
         """Determine the utilization numerator and denominator for power utilization on the rack.
@@ -0,0 +1,68 @@
+from django.db.models.query import ModelIterable
+
+from nautobot.utilities.querysets import RestrictedQuerySet
+
+
+class CablePathIterable(ModelIterable):
+    """
+    Iterable which prefetches the path objects and destinations of each batch of retrieved CablePaths, as requested by
+    `CablePathQuerySet.prefetch_path_objects()`.
+    """
+
+    def __iter__(self):
+        objs = list(super().__iter__())
+        self.queryset.model.prefetch_paths(objs)
+        yield from objs
+
+
+class CablePathQuerySet(RestrictedQuerySet):
+    """Queryset for `CablePath` objects."""
+
+    def prefetch_path_objects(self):
+        """
+        Prefetch the objects within the path of each CablePath, and its destination, using one query per model type
+        across all of the retrieved CablePaths. `get_path()` (and hence the `trace()` of each CablePath's origin) then
+        requires no further queries.
+
+        This is most useful within a `Prefetch` of the `_path` of many path endpoints, for example:
+
+            Interface.objects.prefetch_related(Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()))
+        """
+        clone = self._chain()
+        clone._iterable_class = CablePathIterable
+        return clone
+
+
+class RackIterable(ModelIterable):
+    """
+    Iterable which retrieves the occupied and reserved units of each batch of retrieved Racks, as requested by
+    `RackQuerySet.annotate_utilization()`.
+    """
+
+    def __iter__(self):
+        objs = list(super().__iter__())
+        rack_ids = [obj.pk for obj in objs]
+        occupancy = self.queryset.model.get_occupancy(rack_ids)
+        reserved = self.queryset.model.get_reserved_units_masks(rack_ids)
+        for obj in objs:
+            obj._occupancy = occupancy[obj.pk]
+            obj._reserved_units_mask = reserved[obj.pk]
+            obj.utilization = obj.get_utilization()
+        yield from objs
+
+
+class RackQuerySet(RestrictedQuerySet):
+    """Queryset for `Rack` objects."""
+
+    def annotate_utilization(self):
+        """
+        Annotate each Rack with its `utilization`, as would be returned by `Rack.get_utilization()`.
+
+        The occupied and reserved units of each batch of retrieved Racks (e.g. a page of results) are retrieved in two
+        queries, rather than two queries per Rack, and retained by each Rack so that `get_utilization()` and
+        `get_available_units()` require no further queries. As such, utilization is not available for filtering or
+        ordering the queryset.
+        """
+        clone = self._chain()
+        clone._iterable_class = RackIterable
+        return clone
@@ -1,6 +1,5 @@
 import logging
 
-from cacheops import invalidate_obj
 from django.contrib.contenttypes.models import ContentType
 from django.db.models.signals import post_save, post_delete, pre_delete
 from django.db import transaction
@@ -10,6 +9,7 @@ from .models import (
     Cable,
     CablePath,
     Device,
+    Interface,
     PathEndpoint,
     PowerPanel,
     Rack,
@@ -37,16 +37,13 @@ def create_cablepath(node, rebuild=True):
 
 def rebuild_paths(obj):
     """
-    Rebuild all CablePaths which traverse the specified node
+    Rebuild all CablePaths which traverse the specified node. Only the portion of each path from the specified node
+    onward is retraced (see `CablePath.retrace()`).
     """
     cable_paths = CablePath.objects.filter(path__contains=obj)
 
     with transaction.atomic():
-        for cp in cable_paths:
-            invalidate_obj(cp.origin)
-            cp.delete()
-            # Prevent looping back to rebuild_paths during the atomic transaction.
-            create_cablepath(cp.origin, rebuild=False)
+        CablePath.retrace(cable_paths, obj)
 
 
 #
@@ -78,9 +75,9 @@ def handle_rack_site_change(instance, created, **kwargs):
     Update child Devices if Site assignment has changed.
     """
     if not created:
-        for device in Device.objects.filter(rack=instance).exclude(site=instance.site):
-            device.site = instance.site
-            device.save()
+        Device._set_site_and_rack(
+            Device.objects.filter(rack=instance).exclude(site=instance.site), instance.site, instance
+        )
 
 
 #
@@ -176,16 +173,48 @@ def nullify_connected_endpoints(instance, **kwargs):
         instance.termination_b._cable_peer = None
         instance.termination_b.save()
 
-    # Delete and retrace any dependent cable paths
-    for cablepath in CablePath.objects.filter(path__contains=instance):
-        cp = CablePath.from_origin(cablepath.origin)
-        if cp:
-            CablePath.objects.filter(pk=cablepath.pk).update(
-                path=cp.path,
-                destination_type=ContentType.objects.get_for_model(cp.destination) if cp.destination else None,
-                destination_id=cp.destination.pk if cp.destination else None,
-                is_active=cp.is_active,
-                is_split=cp.is_split,
-            )
-        else:
-            cablepath.delete()
+    # Retrace any dependent cable paths from the point of the deleted Cable (deleting those which began with it)
+    CablePath.retrace(CablePath.objects.filter(path__contains=instance), instance)
+
+
+#
+# Connected devices
+#
+
+
+@receiver(post_save, sender=CablePath)
+@receiver(post_delete, sender=CablePath)
+def invalidate_cablepath_connected_device(instance, **kwargs):
+    """
+    Discard the cached connected Device of an Interface whose CablePath has been created, modified, or deleted.
+    """
+    if instance.origin_type_id == ContentType.objects.get_for_model(Interface).pk:
+        Interface.invalidate_connected_device_ids(interface_ids=[instance.origin_id])
+
+
+@receiver(post_save, sender=Interface)
+@receiver(post_delete, sender=Interface)
+def invalidate_interface_connected_device(instance, created=False, **kwargs):
+    """
+    Discard the cached connected Device of an Interface which has been renamed or deleted, under its original name.
+    """
+    original_name = instance._original_name
+    instance._original_name = instance.name
+    if created or original_name is None:
+        return
+    if kwargs["signal"] is post_delete or original_name != instance.name:
+        Interface.invalidate_connected_device_ids(peers=[(instance.device.name, original_name)])
+
+
+@receiver(post_save, sender=Device)
+def invalidate_device_connected_devices(instance, created, **kwargs):
+    """
+    Discard the cached connected Devices of the Interfaces of a Device which has been renamed, under its original name.
+    """
+    original_name = instance._original_name
+    instance._original_name = instance.name
+    if created or original_name is None or original_name == instance.name:
+        return
+    Interface.invalidate_connected_device_ids(
+        peers=[(original_name, name) for name in instance.interfaces.values_list("name", flat=True)]
+    )
@@ -13,7 +13,7 @@ PATHENDPOINT = """
     <a href="{{ value.destination.parent.get_absolute_url }}">{{ value.destination.parent }}</a>
     <i class="mdi mdi-chevron-right"></i>
     <a href="{{ value.destination.get_absolute_url }}">{{ value.destination }}</a>
-    {% with traced_path=value.origin.trace %}
+    {% with traced_path=record.trace %}
         {% for near_end, cable, far_end in traced_path %}
             {% if near_end.circuit %}
                 <small>via
@@ -89,6 +89,42 @@ class Mixins:
             self.assertEqual(segment1[1]["label"], cable.label)
             self.assertEqual(segment1[2]["name"], peer_obj.name)
 
+        def test_bulk_trace(self):
+            """
+            Test tracing the attached cables of many device components at once.
+            """
+            obj1, obj2 = self.model.objects.all()[:2]
+            peer_device = Device.objects.create(
+                site=Site.objects.first(),
+                device_type=DeviceType.objects.first(),
+                device_role=DeviceRole.objects.first(),
+                name="Peer Device",
+            )
+            if self.peer_termination_type is None:
+                raise NotImplementedError("Test case must set peer_termination_type")
+            peer_obj = self.peer_termination_type.objects.create(device=peer_device, name="Peer Termination")
+            cable = Cable(termination_a=obj1, termination_b=peer_obj, label="Cable 1")
+            cable.save()
+
+            # View permission suffices, as the request does not modify any objects
+            self.add_permissions(f"dcim.view_{self.model._meta.model_name}")
+            url = reverse(f"dcim-api:{self.model._meta.model_name}-bulk-trace")
+            response = self.client.post(url, [str(obj2.pk), str(obj1.pk)], format="json", **self.header)
+
+            self.assertHttpStatus(response, status.HTTP_200_OK)
+            self.assertEqual([item["id"] for item in response.data], [obj2.pk, obj1.pk])
+            self.assertEqual(response.data[0]["trace"], [])
+            self.assertEqual(len(response.data[1]["trace"]), 1)
+            segment1 = response.data[1]["trace"][0]
+            self.assertEqual(segment1[0]["name"], obj1.name)
+            self.assertEqual(segment1[1]["label"], cable.label)
+            self.assertEqual(segment1[2]["name"], peer_obj.name)
+
+            # Tracing an object which does not exist (or is not visible to the user) fails
+            peer_device.delete()
+            response = self.client.post(url, [str(obj1.pk), str(peer_obj.pk)], format="json", **self.header)
+            self.assertHttpStatus(response, status.HTTP_404_NOT_FOUND)
+
 
 class RegionTest(APIViewTestCases.APIViewTestCase):
     model = Region
@@ -1145,6 +1181,61 @@ class DeviceTest(APIViewTestCases.APIViewTestCase):
 
         self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
 
+    def test_move_devices(self):
+        """
+        Check that many devices can be moved to a new site and rack in a single request.
+        """
+        devices = Device.objects.filter(name__in=["Device 1", "Device 2"])
+        site = Site.objects.get(slug="site-2")
+        rack = Rack.objects.get(name="Rack 2")
+        data = {
+            "devices": [str(device.pk) for device in devices],
+            "site": str(site.pk),
+            "rack": str(rack.pk),
+        }
+
+        self.add_permissions("dcim.change_device")
+        url = reverse("dcim-api:device-move")
+        response = self.client.post(url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(sorted(item["name"] for item in response.data), ["Device 1", "Device 2"])
+        for device in Device.objects.filter(name__in=["Device 1", "Device 2"]):
+            self.assertEqual(device.site, site)
+            self.assertEqual(device.rack, rack)
+        self.assertEqual(Device.objects.get(name="Device 3").site.slug, "site-1")
+
+    def test_move_devices_invalid_rack(self):
+        """
+        Check that devices cannot be moved to a rack in another site.
+        """
+        device = Device.objects.get(name="Device 1")
+        data = {
+            "devices": [str(device.pk)],
+            "site": str(Site.objects.get(slug="site-2").pk),
+            "rack": str(Rack.objects.get(name="Rack 1").pk),
+        }
+
+        self.add_permissions("dcim.change_device")
+        url = reverse("dcim-api:device-move")
+        response = self.client.post(url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Device.objects.get(pk=device.pk).site.slug, "site-1")
+
+    def test_move_devices_without_permission(self):
+        """
+        Check that moving devices requires change permission.
+        """
+        device = Device.objects.get(name="Device 1")
+        data = {"devices": [str(device.pk)], "site": str(Site.objects.get(slug="site-2").pk)}
+
+        self.add_permissions("dcim.add_device")
+        url = reverse("dcim-api:device-move")
+        response = self.client.post(url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_403_FORBIDDEN)
+
     def test_local_context_schema_validation_pass(self):
         """
         Given a config context schema
@@ -1765,6 +1856,28 @@ class ConnectedDeviceTest(APITestCase):
         self.assertHttpStatus(response, status.HTTP_200_OK)
         self.assertEqual(response.data["name"], self.device1.name)
 
+    def test_get_connected_device_bulk(self):
+        Interface.objects.create(device=self.device2, name="eth1")
+
+        url = reverse("dcim-api:connected-device-bulk")
+        data = [
+            {"peer_device": "TestDevice2", "peer_interface": "eth0"},
+            {"peer_device": "TestDevice1", "peer_interface": "eth0"},
+            {"peer_device": "TestDevice2", "peer_interface": "eth1"},
+            {"peer_device": "TestDevice3", "peer_interface": "eth0"},
+        ]
+        response = self.client.post(url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item["peer_device"], item["peer_interface"]) for item in response.data],
+            [(item["peer_device"], item["peer_interface"]) for item in data],
+        )
+        self.assertEqual(response.data[0]["device"]["name"], self.device1.name)
+        self.assertEqual(response.data[1]["device"]["name"], self.device2.name)
+        self.assertIsNone(response.data[2]["device"])
+        self.assertIsNone(response.data[3]["device"])
+
 
 class VirtualChassisTest(APIViewTestCases.APIViewTestCase):
     model = VirtualChassis
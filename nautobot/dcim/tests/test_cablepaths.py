@@ -1,9 +1,17 @@
+from io import StringIO
+from unittest import mock
+
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db.models import Prefetch
 from django.test import TestCase
 
 from nautobot.circuits.models import *
+from nautobot.dcim.management.commands.trace_paths import CHECKPOINT_CACHE_KEY
 from nautobot.dcim.models import *
+from nautobot.dcim.tracing import CableGraph, OutOfScope, bulk_trace_paths
 from nautobot.dcim.utils import object_to_path_node
 from nautobot.extras.models import Status
 
@@ -1458,3 +1466,296 @@ class CablePathTestCase(TestCase):
                 rearport1: 2,
             }
         )
+
+    def test_303_retrace_path_from_modified_node(self):
+        """
+        [IF1] --C1-- [FP1:1] [RP1] --C2-- [RP2] [FP2:1] --C3-- [IF2]
+        [IF3] --C4-- [FP1:2]                    [FP2:2] --C5-- [IF4]
+
+        Replace C3 with C6, connecting [FP2:1] to [IF5]
+        """
+        interface1 = Interface.objects.create(device=self.device, name="Interface 1")
+        interface2 = Interface.objects.create(device=self.device, name="Interface 2")
+        interface3 = Interface.objects.create(device=self.device, name="Interface 3")
+        interface4 = Interface.objects.create(device=self.device, name="Interface 4")
+        interface5 = Interface.objects.create(device=self.device, name="Interface 5")
+        rearport1 = RearPort.objects.create(device=self.device, name="Rear Port 1", positions=4)
+        rearport2 = RearPort.objects.create(device=self.device, name="Rear Port 2", positions=4)
+        frontport1_1 = FrontPort.objects.create(
+            device=self.device, name="Front Port 1:1", rear_port=rearport1, rear_port_position=1
+        )
+        frontport1_2 = FrontPort.objects.create(
+            device=self.device, name="Front Port 1:2", rear_port=rearport1, rear_port_position=2
+        )
+        frontport2_1 = FrontPort.objects.create(
+            device=self.device, name="Front Port 2:1", rear_port=rearport2, rear_port_position=1
+        )
+        frontport2_2 = FrontPort.objects.create(
+            device=self.device, name="Front Port 2:2", rear_port=rearport2, rear_port_position=2
+        )
+
+        cable1 = Cable.objects.create(termination_a=interface1, termination_b=frontport1_1, status=self.status)
+        cable2 = Cable.objects.create(termination_a=rearport1, termination_b=rearport2, status=self.status)
+        cable3 = Cable.objects.create(termination_a=frontport2_1, termination_b=interface2, status=self.status)
+        cable4 = Cable.objects.create(termination_a=interface3, termination_b=frontport1_2, status=self.status)
+        cable5 = Cable.objects.create(termination_a=frontport2_2, termination_b=interface4, status=self.status)
+        self.assertEqual(CablePath.objects.count(), 4)
+        path1 = self.assertPathExists(
+            origin=interface1,
+            destination=interface2,
+            path=(cable1, frontport1_1, rearport1, cable2, rearport2, frontport2_1, cable3),
+            is_active=True,
+        )
+        path3 = self.assertPathExists(
+            origin=interface3,
+            destination=interface4,
+            path=(cable4, frontport1_2, rearport1, cable2, rearport2, frontport2_2, cable5),
+            is_active=True,
+        )
+
+        # Unaffected paths are not modified
+        updated, deleted = CablePath.retrace(CablePath.objects.filter(path__contains=rearport2), rearport2)
+        self.assertEqual((updated, deleted), ([], 0))
+
+        # Deleting C3 truncates the path from IF1 and deletes the path from IF2
+        cable3.delete()
+        self.assertEqual(CablePath.objects.count(), 3)
+        self.assertPathExists(
+            origin=interface1,
+            destination=None,
+            path=(cable1, frontport1_1, rearport1, cable2, rearport2, frontport2_1),
+            is_active=False,
+        )
+
+        # Connecting FP2:1 to IF5 extends the existing path from IF1 (resuming with the position of FP1:1)
+        cable6 = Cable.objects.create(termination_a=frontport2_1, termination_b=interface5, status=self.status)
+        self.assertEqual(CablePath.objects.count(), 4)
+        self.assertEqual(
+            self.assertPathExists(
+                origin=interface1,
+                destination=interface5,
+                path=(cable1, frontport1_1, rearport1, cable2, rearport2, frontport2_1, cable6),
+                is_active=True,
+            ).pk,
+            path1.pk,
+        )
+        self.assertEqual(
+            self.assertPathExists(
+                origin=interface3,
+                destination=interface4,
+                path=(cable4, frontport1_2, rearport1, cable2, rearport2, frontport2_2, cable5),
+                is_active=True,
+            ).pk,
+            path3.pk,
+        )
+
+    def test_304_retrace_path_invalidates_cache(self):
+        """
+        [IF1] --C1-- [FP1] [RP1] --C2-- [IF2]
+
+        Connecting C2 retraces the existing path from IF1, which must be discarded from the cache along with IF1.
+        """
+        interface1 = Interface.objects.create(device=self.device, name="Interface 1")
+        interface2 = Interface.objects.create(device=self.device, name="Interface 2")
+        rearport1 = RearPort.objects.create(device=self.device, name="Rear Port 1", positions=1)
+        frontport1 = FrontPort.objects.create(
+            device=self.device, name="Front Port 1", rear_port=rearport1, rear_port_position=1
+        )
+        Cable.objects.create(termination_a=interface1, termination_b=frontport1, status=self.status)
+        path1 = CablePath.objects.get(origin_id=interface1.pk)
+
+        with mock.patch("nautobot.dcim.models.cables.invalidate_model") as invalidate_model, mock.patch(
+            "nautobot.dcim.models.cables.invalidate_obj"
+        ) as invalidate_obj:
+            Cable.objects.create(termination_a=rearport1, termination_b=interface2, status=self.status)
+
+        self.assertEqual(CablePath.objects.get(origin_id=interface1.pk).pk, path1.pk)
+        invalidate_model.assert_called_with(CablePath)
+        self.assertIn(mock.call(interface1), invalidate_obj.call_args_list)
+
+
+class CableGraphTestCase(TestCase):
+    """
+    Test that tracing paths using an in-memory CableGraph produces the same CablePaths as `CablePath.from_origin()`.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        [IF1] --C1-- [FP1:1] [RP1] --C2-- [RP2] [FP2:1] --C3-- [IF2]
+        [IF3] --C4-- [FP1:2]                    [FP2:2] --C5-- [CT1A] [CT1Z] --C6-- [IF4] (site 2)
+        [IF5] --C7-- [RP3] (split)
+        [IF6] --C8 (planned)-- [IF7]
+        """
+        cls.site = Site.objects.create(name="Site 1", slug="site-1")
+        cls.site2 = Site.objects.create(name="Site 2", slug="site-2")
+        manufacturer = Manufacturer.objects.create(name="Generic", slug="generic")
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model="Test Device")
+        device_role = DeviceRole.objects.create(name="Device Role", slug="device-role")
+        device_status = Status.objects.get_for_model(Device).get(slug="active")
+        device = Device.objects.create(
+            site=cls.site, device_type=device_type, device_role=device_role, name="Device 1", status=device_status
+        )
+        device2 = Device.objects.create(
+            site=cls.site2, device_type=device_type, device_role=device_role, name="Device 2", status=device_status
+        )
+        provider = Provider.objects.create(name="Provider", slug="provider")
+        circuit_type = CircuitType.objects.create(name="Circuit Type", slug="circuit-type")
+        circuit = Circuit.objects.create(provider=provider, type=circuit_type, cid="Circuit 1")
+        statuses = Status.objects.get_for_model(Cable)
+        status = statuses.get(slug="connected")
+
+        interfaces = [Interface.objects.create(device=device, name=f"Interface {i}") for i in range(1, 8)]
+        interfaces[3].device = device2
+        interfaces[3].save()
+        rearport1 = RearPort.objects.create(device=device, name="Rear Port 1", positions=4)
+        rearport2 = RearPort.objects.create(device=device, name="Rear Port 2", positions=4)
+        rearport3 = RearPort.objects.create(device=device, name="Rear Port 3", positions=4)
+        frontports = [
+            FrontPort.objects.create(
+                device=device, name=f"Front Port {r}:{p}", rear_port=rearport, rear_port_position=p
+            )
+            for r, rearport in ((1, rearport1), (2, rearport2))
+            for p in (1, 2)
+        ]
+        circuittermination1a = CircuitTermination.objects.create(circuit=circuit, site=cls.site, term_side="A")
+        circuittermination1z = CircuitTermination.objects.create(circuit=circuit, site=cls.site2, term_side="Z")
+
+        for a, b, cable_status in (
+            (interfaces[0], frontports[0], status),
+            (rearport1, rearport2, status),
+            (frontports[2], interfaces[1], status),
+            (interfaces[2], frontports[1], status),
+            (frontports[3], circuittermination1a, status),
+            (circuittermination1z, interfaces[3], status),
+            (interfaces[4], rearport3, status),
+            (interfaces[5], interfaces[6], statuses.get(slug="planned")),
+        ):
+            Cable.objects.create(termination_a=a, termination_b=b, status=cable_status)
+
+    def get_cablepaths(self):
+        return {
+            (cp.origin_type_id, cp.origin_id): (
+                cp.destination_type_id,
+                cp.destination_id,
+                cp.path,
+                cp.is_active,
+                cp.is_split,
+            )
+            for cp in CablePath.objects.all()
+        }
+
+    def test_trace(self):
+        expected = self.get_cablepaths()
+        self.assertEqual(len(expected), 9)
+
+        graph = CableGraph()
+        for (ct_id, pk), (destination_type_id, destination_id, path, is_active, is_split) in expected.items():
+            result = graph.trace((ct_id, pk))
+            self.assertEqual(
+                (result.destination or (None, None), result.path, result.is_active, result.is_split),
+                ((destination_type_id, destination_id), path, is_active, is_split),
+            )
+
+        # Interfaces without a cable have no path
+        interface = Interface.objects.create(device=Device.objects.first(), name="Interface 8")
+        self.assertIsNone(graph.trace((ContentType.objects.get_for_model(Interface).pk, interface.pk)))
+
+    def test_trace_site(self):
+        graph = CableGraph(site=self.site)
+        ct_id = ContentType.objects.get_for_model(Interface).pk
+
+        # IF1 does not leave the site; IF3 crosses the circuit to site 2
+        self.assertEqual(graph.trace((ct_id, Interface.objects.get(name="Interface 1").pk)).is_active, True)
+        with self.assertRaises(OutOfScope):
+            graph.trace((ct_id, Interface.objects.get(name="Interface 3").pk))
+
+    def test_bulk_trace_paths(self):
+        expected = self.get_cablepaths()
+        CablePath.objects.all().delete()
+
+        graph = CableGraph(site=self.site)
+        for model in (CircuitTermination, Interface):
+            with mock.patch("nautobot.dcim.tracing.invalidate_model") as invalidate_model:
+                created, failures = bulk_trace_paths(model, model.objects.filter(cable__isnull=False), graph)
+            self.assertEqual(failures, [])
+            # The bulk writes bypass cacheops, so the cached origins and CablePaths are discarded explicitly
+            invalidate_model.assert_has_calls([mock.call(model), mock.call(CablePath)])
+
+        self.assertEqual(self.get_cablepaths(), expected)
+        for cp in CablePath.objects.all():
+            self.assertEqual(cp.origin._path_id, cp.pk)
+
+    def test_prefetch_paths(self):
+        cable_paths = list(CablePath.objects.all())
+        expected = {cp.pk: (cp.get_path(), cp.destination) for cp in cable_paths}
+
+        cable_paths = list(CablePath.objects.all())
+        CablePath.prefetch_paths(cable_paths)
+        with self.assertNumQueries(0):
+            self.assertEqual({cp.pk: (cp.get_path(), cp.destination) for cp in cable_paths}, expected)
+
+    def test_prefetch_path_objects(self):
+        interfaces = list(
+            Interface.objects.filter(_path__isnull=False).prefetch_related(
+                Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects())
+            )
+        )
+        self.assertEqual(len(interfaces), 7)
+
+        with self.assertNumQueries(0):
+            for interface in interfaces:
+                for near_end, cable, far_end in interface.trace():
+                    if isinstance(near_end, CircuitTermination):
+                        near_end.circuit
+                    if far_end is not None:
+                        far_end.parent
+
+    def test_trace_paths_command(self):
+        expected = self.get_cablepaths()
+
+        call_command("trace_paths", force=True, no_input=True, stdout=StringIO())
+
+        self.assertEqual(self.get_cablepaths(), expected)
+        for cp in CablePath.objects.all():
+            self.assertEqual(cp.origin._path_id, cp.pk)
+
+    def test_trace_paths_command_batch_size(self):
+        expected = self.get_cablepaths()
+        CablePath.objects.all().delete()
+
+        call_command("trace_paths", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(self.get_cablepaths(), expected)
+        self.assertIsNone(cache.get(CHECKPOINT_CACHE_KEY))
+
+    def test_trace_paths_command_resume(self):
+        expected = self.get_cablepaths()
+        CablePath.objects.all().delete()
+
+        # Simulate a run interrupted after tracing all CircuitTerminations and the first three Interfaces
+        interface_ids = list(Interface.objects.filter(cable__isnull=False).order_by("pk").values_list("pk", flat=True))
+        checkpoint = {
+            "force": True,
+            "completed": {
+                "circuits.circuittermination": CircuitTermination.objects.order_by("pk").last().pk,
+                "dcim.interface": interface_ids[2],
+            },
+        }
+        cache.set(CHECKPOINT_CACHE_KEY, checkpoint, timeout=None)
+        self.addCleanup(cache.delete, CHECKPOINT_CACHE_KEY)
+
+        out = StringIO()
+        call_command("trace_paths", stdout=out)
+
+        self.assertIn("Resuming interrupted run", out.getvalue())
+        interface_ct_id = ContentType.objects.get_for_model(Interface).pk
+        self.assertEqual(
+            self.get_cablepaths(),
+            {
+                key: value
+                for key, value in expected.items()
+                if key[0] == interface_ct_id and key[1] in interface_ids[3:]
+            },
+        )
+        self.assertIsNone(cache.get(CHECKPOINT_CACHE_KEY))
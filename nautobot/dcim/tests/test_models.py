@@ -1,11 +1,18 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import connection, transaction
 from django.test import TestCase
 
 from nautobot.circuits.models import *
 from nautobot.dcim.choices import *
 from nautobot.dcim.models import *
-from nautobot.extras.models import Status
+from nautobot.extras.context_managers import web_request_context
+from nautobot.extras.models import ObjectChange, Status
 from nautobot.tenancy.models import Tenant
+from nautobot.utilities.utils import UtilizationData
 
 
 class RackGroupTestCase(TestCase):
@@ -175,6 +182,69 @@ class RackTestCase(TestCase):
         )
         self.assertTrue(pdu)
 
+    def _mount_devices(self, rack):
+        """
+        Mount a full-depth 2U device in U1-U2, a half-depth 1U device on the front face in U5, and a half-depth 1U device
+        on the rear face in U6, and reserve U10.
+        """
+        half_depth_type = DeviceType.objects.create(
+            manufacturer=self.manufacturer, model="HalfDepth 1000", slug="hd1000", is_full_depth=False
+        )
+        full_depth_type = DeviceType.objects.create(
+            manufacturer=self.manufacturer, model="FullDepth 2000", slug="fd2000", u_height=2
+        )
+        for device_type, position, face in (
+            (full_depth_type, 1, DeviceFaceChoices.FACE_FRONT),
+            (half_depth_type, 5, DeviceFaceChoices.FACE_FRONT),
+            (half_depth_type, 6, DeviceFaceChoices.FACE_REAR),
+        ):
+            Device.objects.create(
+                device_type=device_type,
+                device_role=self.role["Server"],
+                site=self.site1,
+                rack=rack,
+                position=position,
+                face=face,
+            )
+        RackReservation.objects.create(
+            rack=rack, units=[10], user=get_user_model().objects.create(username="test-user"), description="Reserved"
+        )
+
+    def test_get_available_units(self):
+        self._mount_devices(self.rack)
+        self.rack.u_height = 12
+
+        self.assertEqual(self.rack.get_available_units(), [12, 11, 10, 9, 8, 7, 4, 3])
+        self.assertEqual(
+            self.rack.get_available_units(rack_face=DeviceFaceChoices.FACE_FRONT), [12, 11, 10, 9, 8, 7, 6, 4, 3]
+        )
+        self.assertEqual(
+            self.rack.get_available_units(rack_face=DeviceFaceChoices.FACE_REAR), [12, 11, 10, 9, 8, 7, 5, 4, 3]
+        )
+        self.assertEqual(self.rack.get_available_units(u_height=2), [11, 10, 9, 8, 7, 3])
+        self.assertEqual(
+            self.rack.get_available_units(u_height=3, rack_face=DeviceFaceChoices.FACE_REAR), [10, 9, 8, 7, 3]
+        )
+        self.assertEqual(self.rack.get_available_units(u_height=13), [])
+
+        full_depth_device = Device.objects.get(rack=self.rack, position=1)
+        self.assertEqual(self.rack.get_available_units(u_height=4, exclude=[full_depth_device.pk]), [9, 8, 7, 1])
+
+    def test_annotate_utilization(self):
+        self._mount_devices(self.rack)
+        rack2 = Rack.objects.create(name="TestRack2", site=self.site1, status=self.status, u_height=10)
+        available_2u_count = {self.rack.pk: 36, rack2.pk: 9}
+
+        with self.assertNumQueries(3):
+            racks = list(Rack.objects.annotate_utilization())
+            for rack in racks:
+                self.assertEqual(rack.get_utilization(), rack.utilization)
+                self.assertEqual(len(rack.get_available_units(u_height=2)), available_2u_count[rack.pk])
+
+        self.assertEqual(racks[0].utilization, UtilizationData(numerator=5, denominator=42))
+        self.assertEqual(racks[1].utilization, UtilizationData(numerator=0, denominator=10))
+        self.assertEqual(self.rack.get_utilization(), racks[0].utilization)
+
     def test_change_rack_site(self):
         """
         Check that child Devices get updated when a Rack is moved to a new Site.
@@ -304,6 +374,166 @@ class DeviceTestCase(TestCase):
 
         DeviceBay.objects.get(device=d, name="Device Bay 1")
 
+    def test_defer_component_instantiation(self):
+        """
+        Ensure that the components of many new Devices are created together, with one query per component type.
+        """
+        with Device.defer_component_instantiation():
+            devices = [
+                Device.objects.create(
+                    site=self.site,
+                    device_type=self.device_type,
+                    device_role=self.device_role,
+                    status=self.device_status,
+                    name=f"Test Device {i}",
+                )
+                for i in range(1, 6)
+            ]
+            # Components have not yet been created
+            self.assertFalse(Interface.objects.filter(device__in=devices).exists())
+
+        for device in devices:
+            pp = PowerPort.objects.get(device=device, name="Power Port 1")
+            PowerOutlet.objects.get(device=device, name="Power Outlet 1", power_port=pp)
+            rp = RearPort.objects.get(device=device, name="Rear Port 1")
+            FrontPort.objects.get(device=device, name="Front Port 1", rear_port=rp, rear_port_position=2)
+            for model in (ConsolePort, ConsoleServerPort, Interface, DeviceBay):
+                self.assertEqual(model.objects.filter(device=device).count(), 1)
+
+        # One query per template type and one per component type
+        for model in (
+            ConsolePort,
+            ConsoleServerPort,
+            PowerOutlet,
+            PowerPort,
+            Interface,
+            FrontPort,
+            RearPort,
+            DeviceBay,
+        ):
+            model.objects.filter(device__in=devices).delete()
+        with self.assertNumQueries(16):
+            Device.instantiate_components(devices)
+        self.assertEqual(Interface.objects.filter(device__in=devices).count(), 5)
+
+    def test_defer_component_instantiation_rollback(self):
+        """
+        Ensure that components are not created for Devices whose creation was rolled back.
+        """
+        with Device.defer_component_instantiation():
+            device1 = Device.objects.create(
+                site=self.site,
+                device_type=self.device_type,
+                device_role=self.device_role,
+                status=self.device_status,
+                name="Test Device 1",
+            )
+            try:
+                with transaction.atomic():
+                    Device.objects.create(
+                        site=self.site,
+                        device_type=self.device_type,
+                        device_role=self.device_role,
+                        status=self.device_status,
+                        name="Test Device 2",
+                    )
+                    raise ValidationError("Rolled back")
+            except ValidationError:
+                pass
+
+        self.assertEqual(Device.objects.count(), 1)
+        self.assertEqual(Interface.objects.filter(device=device1).count(), 1)
+        self.assertEqual(Interface.objects.count(), 1)
+
+    def _create_device_tree(self):
+        """
+        Create a parent Device with a child Device installed within it, which has a child Device of its own.
+        """
+        manufacturer = self.device_type.manufacturer
+        parent_type = DeviceType.objects.create(
+            manufacturer=manufacturer,
+            model="Parent Device Type",
+            slug="parent-device-type",
+            subdevice_role=SubdeviceRoleChoices.ROLE_PARENT,
+        )
+        child_type = DeviceType.objects.create(
+            manufacturer=manufacturer,
+            model="Child Device Type",
+            slug="child-device-type",
+            u_height=0,
+            subdevice_role=SubdeviceRoleChoices.ROLE_CHILD,
+        )
+        devices = [
+            Device.objects.create(
+                site=self.site,
+                device_type=device_type,
+                device_role=self.device_role,
+                status=self.device_status,
+                name=f"Test Device {i}",
+            )
+            for i, device_type in enumerate((parent_type, parent_type, child_type), start=1)
+        ]
+        DeviceBay.objects.create(device=devices[0], name="Bay 1", installed_device=devices[1])
+        DeviceBay.objects.create(device=devices[1], name="Bay 1", installed_device=devices[2])
+        return devices
+
+    def test_child_device_site_and_rack(self):
+        """
+        Ensure that child Devices (at any depth) follow their parent Device to a new Site and Rack, with a single change
+        recorded for each.
+        """
+        devices = self._create_device_tree()
+        site = Site.objects.create(name="Test Site 2", slug="test-site-2")
+        rack = Rack.objects.create(name="Test Rack 1", site=site)
+        user = get_user_model().objects.create(username="test-user")
+
+        devices[0].site = site
+        devices[0].rack = rack
+        with web_request_context(user):
+            devices[0].save()
+
+        for device in devices:
+            device.refresh_from_db()
+            self.assertEqual(device.site, site)
+            self.assertEqual(device.rack, rack)
+            self.assertEqual(ObjectChange.objects.filter(changed_object_id=device.pk).count(), 1)
+        self.assertEqual(ObjectChange.objects.get(changed_object_id=devices[2].pk).object_data["site"], str(site.pk))
+
+    def test_move_devices(self):
+        devices = self._create_device_tree()
+        site = Site.objects.create(name="Test Site 2", slug="test-site-2")
+        rack = Rack.objects.create(name="Test Rack 1", site=site)
+
+        # Child Devices can only be moved along with their parents
+        with self.assertRaises(ValidationError):
+            Device.move_devices(Device.objects.filter(pk=devices[1].pk), site)
+        # Devices cannot be moved to a Rack in another Site
+        with self.assertRaises(ValidationError):
+            Device.move_devices(Device.objects.filter(pk=devices[0].pk), self.site, rack)
+
+        moved_pks = Device.move_devices(Device.objects.filter(pk=devices[0].pk), site, rack)
+
+        self.assertEqual(set(moved_pks), {device.pk for device in devices})
+        for device in devices:
+            device.refresh_from_db()
+            self.assertEqual(device.site, site)
+            self.assertEqual(device.rack, rack)
+
+    def test_move_devices_invalidates_cache(self):
+        """
+        Ensure that moving Devices invalidates the cached queries matching both their previous and new Site.
+        """
+        devices = self._create_device_tree()
+        site = Site.objects.create(name="Test Site 2", slug="test-site-2")
+
+        with mock.patch("cacheops.query.invalidate_obj") as invalidate_obj:
+            Device.move_devices(Device.objects.filter(pk=devices[0].pk), site)
+
+        invalidated = {(call.args[0].pk, call.args[0].site_id) for call in invalidate_obj.call_args_list}
+        for device in devices:
+            self.assertIn((device.pk, self.site.pk), invalidated)
+            self.assertIn((device.pk, site.pk), invalidated)
+
     def test_multiple_unnamed_devices(self):
 
         device1 = Device(
@@ -583,3 +813,69 @@ class CableTestCase(TestCase):
         cable = Cable(termination_a=self.interface2, termination_b=wireless_interface)
         with self.assertRaises(ValidationError):
             cable.clean()
+
+
+@mock.patch("nautobot.dcim.models.device_components.transaction.on_commit", lambda func: func())
+class InterfaceConnectedDeviceTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        site = Site.objects.create(name="Test Site 1", slug="test-site-1")
+        manufacturer = Manufacturer.objects.create(name="Test Manufacturer 1", slug="test-manufacturer-1")
+        devicetype = DeviceType.objects.create(
+            manufacturer=manufacturer, model="Test Device Type 1", slug="test-device-type-1"
+        )
+        devicerole = DeviceRole.objects.create(name="Test Device Role 1", slug="test-device-role-1")
+        cls.device1 = Device.objects.create(
+            device_type=devicetype, device_role=devicerole, name="Test Device 1", site=site
+        )
+        cls.device2 = Device.objects.create(
+            device_type=devicetype, device_role=devicerole, name="Test Device 2", site=site
+        )
+        cls.interface1 = Interface.objects.create(device=cls.device1, name="eth0")
+        cls.interface2 = Interface.objects.create(device=cls.device2, name="eth0")
+        cls.cable = Cable.objects.create(
+            termination_a=cls.interface1,
+            termination_b=cls.interface2,
+            status=Status.objects.get_for_model(Cable).get(slug="connected"),
+        )
+
+    def setUp(self):
+        self.peers = [("Test Device 1", "eth0"), ("Test Device 2", "eth0")]
+        cache.delete_many([Interface.get_connected_device_cache_key(*peer) for peer in self.peers])
+
+    def get_connected_device_ids(self, peers):
+        with mock.patch.object(connection, "in_atomic_block", False):
+            return Interface.get_connected_device_ids(peers)
+
+    def test_get_connected_device_ids(self):
+        self.assertEqual(
+            self.get_connected_device_ids(self.peers + [("Test Device 1", "eth1")]),
+            {self.peers[0]: self.device2.pk, self.peers[1]: self.device1.pk},
+        )
+
+        # Results are retrieved from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_connected_device_ids(self.peers[:1]), {self.peers[0]: self.device2.pk})
+
+    def test_cable_deleted(self):
+        self.get_connected_device_ids(self.peers)
+
+        self.cable.delete()
+
+        self.assertEqual(self.get_connected_device_ids(self.peers), {self.peers[0]: None, self.peers[1]: None})
+
+    def test_interface_renamed(self):
+        self.get_connected_device_ids(self.peers)
+
+        self.interface1.name = "eth1"
+        self.interface1.save()
+
+        self.assertEqual(self.get_connected_device_ids(self.peers), {self.peers[1]: self.device1.pk})
+
+    def test_device_renamed(self):
+        self.get_connected_device_ids(self.peers)
+
+        self.device2.name = "Test Device 3"
+        self.device2.save()
+
+        self.assertEqual(self.get_connected_device_ids(self.peers), {self.peers[0]: self.device2.pk})
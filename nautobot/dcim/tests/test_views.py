@@ -1180,6 +1180,23 @@ class DeviceTestCase(ViewTestCases.PrimaryObjectViewTestCase):
         url = reverse("dcim:device_interfaces", kwargs={"pk": device.pk})
         self.assertHttpStatus(self.client.get(url), 200)
 
+    @override_settings(EXEMPT_VIEW_PERMISSIONS=["*"])
+    def test_device_interfaces_connected(self):
+        device, peer_device = Device.objects.all()[:2]
+        status = Status.objects.get_for_model(Cable).get(slug="connected")
+
+        for i in range(1, 4):
+            Cable.objects.create(
+                termination_a=Interface.objects.create(device=device, name=f"Interface {i}"),
+                termination_b=Interface.objects.create(device=peer_device, name=f"Peer Interface {i}"),
+                status=status,
+            )
+
+        url = reverse("dcim:device_interfaces", kwargs={"pk": device.pk})
+        response = self.client.get(url)
+        self.assertHttpStatus(response, 200)
+        self.assertIn("Peer Interface 3", response.content.decode(response.charset))
+
     @override_settings(EXEMPT_VIEW_PERMISSIONS=["*"])
     def test_device_rearports(self):
         device = Device.objects.first()
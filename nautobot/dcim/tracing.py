@@ -0,0 +1,286 @@
+from collections import namedtuple
+
+from cacheops import invalidate_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from nautobot.circuits.models import CircuitTermination
+from nautobot.dcim.models import Cable, CablePath, FrontPort, Interface, RearPort
+from nautobot.dcim.utils import compile_path_node
+
+
+# The result of tracing a path; `destination` is a (content type ID, object ID) tuple, or None
+TraceResult = namedtuple("TraceResult", ["path", "destination", "is_active", "is_split"])
+
+
+class OutOfScope(Exception):
+    """
+    Raised when a trace reaches a node which is not included in a site-scoped CableGraph.
+    """
+
+
+class CableGraph:
+    """
+    An in-memory representation of all Cables, pass-through port mappings, and CircuitTerminations, used to trace
+    CablePaths without querying the database at every hop.
+
+    The graph is loaded using a handful of queries, either for the whole database or for a single Site. When limited
+    to a Site, any trace which leaves the Site (via a Cable or Circuit) raises OutOfScope, and must instead be traced
+    using `CablePath.from_origin()`.
+
+    Nodes are identified by (content type ID, object ID) tuples.
+    """
+
+    def __init__(self, site=None):
+        self.site = site
+        self.cable_ct_id = ContentType.objects.get_for_model(Cable).pk
+        self.frontport_ct_id = ContentType.objects.get_for_model(FrontPort).pk
+        self.rearport_ct_id = ContentType.objects.get_for_model(RearPort).pk
+        self.circuittermination_ct_id = ContentType.objects.get_for_model(CircuitTermination).pk
+
+        # Node => (Cable ID, peer node)
+        self.cables = {}
+        # IDs of Cables whose status is not "connected"
+        self.inactive_cables = set()
+        # FrontPort ID => (RearPort ID, RearPort position)
+        self.frontports = {}
+        # RearPort ID => number of positions
+        self.rearports = {}
+        # (RearPort ID, position) => FrontPort ID
+        self.rearport_frontports = {}
+        # CircuitTermination ID => peer CircuitTermination ID (or None), for CircuitTerminations within the scope
+        self.circuit_peers = {}
+
+        self._load()
+
+    def _load(self):
+        site = self.site
+        circuittermination_ct_id = self.circuittermination_ct_id
+
+        cables = Cable.objects.all()
+        frontports = FrontPort.objects.all()
+        rearports = RearPort.objects.all()
+        circuit_terminations = CircuitTermination.objects.all()
+        if site is not None:
+            site_circuit_terminations = CircuitTermination.objects.filter(site=site).values("pk")
+            cables = cables.filter(
+                Q(_termination_a_device__site=site)
+                | Q(_termination_b_device__site=site)
+                | Q(termination_a_type=circuittermination_ct_id, termination_a_id__in=site_circuit_terminations)
+                | Q(termination_b_type=circuittermination_ct_id, termination_b_id__in=site_circuit_terminations)
+            )
+            frontports = frontports.filter(device__site=site)
+            rearports = rearports.filter(device__site=site)
+            circuit_terminations = circuit_terminations.filter(circuit__terminations__site=site)
+
+        connected_status_id = Cable.STATUS_CONNECTED.pk
+        for pk, a_type_id, a_id, b_type_id, b_id, status_id in (
+            cables.order_by()
+            .values_list(
+                "pk",
+                "termination_a_type_id",
+                "termination_a_id",
+                "termination_b_type_id",
+                "termination_b_id",
+                "status_id",
+            )
+            .iterator()
+        ):
+            self.cables[(a_type_id, a_id)] = (pk, (b_type_id, b_id))
+            self.cables[(b_type_id, b_id)] = (pk, (a_type_id, a_id))
+            if status_id != connected_status_id:
+                self.inactive_cables.add(pk)
+
+        for pk, rear_port_id, position in frontports.order_by().values_list("pk", "rear_port_id", "rear_port_position"):
+            self.frontports[pk] = (rear_port_id, position)
+            self.rearport_frontports[(rear_port_id, position)] = pk
+
+        self.rearports = dict(rearports.order_by().values_list("pk", "positions"))
+
+        circuits = {}
+        in_scope = set()
+        for pk, circuit_id, term_side, site_id in (
+            circuit_terminations.order_by().distinct().values_list("pk", "circuit_id", "term_side", "site_id")
+        ):
+            circuits.setdefault(circuit_id, {})[term_side] = pk
+            if site is None or site_id == site.pk:
+                in_scope.add(pk)
+        for terminations in circuits.values():
+            a_id, z_id = terminations.get("A"), terminations.get("Z")
+            for pk, peer_id in ((a_id, z_id), (z_id, a_id)):
+                if pk in in_scope:
+                    self.circuit_peers[pk] = peer_id
+
+    def trace(self, origin):
+        """
+        Trace the path originating from the given node, as `CablePath.from_origin()` would. Returns a TraceResult, or
+        None if the origin is not connected to a Cable.
+        """
+        if origin not in self.cables:
+            if self.site is not None:
+                # The origin may be connected to a Cable which was not loaded
+                raise OutOfScope(origin)
+            return None
+
+        frontport_ct_id = self.frontport_ct_id
+        rearport_ct_id = self.rearport_ct_id
+        circuittermination_ct_id = self.circuittermination_ct_id
+
+        destination = None
+        path = []
+        position_stack = []
+        is_active = True
+        is_split = False
+
+        node = origin
+        visited_nodes = set()
+        while node in self.cables:
+            if node[1] in visited_nodes:
+                raise ValidationError("a loop is detected in the path")
+            visited_nodes.add(node[1])
+
+            # Follow the cable to its far-end termination
+            cable_id, peer = self.cables[node]
+            if cable_id in self.inactive_cables:
+                is_active = False
+            path.append(compile_path_node(self.cable_ct_id, cable_id))
+            peer_ct_id, peer_id = peer
+
+            # Follow a FrontPort to its corresponding RearPort
+            if peer_ct_id == frontport_ct_id:
+                try:
+                    rear_port_id, position = self.frontports[peer_id]
+                except KeyError:
+                    raise OutOfScope(peer)
+                path.append(compile_path_node(*peer))
+                node = (rearport_ct_id, rear_port_id)
+                if self.rearports[rear_port_id] > 1:
+                    position_stack.append(position)
+                path.append(compile_path_node(*node))
+
+            # Follow a RearPort to its corresponding FrontPort (if any)
+            elif peer_ct_id == rearport_ct_id:
+                try:
+                    positions = self.rearports[peer_id]
+                except KeyError:
+                    raise OutOfScope(peer)
+                path.append(compile_path_node(*peer))
+
+                # Determine the peer FrontPort's position
+                if positions == 1:
+                    position = 1
+                elif position_stack:
+                    position = position_stack.pop()
+                else:
+                    # No position indicated: path has split, so we stop at the RearPort
+                    is_split = True
+                    break
+
+                front_port_id = self.rearport_frontports.get((peer_id, position))
+                if front_port_id is None:
+                    # No corresponding FrontPort found for the RearPort
+                    break
+                node = (frontport_ct_id, front_port_id)
+                path.append(compile_path_node(*node))
+
+            # Follow a CircuitTermination to its peer, if the Circuit has one
+            elif peer_ct_id == circuittermination_ct_id:
+                try:
+                    peer_termination_id = self.circuit_peers[peer_id]
+                except KeyError:
+                    raise OutOfScope(peer)
+                # A Circuit Termination does not require a peer.
+                if peer_termination_id is None:
+                    destination = peer
+                    break
+                node = (circuittermination_ct_id, peer_termination_id)
+                if peer_termination_id not in self.circuit_peers:
+                    raise OutOfScope(node)
+                path.append(compile_path_node(*peer))
+                path.append(compile_path_node(*node))
+
+            # Anything else marks the end of the path
+            else:
+                destination = peer
+                break
+
+        if destination is None:
+            is_active = False
+
+        return TraceResult(path, destination, is_active, is_split)
+
+
+def bulk_trace_paths(model, origins, graph, batch_size=1000, progress_callback=None):
+    """
+    Trace the CablePaths originating from the given objects (a QuerySet of a single PathEndpoint model) using the
+    given CableGraph, replacing any existing CablePaths for those origins. Origins which cannot be traced within the
+    graph's scope are traced using `CablePath.from_origin()` instead.
+
+    CablePaths are written in batches of `batch_size` origins, each in its own transaction, using `bulk_create()`.
+    If given, `progress_callback` is called with the number of origins processed after each batch. Returns a tuple of
+    (number of CablePaths created, list of (origin ID, exception) tuples for any origins which could not be traced).
+    """
+    ct_id = ContentType.objects.get_for_model(model).pk
+    created = 0
+    processed = 0
+    failures = []
+
+    origin_ids = origins.order_by("pk").values_list("pk", flat=True).iterator()
+    while True:
+        batch = [pk for _, pk in zip(range(batch_size), origin_ids)]
+        if not batch:
+            break
+
+        cable_paths = []
+        for pk in batch:
+            try:
+                try:
+                    result = graph.trace((ct_id, pk))
+                except OutOfScope:
+                    cp = CablePath.from_origin(model.objects.get(pk=pk))
+                    result = cp and TraceResult(
+                        cp.path,
+                        (ContentType.objects.get_for_model(cp.destination).pk, cp.destination.pk)
+                        if cp.destination
+                        else None,
+                        cp.is_active,
+                        cp.is_split,
+                    )
+            except ValidationError as e:
+                failures.append((pk, e))
+                continue
+            if result is None:
+                continue
+            cable_paths.append(
+                CablePath(
+                    origin_type_id=ct_id,
+                    origin_id=pk,
+                    destination_type_id=result.destination[0] if result.destination else None,
+                    destination_id=result.destination[1] if result.destination else None,
+                    path=result.path,
+                    is_active=result.is_active,
+                    is_split=result.is_split,
+                )
+            )
+
+        with transaction.atomic():
+            CablePath.objects.filter(origin_type_id=ct_id, origin_id__in=batch).delete()
+            CablePath.objects.bulk_create(cable_paths)
+            # Record a direct reference to each CablePath on its originating object
+            model.objects.bulk_update(
+                [model(pk=cp.origin_id, _path_id=cp.pk) for cp in cable_paths], ["_path"], batch_size=batch_size
+            )
+            if model is Interface:
+                # bulk_create() does not send post_save
+                Interface.invalidate_connected_device_ids(interface_ids=[cp.origin_id for cp in cable_paths])
+        # The bulk update of the origins (and deletion of their previous CablePaths) bypasses cacheops
+        invalidate_model(model)
+        invalidate_model(CablePath)
+        created += len(cable_paths)
+        processed += len(batch)
+        if progress_callback is not None:
+            progress_callback(processed)
+
+    return created, failures
@@ -378,8 +378,10 @@ class RackRoleBulkDeleteView(generic.BulkDeleteView):
 
 
 class RackListView(generic.ObjectListView):
-    queryset = Rack.objects.prefetch_related("site", "group", "tenant", "role", "devices__device_type").annotate(
-        device_count=count_related(Device, "rack")
+    queryset = (
+        Rack.objects.prefetch_related("site", "group", "tenant", "role")
+        .annotate(device_count=count_related(Device, "rack"))
+        .annotate_utilization()
     )
     filterset = filters.RackFilterSet
     filterset_form = forms.RackFilterForm
@@ -1210,7 +1212,7 @@ class DeviceConsolePortsView(generic.ObjectView):
             .filter(device=instance)
             .prefetch_related(
                 "cable",
-                "_path__destination",
+                Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()),
             )
         )
         consoleport_table = tables.DeviceConsolePortTable(data=consoleports, user=request.user, orderable=False)
@@ -1233,7 +1235,7 @@ class DeviceConsoleServerPortsView(generic.ObjectView):
             .filter(device=instance)
             .prefetch_related(
                 "cable",
-                "_path__destination",
+                Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()),
             )
         )
         consoleserverport_table = tables.DeviceConsoleServerPortTable(
@@ -1260,7 +1262,7 @@ class DevicePowerPortsView(generic.ObjectView):
             .filter(device=instance)
             .prefetch_related(
                 "cable",
-                "_path__destination",
+                Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()),
             )
         )
         powerport_table = tables.DevicePowerPortTable(data=powerports, user=request.user, orderable=False)
@@ -1284,7 +1286,7 @@ class DevicePowerOutletsView(generic.ObjectView):
             .prefetch_related(
                 "cable",
                 "power_port",
-                "_path__destination",
+                Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()),
             )
         )
         poweroutlet_table = tables.DevicePowerOutletTable(data=poweroutlets, user=request.user, orderable=False)
@@ -1307,7 +1309,7 @@ class DeviceInterfacesView(generic.ObjectView):
             Prefetch("member_interfaces", queryset=Interface.objects.restrict(request.user)),
             "lag",
             "cable",
-            "_path__destination",
+            Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()),
             "tags",
         )
         interface_table = tables.DeviceInterfaceTable(data=interfaces, user=request.user, orderable=False)
@@ -1466,6 +1468,11 @@ class DeviceBulkImportView(generic.BulkImportView):
     table = tables.DeviceImportTable
     template_name = "dcim/device_import.html"
 
+    def post(self, request):
+        # Create the components of all imported Devices together, rather than as each Device is created
+        with transaction.atomic(), Device.defer_component_instantiation():
+            return super().post(request)
+
 
 class ChildDeviceBulkImportView(generic.BulkImportView):
     queryset = Device.objects.all()
@@ -1504,7 +1511,9 @@ class DeviceBulkDeleteView(generic.BulkDeleteView):
 
 
 class ConsolePortListView(generic.ObjectListView):
-    queryset = ConsolePort.objects.all()
+    queryset = ConsolePort.objects.prefetch_related(
+        Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects())
+    )
     filterset = filters.ConsolePortFilterSet
     filterset_form = forms.ConsolePortFilterForm
     table = tables.ConsolePortTable
@@ -1568,7 +1577,9 @@ class ConsolePortBulkDeleteView(generic.BulkDeleteView):
 
 
 class ConsoleServerPortListView(generic.ObjectListView):
-    queryset = ConsoleServerPort.objects.all()
+    queryset = ConsoleServerPort.objects.prefetch_related(
+        Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects())
+    )
     filterset = filters.ConsoleServerPortFilterSet
     filterset_form = forms.ConsoleServerPortFilterForm
     table = tables.ConsoleServerPortTable
@@ -1632,7 +1643,7 @@ class ConsoleServerPortBulkDeleteView(generic.BulkDeleteView):
 
 
 class PowerPortListView(generic.ObjectListView):
-    queryset = PowerPort.objects.all()
+    queryset = PowerPort.objects.prefetch_related(Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()))
     filterset = filters.PowerPortFilterSet
     filterset_form = forms.PowerPortFilterForm
     table = tables.PowerPortTable
@@ -1696,7 +1707,9 @@ class PowerPortBulkDeleteView(generic.BulkDeleteView):
 
 
 class PowerOutletListView(generic.ObjectListView):
-    queryset = PowerOutlet.objects.all()
+    queryset = PowerOutlet.objects.prefetch_related(
+        Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects())
+    )
     filterset = filters.PowerOutletFilterSet
     filterset_form = forms.PowerOutletFilterForm
     table = tables.PowerOutletTable
@@ -1760,7 +1773,7 @@ class PowerOutletBulkDeleteView(generic.BulkDeleteView):
 
 
 class InterfaceListView(generic.ObjectListView):
-    queryset = Interface.objects.all()
+    queryset = Interface.objects.prefetch_related(Prefetch("_path", queryset=CablePath.objects.prefetch_path_objects()))
     filterset = filters.InterfaceFilterSet
     filterset_form = forms.InterfaceFilterForm
     table = tables.InterfaceTable
@@ -538,6 +538,7 @@ class ObjectChangeSerializer(serializers.ModelSerializer):
             "changed_object_id",
             "changed_object",
             "object_data",
+            "object_data_delta",
         ]
 
     @swagger_serializer_method(serializer_or_field=serializers.DictField)
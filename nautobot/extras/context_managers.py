@@ -6,7 +6,12 @@ from django.core.handlers.wsgi import WSGIRequest
 from django.db.models.signals import m2m_changed, pre_delete, post_save
 from django.test.client import RequestFactory
 
-from nautobot.extras.signals import _handle_changed_object, _handle_deleted_object
+from nautobot.extras.signals import (
+    _handle_changed_object,
+    _handle_deleted_object,
+    begin_change_logging,
+    end_change_logging,
+)
 from nautobot.utilities.utils import curry
 
 
@@ -14,7 +19,8 @@ from nautobot.utilities.utils import curry
 def change_logging(request):
     """
     Enable change logging by connecting the appropriate signals to their receivers before code is run, and
-    disconnecting them afterward.
+    disconnecting them afterward. The changes made are buffered, and recorded together on exit (or in batches, if there
+    are many), with a single change recorded for each object created or updated (see `begin_change_logging()`).
 
     :param request: WSGIRequest object with a unique `id` set
     """
@@ -27,7 +33,12 @@ def change_logging(request):
     m2m_changed.connect(handle_changed_object, dispatch_uid="handle_changed_object")
     pre_delete.connect(handle_deleted_object, dispatch_uid="handle_deleted_object")
 
-    yield
+    buffering = begin_change_logging(request)
+    try:
+        yield
+    finally:
+        if buffering:
+            end_change_logging(request)
 
     # Disconnect change logging signals. This is necessary to avoid recording any errant
     # changes during test cleanup.
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from nautobot.extras import partitioning
+from nautobot.extras.models import ObjectChange
+
+
+class Command(BaseCommand):
+    help = "Partition the changelog table by month, or create the partitions for the coming months if already done"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of months after the current month for which to create partitions (default: 3)",
+        )
+        parser.add_argument(
+            "--no-input",
+            action="store_true",
+            dest="no_input",
+            help="Do not prompt user for any input/confirmation",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning of the changelog is only supported on PostgreSQL")
+
+        if partitioning.is_partitioned():
+            created = partitioning.create_future_partitions(months=options["months_ahead"])
+            for name in created:
+                self.stdout.write(f"Created partition {name}")
+            self.stdout.write(self.style.SUCCESS(f"The changelog is partitioned; created {len(created)} partitions"))
+            return
+
+        if not options["no_input"]:
+            self.stdout.write(self.style.WARNING("WARNING: The changelog will be unavailable while it is partitioned."))
+            self.stdout.write(
+                f"This will copy all {ObjectChange.objects.count()} existing changes into a new partitioned table. "
+                f"Are you sure?"
+            )
+            confirmation = input("Type yes to confirm: ")
+            if confirmation != "yes":
+                self.stdout.write(self.style.SUCCESS("Aborting"))
+                return
+
+        self.stdout.write("Partitioning the changelog...")
+        try:
+            partitioning.partition_table(months_ahead=options["months_ahead"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Partitioned the changelog into {len(partitioning.get_partitions())} monthly partitions"
+            )
+        )
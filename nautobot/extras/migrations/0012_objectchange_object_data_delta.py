@@ -0,0 +1,34 @@
+# Generated by Django 3.1.14 on 2026-10-18 06:13
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extras", "0011_fileattachment_fileproxy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="objectchange",
+            name="object_data_delta",
+            field=models.JSONField(
+                blank=True, editable=False, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="objectchange",
+            name="object_data",
+            field=models.JSONField(
+                blank=True, editable=False, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="objectchange",
+            index=models.Index(
+                fields=["changed_object_type", "changed_object_id", "time"], name="extras_obje_changed_54aa9c_idx"
+            ),
+        ),
+    ]
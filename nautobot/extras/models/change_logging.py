@@ -1,13 +1,20 @@
+import itertools
+import json
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Exists, OuterRef, Q, Subquery
 from django.urls import reverse
+from django.utils import timezone
 
 from nautobot.utilities.utils import serialize_object
 from nautobot.core.models import BaseModel
 from nautobot.extras.choices import *
+from nautobot.utilities.querysets import RestrictedQuerySet
 
 
 #
@@ -40,6 +47,55 @@ class ChangeLoggedModel(models.Model):
         )
 
 
+class ObjectChangeQuerySet(RestrictedQuerySet):
+    """Queryset for `ObjectChange` objects."""
+
+    def within_retention(self):
+        """
+        Exclude changes older than the CHANGELOG_RETENTION period, which are awaiting deletion. When the changelog is
+        partitioned, this also allows the database to skip any expired partitions.
+
+        The cutoff is rounded down to the start of the day, so that the resulting query (and its cached results) can
+        be reused throughout the day.
+        """
+        if not settings.CHANGELOG_RETENTION:
+            return self
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        return self.filter(time__gte=today - timedelta(days=settings.CHANGELOG_RETENTION))
+
+    def snapshot_dependents(self):
+        """
+        Record the complete object data on each change whose object data is reconstructed from the changes in this
+        queryset, so that they may be deleted. Returns the number of changes updated.
+
+        The queryset is expected to hold the oldest changes to each object (such as all changes made before a given
+        time), so that the dependent changes are the oldest remaining change to each object, where that change records
+        only the changed fields. A change whose object data cannot be completely reconstructed is left unmodified.
+        """
+        remaining = self.model.objects.exclude(pk__in=self.order_by().values("pk"))
+        dependents = remaining.filter(
+            object_data__isnull=True,
+            changed_object_id__in=self.order_by().values("changed_object_id"),
+        ).filter(
+            ~Exists(
+                remaining.filter(
+                    changed_object_type=OuterRef("changed_object_type"),
+                    changed_object_id=OuterRef("changed_object_id"),
+                    time__lt=OuterRef("time"),
+                )
+            )
+        )
+
+        updated = []
+        for objectchange in dependents:
+            object_data = objectchange.get_object_data()
+            if objectchange.is_object_data_complete():
+                objectchange.object_data = object_data
+                updated.append(objectchange)
+        self.model.objects.bulk_update(updated, ["object_data"], batch_size=1000)
+        return len(updated)
+
+
 class ObjectChange(BaseModel):
     """
     Record a change to an object and the user account associated with that change. A change record may optionally
@@ -71,7 +127,10 @@ class ObjectChange(BaseModel):
     related_object_id = models.UUIDField(blank=True, null=True)
     related_object = GenericForeignKey(ct_field="related_object_type", fk_field="related_object_id")
     object_repr = models.CharField(max_length=200, editable=False)
-    object_data = models.JSONField(encoder=DjangoJSONEncoder, editable=False)
+    object_data = models.JSONField(encoder=DjangoJSONEncoder, editable=False, blank=True, null=True)
+    object_data_delta = models.JSONField(encoder=DjangoJSONEncoder, editable=False, blank=True, null=True)
+
+    objects = ObjectChangeQuerySet.as_manager()
 
     csv_headers = [
         "time",
@@ -85,10 +144,14 @@ class ObjectChange(BaseModel):
         "related_object_id",
         "object_repr",
         "object_data",
+        "object_data_delta",
     ]
 
     class Meta:
         ordering = ["-time"]
+        indexes = [
+            models.Index(fields=["changed_object_type", "changed_object_id", "time"]),
+        ]
 
     def __str__(self):
         return "{} {} {} by {}".format(
@@ -110,6 +173,9 @@ class ObjectChange(BaseModel):
         if not self.object_repr:
             self.object_repr = str(self.changed_object)
 
+        if self._state.adding:
+            self.encode_object_data_delta()
+
         return super().save(*args, **kwargs)
 
     def get_absolute_url(self):
@@ -128,7 +194,133 @@ class ObjectChange(BaseModel):
             self.related_object_id,
             self.object_repr,
             self.object_data,
+            self.object_data_delta,
         )
 
+    def _get_object_history(self):
+        """
+        Return the changes recorded for the changed object, newest first.
+        """
+        return (
+            ObjectChange.objects.filter(
+                changed_object_type_id=self.changed_object_type_id, changed_object_id=self.changed_object_id
+            )
+            .order_by("-time")
+            .only("pk", "object_data", "object_data_delta")
+        )
+
+    @staticmethod
+    def _merge_object_data(changes):
+        """
+        Merge the object data recorded by the given changes to an object (ordered newest first), back to the most recent
+        full snapshot among them. Returns a tuple of (object data, whether a snapshot was found). If no snapshot was
+        found, the object data includes only the fields recorded by the deltas.
+        """
+        snapshot = None
+        deltas = []
+        for change in changes:
+            if change.object_data is not None:
+                snapshot = change.object_data
+                break
+            deltas.append(change.object_data_delta)
+
+        object_data = dict(snapshot or {})
+        for delta in reversed(deltas):
+            object_data.update(delta)
+        return object_data, snapshot is not None
+
+    @classmethod
+    def encode_object_data_deltas(cls, objectchanges):
+        """
+        Apply `encode_object_data_delta()` to each of the given ObjectChanges, retrieving the preceding changes to all
+        of the changed objects in a single query.
+        """
+        if not settings.CHANGELOG_DIFFS_ENABLED:
+            return
+        objectchanges = [
+            objectchange
+            for objectchange in objectchanges
+            if objectchange.action == ObjectChangeActionChoices.ACTION_UPDATE and objectchange.object_data is not None
+        ]
+        if not objectchanges:
+            return
+
+        # Retrieve the changes to each object back to (and including) its most recent full snapshot
+        query = Q()
+        for objectchange in objectchanges:
+            query |= Q(
+                changed_object_type_id=objectchange.changed_object_type_id,
+                changed_object_id=objectchange.changed_object_id,
+            )
+        latest_snapshot = (
+            ObjectChange.objects.filter(
+                changed_object_type=OuterRef("changed_object_type"),
+                changed_object_id=OuterRef("changed_object_id"),
+                object_data__isnull=False,
+            )
+            .order_by("-time")
+            .values("time")[:1]
+        )
+        histories = {}
+        for change in (
+            ObjectChange.objects.filter(query, time__gte=Subquery(latest_snapshot))
+            .order_by("-time")
+            .only("pk", "changed_object_type_id", "changed_object_id", "object_data", "object_data_delta")
+        ):
+            histories.setdefault((change.changed_object_type_id, change.changed_object_id), []).append(change)
+
+        for objectchange in objectchanges:
+            history = histories.get((objectchange.changed_object_type_id, objectchange.changed_object_id), [])
+            objectchange._encode_object_data_delta(history)
+
+    def encode_object_data_delta(self):
+        """
+        If CHANGELOG_DIFFS_ENABLED is set, replace the object data of an update with only the fields which differ from
+        the object data of the preceding change to the object (in `object_data_delta`). The full object data is kept
+        for creations and deletions, and as a checkpoint at every CHANGELOG_DIFFS_CHECKPOINT_INTERVAL changes to the
+        object.
+        """
+        self.encode_object_data_deltas([self])
+
+    def _encode_object_data_delta(self, history):
+        """
+        Encode the object data of this change as a delta, given the preceding changes to the object (newest first).
+        """
+        # A snapshot is due unless one is found among the preceding (CHANGELOG_DIFFS_CHECKPOINT_INTERVAL - 1) changes
+        history = history[: max(settings.CHANGELOG_DIFFS_CHECKPOINT_INTERVAL - 1, 0)]
+        previous_data, found = self._merge_object_data(history)
+        if not found or set(previous_data) - set(self.object_data):
+            return
+
+        # Compare the object data as it will be stored
+        object_data = json.loads(json.dumps(self.object_data, cls=DjangoJSONEncoder))
+        self.object_data_delta = {
+            key: value for key, value in object_data.items() if key not in previous_data or previous_data[key] != value
+        }
+        self.object_data = None
+
+    def get_object_data(self):
+        """
+        Return the complete object data following this change. If only the changed fields were recorded, the object
+        data is reconstructed from the preceding changes to the object, back to the most recent full snapshot. If that
+        snapshot no longer exists, only the fields recorded since are returned (see `is_object_data_complete()`).
+        """
+        if self.object_data is not None:
+            return self.object_data
+        if not hasattr(self, "_object_data"):
+            history = self._get_object_history().filter(time__lt=self.time).iterator()
+            self._object_data, self._object_data_complete = self._merge_object_data(itertools.chain([self], history))
+        return self._object_data
+
+    def is_object_data_complete(self):
+        """
+        Return False if the object data returned by `get_object_data()` is incomplete, as the full snapshot from which
+        it would be reconstructed no longer exists.
+        """
+        if self.object_data is not None:
+            return True
+        self.get_object_data()
+        return self._object_data_complete
+
     def get_action_class(self):
         return ObjectChangeActionChoices.CSS_CLASSES.get(self.action)
@@ -0,0 +1,196 @@
+"""
+Optional monthly range partitioning of the ObjectChange table by `time`, using PostgreSQL declarative partitioning.
+
+A partitioned changelog is made up of one partition per calendar month (UTC), named `<table>_<YYYYMM>`, and a default
+partition which receives any changes outside of those months. Expired changes can then be removed by dropping whole
+partitions, rather than deleting individual rows.
+"""
+import datetime
+import re
+
+from cacheops import invalidate_model
+from django.db import connection, transaction
+
+from nautobot.extras.models import ObjectChange
+
+
+def _get_table():
+    return ObjectChange._meta.db_table
+
+
+def get_month_start(value, months=0):
+    """
+    Return the start of the (UTC) month containing the given date or datetime, offset by the given number of months.
+    """
+    month = value.year * 12 + value.month - 1 + months
+    return datetime.datetime(month // 12, month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def get_partition_name(month_start):
+    """
+    Return the name of the partition holding the changes made in the month beginning at `month_start`.
+    """
+    return f"{_get_table()}_{month_start:%Y%m}"
+
+
+def is_partitioned():
+    """
+    Return True if the ObjectChange table is partitioned.
+    """
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [_get_table()]
+        )
+        return cursor.fetchone()[0]
+
+
+def get_partitions():
+    """
+    Return a list of (name, month start) tuples for the monthly partitions of the ObjectChange table, oldest first.
+    The default partition is not included.
+    """
+    pattern = re.compile(rf"^{re.escape(_get_table())}_(\d{{4}})(\d{{2}})$")
+    partitions = []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass",
+            [_get_table()],
+        )
+        for (name,) in cursor.fetchall():
+            match = pattern.match(name)
+            if match:
+                year, month = match.groups()
+                partitions.append((name, datetime.datetime(int(year), int(month), 1, tzinfo=datetime.timezone.utc)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partitions(start, end):
+    """
+    Create any missing monthly partitions for the months from `start` up to and including `end`. Returns a list of the
+    names of the partitions created.
+
+    A partition cannot be created while the default partition holds changes within its month, so partitions should be
+    created before the months they cover begin.
+    """
+    quote_name = connection.ops.quote_name
+    existing = {name for name, _ in get_partitions()}
+    created = []
+    month_start = get_month_start(start)
+    with connection.cursor() as cursor:
+        while month_start <= end:
+            month_end = get_month_start(month_start, months=1)
+            name = get_partition_name(month_start)
+            if name not in existing:
+                cursor.execute(
+                    f"CREATE TABLE {quote_name(name)} PARTITION OF {quote_name(_get_table())} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [month_start.isoformat(), month_end.isoformat()],
+                )
+                created.append(name)
+            month_start = month_end
+    return created
+
+
+def create_future_partitions(months=3):
+    """
+    Create any missing monthly partitions for the current month and the given number of months after it. Returns a
+    list of the names of the partitions created.
+    """
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    return create_partitions(now, get_month_start(now, months=months))
+
+
+def drop_partitions(before):
+    """
+    Drop the monthly partitions which hold only changes made before the given datetime. Returns the number of changes
+    deleted.
+
+    Any remaining change which records only the changed fields of an object, and which would otherwise depend on the
+    full snapshot held by a dropped partition, first has its complete object data recorded.
+    """
+    quote_name = connection.ops.quote_name
+    expired = [
+        (name, month_start)
+        for name, month_start in get_partitions()
+        if get_month_start(month_start, months=1) <= before
+    ]
+    if not expired:
+        return 0
+
+    deleted = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Changes which record only the changed fields must not be left without the snapshot they build on
+        ObjectChange.objects.filter(time__lt=get_month_start(expired[-1][1], months=1)).snapshot_dependents()
+        for name, _ in expired:
+            cursor.execute(f"SELECT COUNT(*) FROM {quote_name(name)}")
+            deleted += cursor.fetchone()[0]
+            cursor.execute(f"DROP TABLE {quote_name(name)}")
+    if deleted:
+        invalidate_model(ObjectChange)
+    return deleted
+
+
+@transaction.atomic
+def partition_table(months_ahead=3):
+    """
+    Convert the ObjectChange table into a partitioned table, with monthly partitions covering all existing changes and
+    the next `months_ahead` months, and a default partition.
+
+    The existing table is renamed, and its rows are copied into the new partitioned table before it is dropped. The
+    changelog cannot be read or written while it is converted. As PostgreSQL requires the primary key of a partitioned
+    table to include the partition key, the primary key becomes (`id`, `time`). All other indexes, check constraints,
+    and foreign keys are recreated on the new table.
+    """
+    table = _get_table()
+    old_table = f"{table}_unpartitioned"
+    quote_name = connection.ops.quote_name
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) FROM pg_constraint WHERE confrelid = %s::regclass", [table])
+        if cursor.fetchone()[0]:
+            raise ValueError(f"The {table} table cannot be partitioned while it is referenced by foreign keys")
+
+        # Record the definitions of the table's indexes (other than its primary key) and foreign keys
+        cursor.execute(
+            "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass AND NOT indisprimary",
+            [table],
+        )
+        indexes = [definition for (definition,) in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [table])
+        (primary_key,) = cursor.fetchone()
+
+        # Create the partitioned table alongside the existing table, and copy all changes into it
+        cursor.execute(f"ALTER TABLE {quote_name(table)} RENAME TO {quote_name(old_table)}")
+        cursor.execute(
+            f"CREATE TABLE {quote_name(table)} "
+            f"(LIKE {quote_name(old_table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f'PARTITION BY RANGE ("time")'
+        )
+        cursor.execute(f'SELECT MIN("time") FROM {quote_name(old_table)}')
+        earliest = cursor.fetchone()[0]
+        if earliest is not None:
+            create_partitions(earliest, datetime.datetime.now(tz=datetime.timezone.utc))
+        create_future_partitions(months=months_ahead)
+        cursor.execute(f"CREATE TABLE {quote_name(table + '_default')} PARTITION OF {quote_name(table)} DEFAULT")
+        cursor.execute(f"INSERT INTO {quote_name(table)} SELECT * FROM {quote_name(old_table)}")
+        cursor.execute(f"DROP TABLE {quote_name(old_table)}")
+
+        # Recreate the table's constraints and indexes once the old table (and so its index names) are gone
+        cursor.execute(
+            f'ALTER TABLE {quote_name(table)} ADD CONSTRAINT {quote_name(primary_key)} PRIMARY KEY ("id", "time")'
+        )
+        for definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f"ALTER TABLE {quote_name(table)} ADD CONSTRAINT {quote_name(name)} {definition}")
+
+    invalidate_model(ObjectChange)
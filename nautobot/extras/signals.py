@@ -1,17 +1,13 @@
 import os
-import random
 import shutil
 import uuid
 import logging
-from datetime import timedelta
 
 from cacheops.signals import cache_invalidated, cache_read
-from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from django.db import transaction
+from django.db import connections, transaction
 from django.db.models.signals import m2m_changed, pre_delete
 from django.dispatch import receiver
-from django.utils import timezone
 from django_prometheus.models import model_deletes, model_inserts, model_updates
 from prometheus_client import Counter
 
@@ -41,6 +37,176 @@ def _get_user_if_authenticated(request, objectchange):
         logger.warning(f"Unable to retrieve the user while creating the changelog for {objectchange.changed_object}")
 
 
+class _CommitMarker:
+    """
+    Callback registered with `transaction.on_commit()` to track whether a change made within a transaction has been
+    committed, or has been discarded by the rollback of the transaction (or of a savepoint within it).
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.committed = False
+        transaction.on_commit(self, using=using)
+
+    def __call__(self):
+        self.committed = True
+
+    def is_discarded(self, registered_callbacks=None):
+        """
+        Return True if the change has been discarded. `registered_callbacks` optionally specifies the set of callbacks
+        currently registered with the connection, to avoid retrieving them for each of many markers.
+        """
+        if self.committed:
+            return False
+        # Callbacks registered within a transaction or savepoint which is rolled back are discarded by Django
+        if registered_callbacks is None:
+            # Search from the most recently registered callbacks, which this is likely to be among
+            run_on_commit = transaction.get_connection(self.using).run_on_commit
+            return not any(func is self for _, func in reversed(run_on_commit))
+        return self not in registered_callbacks
+
+    @staticmethod
+    def get_registered_callbacks(using):
+        return {func for _, func in transaction.get_connection(using).run_on_commit}
+
+
+class _PendingObjectChange:
+    """
+    A change to an object which has yet to be recorded, along with the transaction state in which it was made.
+    """
+
+    def __init__(self, instance):
+        self.objectchange = None
+        using = instance._state.db or "default"
+        connection = transaction.get_connection(using)
+        if connection.in_atomic_block:
+            self.marker = _CommitMarker(using)
+            self.savepoint_ids = set(connection.savepoint_ids)
+        else:
+            self.marker = None
+            self.savepoint_ids = None
+
+    def is_discarded(self, registered_callbacks=None):
+        return self.marker is not None and self.marker.is_discarded(registered_callbacks)
+
+    def supersedes(self, other):
+        """
+        Return True if the other (earlier) change no longer needs to be retained: that is, unless this change was made
+        within a savepoint (which may yet be rolled back) that the other change was not made within.
+        """
+        if self.marker is None:
+            return True
+        if other.marker is None or other.marker.committed:
+            return False
+        return self.savepoint_ids <= other.savepoint_ids
+
+
+# ObjectChanges yet to be recorded for each request in progress (keyed by request ID); see begin_change_logging()
+_pending_object_changes = {}
+
+# The savepoints of each database connection in effect when change logging began for each request in progress
+_change_logging_savepoints = {}
+
+# The number of objects whose changes may be buffered for a request before they are recorded
+_MAX_PENDING_OBJECT_CHANGES = 1000
+
+
+def begin_change_logging(request):
+    """
+    Begin buffering the changes made during the given request, to be recorded by `end_change_logging()`.
+
+    Rather than creating an ObjectChange each time an object is saved, a single change is kept for each object: any
+    later update to the object replaces an earlier creation or update of it (retaining the "create" action in the
+    former case), so that its final state is recorded. Changes made within a transaction or savepoint which is rolled
+    back are discarded. Returns False if the changes made during the request are already being buffered.
+
+    To bound the memory used by long-running requests (such as jobs), the buffered changes are also recorded whenever
+    changes to more than `_MAX_PENDING_OBJECT_CHANGES` objects have been buffered, unless a savepoint entered since
+    change logging began is still in effect: as the records would be created within it, rolling it back would discard
+    the records of earlier changes as well.
+    """
+    if request.id in _pending_object_changes:
+        return False
+    _pending_object_changes[request.id] = {}
+    _change_logging_savepoints[request.id] = {alias: list(connections[alias].savepoint_ids) for alias in connections}
+    return True
+
+
+def end_change_logging(request):
+    """
+    Record the changes buffered for the given request since `begin_change_logging()` was called, and stop buffering.
+    """
+    _change_logging_savepoints.pop(request.id, None)
+    _record_pending_object_changes(request, _pending_object_changes.pop(request.id, {}))
+
+
+def _record_pending_object_changes(request, pending_changes):
+    """
+    Record the given buffered changes for the given request. The changes are created in a single query, as is the
+    lookup of the preceding changes to each object if CHANGELOG_DIFFS_ENABLED is set.
+    """
+    registered_callbacks = {}
+    objectchanges = []
+    for changes in pending_changes.values():
+        # Record the latest of the changes to each object which has not been rolled back
+        for change in reversed(changes):
+            if change.marker is not None:
+                using = change.marker.using
+                if using not in registered_callbacks:
+                    registered_callbacks[using] = _CommitMarker.get_registered_callbacks(using)
+                if change.is_discarded(registered_callbacks[using]):
+                    continue
+            objectchange = change.objectchange
+            objectchange.user = _get_user_if_authenticated(request, objectchange)
+            objectchange.user_name = objectchange.user.username if objectchange.user else "Undefined"
+            objectchange.request_id = request.id
+            objectchanges.append(objectchange)
+            break
+    ObjectChange.encode_object_data_deltas(objectchanges)
+    ObjectChange.objects.bulk_create(objectchanges)
+
+
+def _record_object_change(request, instance, action):
+    """
+    Buffer a change to the given object to be recorded once the request completes, or (if changes are not being
+    buffered for the request) record it immediately.
+    """
+    pending_changes = _pending_object_changes.get(request.id)
+    if pending_changes is None:
+        objectchange = instance.to_objectchange(action)
+        objectchange.user = _get_user_if_authenticated(request, objectchange)
+        objectchange.request_id = request.id
+        objectchange.save()
+        return
+
+    # Deletions are kept separately, so that the creation or update of an object prior to its deletion is recorded
+    key = (instance._meta.label_lower, instance.pk, action == ObjectChangeActionChoices.ACTION_DELETE)
+    change = _PendingObjectChange(instance)
+    previous_changes = [
+        previous_change for previous_change in pending_changes.get(key, []) if not previous_change.is_discarded()
+    ]
+    if any(
+        previous_change.objectchange.action == ObjectChangeActionChoices.ACTION_CREATE
+        for previous_change in previous_changes
+    ):
+        action = ObjectChangeActionChoices.ACTION_CREATE
+    changes = [previous_change for previous_change in previous_changes if not change.supersedes(previous_change)]
+
+    # The object is serialized now, as any later change to it may yet be rolled back
+    change.objectchange = instance.to_objectchange(action)
+    changes.append(change)
+    pending_changes[key] = changes
+
+    # Record the buffered changes if there are too many, unless a savepoint entered since they began to be buffered is
+    # in effect (see begin_change_logging())
+    if len(pending_changes) > _MAX_PENDING_OBJECT_CHANGES and all(
+        connections[alias].savepoint_ids == savepoint_ids
+        for alias, savepoint_ids in _change_logging_savepoints[request.id].items()
+    ):
+        _pending_object_changes[request.id] = {}
+        _record_pending_object_changes(request, pending_changes)
+
+
 def _handle_changed_object(request, sender, instance, **kwargs):
     """
     Fires when an object is created or updated.
@@ -58,10 +224,7 @@ def _handle_changed_object(request, sender, instance, **kwargs):
 
     # Record an ObjectChange if applicable
     if hasattr(instance, "to_objectchange"):
-        objectchange = instance.to_objectchange(action)
-        objectchange.user = _get_user_if_authenticated(request, objectchange)
-        objectchange.request_id = request.id
-        objectchange.save()
+        _record_object_change(request, instance, action)
 
     # Enqueue webhooks
     enqueue_webhooks(instance, request.user, request.id, action)
@@ -72,11 +235,6 @@ def _handle_changed_object(request, sender, instance, **kwargs):
     elif action == ObjectChangeActionChoices.ACTION_UPDATE:
         model_updates.labels(instance._meta.model_name).inc()
 
-    # Housekeeping: 0.1% chance of clearing out expired ObjectChanges
-    if settings.CHANGELOG_RETENTION and random.randint(1, 1000) == 1:
-        cutoff = timezone.now() - timedelta(days=settings.CHANGELOG_RETENTION)
-        ObjectChange.objects.filter(time__lt=cutoff).delete()
-
 
 def _handle_deleted_object(request, sender, instance, **kwargs):
     """
@@ -84,10 +242,7 @@ def _handle_deleted_object(request, sender, instance, **kwargs):
     """
     # Record an ObjectChange if applicable
     if hasattr(instance, "to_objectchange"):
-        objectchange = instance.to_objectchange(ObjectChangeActionChoices.ACTION_DELETE)
-        objectchange.user = _get_user_if_authenticated(request, objectchange)
-        objectchange.request_id = request.id
-        objectchange.save()
+        _record_object_change(request, instance, ObjectChangeActionChoices.ACTION_DELETE)
 
     # Enqueue webhooks
     enqueue_webhooks(instance, request.user, request.id, ObjectChangeActionChoices.ACTION_DELETE)
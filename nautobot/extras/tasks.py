@@ -1,10 +1,16 @@
+import time
+from datetime import timedelta
 from logging import getLogger
 
 import requests
+from celery.exceptions import SoftTimeLimitExceeded
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.db import transaction
+from django.utils import timezone
 from jinja2.exceptions import TemplateError
+from prometheus_client import Gauge
 
 from nautobot.core.celery import nautobot_task
 from nautobot.extras.choices import CustomFieldTypeChoices, ObjectChangeActionChoices
@@ -13,6 +19,16 @@ from nautobot.extras.utils import generate_signature
 
 logger = getLogger("nautobot.extras.tasks")
 
+# The results of the last changelog purge are cached, so that they can be reported by any process exposing metrics
+CHANGELOG_PURGE_CACHE_KEY = "nautobot.extras.tasks.purge_changelog"
+
+changelog_purged = Gauge("changelog_purged", "Number of expired object changes deleted by the last changelog purge")
+changelog_purged.set_function(lambda: cache.get(CHANGELOG_PURGE_CACHE_KEY, {}).get("purged", 0))
+changelog_purge_backlog = Gauge(
+    "changelog_purge_backlog", "Number of expired object changes remaining after the last changelog purge"
+)
+changelog_purge_backlog.set_function(lambda: cache.get(CHANGELOG_PURGE_CACHE_KEY, {}).get("backlog", 0))
+
 
 @nautobot_task
 def update_custom_field_choice_data(field_id, old_value, new_value):
@@ -168,3 +184,63 @@ def process_webhook(webhook_pk, data, model_name, event, timestamp, username, re
                 response.status_code, response.content
             )
         )
+
+
+@nautobot_task
+def purge_changelog(batch_size=None, batch_delay=None):
+    """
+    Delete the ObjectChanges which are older than the configured retention period, oldest first.
+
+    If the changelog is partitioned, partitions are first created for the coming months, and the partitions of months
+    which have expired entirely are dropped. Other expired changes are deleted in batches, each in its own transaction,
+    pausing between batches to limit the load placed on the database. If the task reaches its soft time limit, it stops
+    after the current batch; the remaining changes are deleted by the next run.
+
+    Args:
+        batch_size (int): The number of changes to delete per batch (default: CHANGELOG_RETENTION_BATCH_SIZE)
+        batch_delay (float): The number of seconds to wait between batches (default: CHANGELOG_RETENTION_BATCH_DELAY)
+
+    Returns:
+        A dictionary with the number of changes deleted (`purged`) and still to be deleted (`backlog`), or None if
+        changes are retained indefinitely. The same counts are reported by the `changelog_purged` and
+        `changelog_purge_backlog` metrics.
+    """
+    from nautobot.extras import partitioning
+    from nautobot.extras.models import ObjectChange
+
+    partitioned = partitioning.is_partitioned()
+    if partitioned:
+        partitioning.create_future_partitions()
+
+    if not settings.CHANGELOG_RETENTION:
+        return None
+
+    if batch_size is None:
+        batch_size = settings.CHANGELOG_RETENTION_BATCH_SIZE
+    if batch_delay is None:
+        batch_delay = settings.CHANGELOG_RETENTION_BATCH_DELAY
+
+    cutoff = timezone.now() - timedelta(days=settings.CHANGELOG_RETENTION)
+    expired = ObjectChange.objects.filter(time__lt=cutoff).order_by("time", "pk")
+    purged = partitioning.drop_partitions(cutoff) if partitioned else 0
+    try:
+        while True:
+            batch = list(expired.values_list("pk", flat=True)[:batch_size])
+            if batch:
+                with transaction.atomic():
+                    # Keep the object data of later changes reconstructable once this batch is gone
+                    changes = ObjectChange.objects.filter(pk__in=batch)
+                    changes.snapshot_dependents()
+                    deleted, _ = changes.delete()
+                purged += deleted
+            if len(batch) < batch_size:
+                break
+            time.sleep(batch_delay)
+    except SoftTimeLimitExceeded:
+        logger.warning("Changelog purge reached its time limit; remaining changes will be deleted by the next run")
+
+    result = {"purged": purged, "backlog": expired.count()}
+    cache.set(CHANGELOG_PURGE_CACHE_KEY, result, timeout=None)
+    logger.info("Deleted %d expired object changes; %d remaining", result["purged"], result["backlog"])
+
+    return result
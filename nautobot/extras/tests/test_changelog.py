@@ -1,13 +1,27 @@
+import json
+import uuid
+from datetime import timedelta
+from io import StringIO
+
 from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 
 from nautobot.dcim.models import Site
 from nautobot.extras.choices import *
+from nautobot.extras import partitioning
+from nautobot.extras.context_managers import web_request_context
 from nautobot.extras.models import CustomField, CustomFieldChoice, ObjectChange, Status, Tag
+from nautobot.extras.tasks import purge_changelog
 from nautobot.utilities.testing import APITestCase
 from nautobot.utilities.testing.utils import post_data
 from nautobot.utilities.testing.views import ModelViewTestCase
+from nautobot.utilities.utils import serialize_object
 
 
 class ChangeLogViewTest(ModelViewTestCase):
@@ -54,11 +68,12 @@ class ChangeLogViewTest(ModelViewTestCase):
         self.assertHttpStatus(response, 302)
 
         site = Site.objects.get(name="Test Site 1")
-        # First OC is the creation; second is the tags update
+        # The creation and the tags update are recorded as a single OC
         oc_list = ObjectChange.objects.filter(
             changed_object_type=ContentType.objects.get_for_model(Site),
             changed_object_id=site.pk,
         ).order_by("time")
+        self.assertEqual(len(oc_list), 1)
         self.assertEqual(oc_list[0].changed_object, site)
         self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_CREATE)
         self.assertEqual(
@@ -69,8 +84,7 @@ class ChangeLogViewTest(ModelViewTestCase):
             oc_list[0].object_data["custom_fields"]["my_field_select"],
             form_data["cf_my_field_select"],
         )
-        self.assertEqual(oc_list[1].action, ObjectChangeActionChoices.ACTION_UPDATE)
-        self.assertEqual(oc_list[1].object_data["tags"], ["Tag 1", "Tag 2"])
+        self.assertEqual(oc_list[0].object_data["tags"], ["Tag 1", "Tag 2"])
 
     def test_update_object(self):
         site = Site(
@@ -192,16 +206,16 @@ class ChangeLogAPITest(APITestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
 
         site = Site.objects.get(pk=response.data["id"])
-        # First OC is the creation; second is the tags update
+        # The creation and the tags update are recorded as a single OC
         oc_list = ObjectChange.objects.filter(
             changed_object_type=ContentType.objects.get_for_model(Site),
             changed_object_id=site.pk,
         ).order_by("time")
+        self.assertEqual(len(oc_list), 1)
         self.assertEqual(oc_list[0].changed_object, site)
         self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_CREATE)
         self.assertEqual(oc_list[0].object_data["custom_fields"], data["custom_fields"])
-        self.assertEqual(oc_list[1].action, ObjectChangeActionChoices.ACTION_UPDATE)
-        self.assertEqual(oc_list[1].object_data["tags"], ["Tag 1", "Tag 2"])
+        self.assertEqual(oc_list[0].object_data["tags"], ["Tag 1", "Tag 2"])
 
     def test_update_object(self):
         """Test PUT with changelogs."""
@@ -301,3 +315,197 @@ class ChangeLogAPITest(APITestCase):
         self.assertEqual(oc.object_data["custom_fields"]["my_field"], "ABC")
         self.assertEqual(oc.object_data["custom_fields"]["my_field_select"], "Bar")
         self.assertEqual(oc.object_data["tags"], ["Tag 1", "Tag 2"])
+
+
+class ChangeLogRetentionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        site = Site.objects.create(name="Test Site 1", slug="test-site-1")
+        for i in range(0, 5):
+            objectchange = site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+            objectchange.request_id = uuid.uuid4()
+            objectchange.save()
+        # Expire the three oldest changes
+        now = timezone.now()
+        for i, pk in enumerate(ObjectChange.objects.order_by("time").values_list("pk", flat=True)[:3]):
+            ObjectChange.objects.filter(pk=pk).update(time=now - timedelta(days=100 - i))
+
+    @override_settings(CHANGELOG_RETENTION=90)
+    def test_purge_changelog(self):
+        expired = list(ObjectChange.objects.filter(time__lt=timezone.now() - timedelta(days=90)))
+
+        self.assertEqual(purge_changelog(batch_size=2, batch_delay=0), {"purged": 3, "backlog": 0})
+        self.assertEqual(ObjectChange.objects.count(), 2)
+        self.assertFalse(ObjectChange.objects.filter(pk__in=[oc.pk for oc in expired]).exists())
+
+    @override_settings(CHANGELOG_RETENTION=0)
+    def test_purge_changelog_retained_indefinitely(self):
+        self.assertIsNone(purge_changelog())
+        self.assertEqual(ObjectChange.objects.count(), 5)
+
+
+class ChangeLogPartitioningTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        site = Site.objects.create(name="Test Site 1", slug="test-site-1")
+        now = timezone.now()
+        cls.times = [now - timedelta(days=400), now - timedelta(days=95), now]
+        for change_time in cls.times:
+            objectchange = site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE)
+            objectchange.request_id = uuid.uuid4()
+            objectchange.save()
+            ObjectChange.objects.filter(pk=objectchange.pk).update(time=change_time)
+
+    def setUp(self):
+        # Check the deferred constraints of the test data now, as a table cannot be altered with checks pending
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    def test_partition_table(self):
+        objectchanges = {oc.pk: oc.object_data for oc in ObjectChange.objects.all()}
+        self.assertFalse(partitioning.is_partitioned())
+
+        partitioning.partition_table(months_ahead=2)
+
+        self.assertTrue(partitioning.is_partitioned())
+        self.assertEqual({oc.pk: oc.object_data for oc in ObjectChange.objects.all()}, objectchanges)
+        partitions = [name for name, _ in partitioning.get_partitions()]
+        for change_time in self.times:
+            self.assertIn(partitioning.get_partition_name(partitioning.get_month_start(change_time)), partitions)
+        self.assertEqual(
+            partitions[-1], partitioning.get_partition_name(partitioning.get_month_start(self.times[-1], months=2))
+        )
+
+        # New changes are stored in the partitioned table
+        objectchange = Site.objects.first().to_objectchange(ObjectChangeActionChoices.ACTION_DELETE)
+        objectchange.request_id = uuid.uuid4()
+        objectchange.save()
+        self.assertEqual(ObjectChange.objects.filter(time__gte=self.times[-1]).count(), 2)
+
+    def test_partition_changelog_command(self):
+        call_command("partition_changelog", "--no-input", stdout=StringIO())
+        self.assertTrue(partitioning.is_partitioned())
+
+        # Once partitioned, the command creates any missing partitions for the coming months
+        next_month = partitioning.get_month_start(timezone.now(), months=4)
+        call_command("partition_changelog", "--months-ahead", "4", stdout=StringIO())
+        self.assertIn(partitioning.get_partition_name(next_month), [name for name, _ in partitioning.get_partitions()])
+
+    @override_settings(CHANGELOG_RETENTION=90)
+    def test_purge_changelog(self):
+        partitioning.partition_table()
+        expired_partition = partitioning.get_partition_name(partitioning.get_month_start(self.times[0]))
+
+        self.assertEqual(purge_changelog(batch_delay=0), {"purged": 2, "backlog": 0})
+        self.assertEqual(ObjectChange.objects.count(), 1)
+        self.assertNotIn(expired_partition, [name for name, _ in partitioning.get_partitions()])
+
+
+@override_settings(CHANGELOG_DIFFS_ENABLED=True, CHANGELOG_DIFFS_CHECKPOINT_INTERVAL=3)
+class ChangeLogDiffsTest(ModelViewTestCase):
+    model = ObjectChange
+
+    def test_change_log_diffs(self):
+        user = self.user
+        with web_request_context(user):
+            site = Site.objects.create(name="Test Site 1", slug="test-site-1")
+        snapshots = [serialize_object(site)]
+        for i in range(1, 5):
+            with web_request_context(user):
+                site.description = f"Description {i}"
+                site.save()
+            snapshots.append(serialize_object(site))
+
+        objectchanges = list(ObjectChange.objects.order_by("time"))
+        self.assertEqual(len(objectchanges), 5)
+
+        # Only updates record the changed fields, with a full snapshot at every third change
+        self.assertEqual(
+            [oc.object_data is None for oc in objectchanges],
+            [False, True, True, False, True],
+        )
+        self.assertEqual(set(objectchanges[1].object_data_delta), {"description", "last_updated"})
+        self.assertEqual(objectchanges[1].object_data_delta["description"], "Description 1")
+        for objectchange, snapshot in zip(objectchanges, snapshots):
+            self.assertEqual(objectchange.get_object_data(), json.loads(json.dumps(snapshot, cls=DjangoJSONEncoder)))
+
+        # The full object data, and the changes since the previous change, are shown
+        self.add_permissions("extras.view_objectchange")
+        response = self.client.get(objectchanges[2].get_absolute_url())
+        self.assertHttpStatus(response, 200)
+        self.assertIn("Description 1", response.content.decode())
+        self.assertIn("test-site-1", response.content.decode())
+
+    def test_change_log_diffs_creation_and_deletion(self):
+        with web_request_context(self.user):
+            site = Site.objects.create(name="Test Site 1", slug="test-site-1")
+        with web_request_context(self.user):
+            site.delete()
+
+        for objectchange in ObjectChange.objects.all():
+            self.assertIsNotNone(objectchange.object_data)
+            self.assertIsNone(objectchange.object_data_delta)
+
+    def _create_site_history(self):
+        """
+        Create a Site and update it four times, returning the expected object data of each change.
+        """
+        with web_request_context(self.user):
+            site = Site.objects.create(name="Test Site 1", slug="test-site-1")
+        snapshots = [serialize_object(site)]
+        for i in range(1, 5):
+            with web_request_context(self.user):
+                site.description = f"Description {i}"
+                site.save()
+            snapshots.append(serialize_object(site))
+        return [json.loads(json.dumps(snapshot, cls=DjangoJSONEncoder)) for snapshot in snapshots]
+
+    def test_encode_object_data_deltas(self):
+        sites = []
+        with web_request_context(self.user):
+            for i in range(1, 4):
+                sites.append(Site.objects.create(name=f"Test Site {i}", slug=f"test-site-{i}"))
+
+        objectchanges = []
+        for site in sites:
+            site.description = "Updated"
+            objectchanges.append(site.to_objectchange(ObjectChangeActionChoices.ACTION_UPDATE))
+
+        # The preceding changes to all of the objects are retrieved in a single query
+        with self.assertNumQueries(1):
+            ObjectChange.encode_object_data_deltas(objectchanges)
+        for objectchange in objectchanges:
+            self.assertIsNone(objectchange.object_data)
+            self.assertEqual(objectchange.object_data_delta, {"description": "Updated"})
+
+    @override_settings(CHANGELOG_RETENTION=90)
+    def test_purge_changelog_keeps_object_data(self):
+        snapshots = self._create_site_history()
+        objectchanges = list(ObjectChange.objects.order_by("time"))
+        for i, objectchange in enumerate(objectchanges[:2]):
+            ObjectChange.objects.filter(pk=objectchange.pk).update(time=timezone.now() - timedelta(days=100 - i))
+
+        self.assertEqual(purge_changelog(batch_delay=0), {"purged": 2, "backlog": 0})
+
+        # The oldest remaining change, which recorded only the changed fields, now records the full object data
+        remaining = list(ObjectChange.objects.order_by("time"))
+        self.assertEqual([oc.pk for oc in remaining], [oc.pk for oc in objectchanges[2:]])
+        self.assertEqual(remaining[0].object_data, snapshots[2])
+        for objectchange, snapshot in zip(remaining, snapshots[2:]):
+            self.assertTrue(objectchange.is_object_data_complete())
+            self.assertEqual(objectchange.get_object_data(), snapshot)
+
+    def test_incomplete_object_data(self):
+        self._create_site_history()
+        objectchanges = list(ObjectChange.objects.order_by("time"))
+        ObjectChange.objects.filter(pk=objectchanges[0].pk).delete()
+
+        objectchange = ObjectChange.objects.get(pk=objectchanges[2].pk)
+        self.assertEqual(objectchange.get_object_data()["description"], "Description 2")
+        self.assertFalse(objectchange.is_object_data_complete())
+        self.assertTrue(ObjectChange.objects.get(pk=objectchanges[3].pk).is_object_data_complete())
+
+        self.add_permissions("extras.view_objectchange")
+        response = self.client.get(objectchange.get_absolute_url())
+        self.assertHttpStatus(response, 200)
+        self.assertIn("The object data is incomplete", response.content.decode())
@@ -1,13 +1,16 @@
+from unittest import mock
+
 import django_rq
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
 from django.test import TestCase
 
 from nautobot.core.celery import app
 from nautobot.dcim.models import Site
 from nautobot.extras.choices import *
 from nautobot.extras.context_managers import web_request_context
-from nautobot.extras.models import ObjectChange, Webhook
+from nautobot.extras.models import ObjectChange, Tag, Webhook
 
 
 # Use the proper swappable User model
@@ -66,6 +69,95 @@ class WebRequestContextTestCase(TestCase):
         self.assertEqual(oc_list[0].changed_object, site)
         self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_CREATE)
 
+    def test_change_log_coalesced(self):
+        """Test that successive changes to an object are recorded as a single change"""
+        with web_request_context(self.user):
+            site = Site(name="Test Site 1", slug="test-site-1")
+            site.save()
+            site.name = "Test Site X"
+            site.save()
+            site.tags.add(Tag.objects.create(name="Tag 1", slug="tag-1"))
+            existing_site = Site.objects.create(name="Test Site 2", slug="test-site-2")
+        site.refresh_from_db()
+
+        with web_request_context(self.user):
+            existing_site.description = "Updated once"
+            existing_site.save()
+            existing_site.description = "Updated twice"
+            existing_site.save()
+
+        oc_list = ObjectChange.objects.filter(changed_object_id=site.pk)
+        self.assertEqual(len(oc_list), 1)
+        self.assertEqual(oc_list[0].action, ObjectChangeActionChoices.ACTION_CREATE)
+        self.assertEqual(oc_list[0].object_data["name"], "Test Site X")
+        self.assertEqual(oc_list[0].object_data["tags"], ["Tag 1"])
+        self.assertEqual(oc_list[0].user, self.user)
+
+        oc_list = ObjectChange.objects.filter(changed_object_id=existing_site.pk).order_by("time")
+        self.assertEqual(len(oc_list), 2)
+        self.assertEqual(oc_list[1].action, ObjectChangeActionChoices.ACTION_UPDATE)
+        self.assertEqual(oc_list[1].object_data["description"], "Updated twice")
+        self.assertNotEqual(oc_list[0].request_id, oc_list[1].request_id)
+
+    def test_change_log_deleted(self):
+        """Test that the creation and deletion of an object are both recorded"""
+        with web_request_context(self.user):
+            site = Site(name="Test Site 1", slug="test-site-1")
+            site.save()
+            site_pk = site.pk
+            site.delete()
+
+        oc_list = ObjectChange.objects.filter(changed_object_id=site_pk).order_by("time")
+        self.assertEqual(
+            [oc.action for oc in oc_list],
+            [ObjectChangeActionChoices.ACTION_CREATE, ObjectChangeActionChoices.ACTION_DELETE],
+        )
+        self.assertEqual(oc_list[1].object_data["name"], "Test Site 1")
+
+    def test_change_log_rolled_back(self):
+        """Test that changes which are rolled back are not recorded"""
+        with web_request_context(self.user):
+            site = Site(name="Test Site 1", slug="test-site-1")
+            site.save()
+            try:
+                with transaction.atomic():
+                    Site.objects.create(name="Test Site 2", slug="test-site-2")
+                    site.name = "Test Site X"
+                    site.save()
+                    raise ValueError
+            except ValueError:
+                pass
+
+        oc_list = ObjectChange.objects.all()
+        self.assertEqual(len(oc_list), 1)
+        self.assertEqual(oc_list[0].changed_object, site)
+        self.assertEqual(oc_list[0].object_data["name"], "Test Site 1")
+
+    @mock.patch("nautobot.extras.signals._MAX_PENDING_OBJECT_CHANGES", 2)
+    def test_change_log_recorded_in_batches(self):
+        """Test that changes are recorded once changes to too many objects have been buffered"""
+        with web_request_context(self.user):
+            sites = [Site.objects.create(name=f"Test Site {i}", slug=f"test-site-{i}") for i in range(1, 4)]
+            self.assertEqual(ObjectChange.objects.count(), 3)
+
+            # Changes made within a savepoint are not recorded until it is released
+            with transaction.atomic():
+                for site in sites:
+                    site.description = "Updated"
+                    site.save()
+                self.assertEqual(ObjectChange.objects.count(), 3)
+            sites[0].description = "Updated twice"
+            sites[0].save()
+            self.assertEqual(ObjectChange.objects.count(), 6)
+
+        oc_list = ObjectChange.objects.filter(changed_object_id=sites[0].pk).order_by("time")
+        self.assertEqual(
+            [oc.action for oc in oc_list],
+            [ObjectChangeActionChoices.ACTION_CREATE, ObjectChangeActionChoices.ACTION_UPDATE],
+        )
+        self.assertEqual(oc_list[1].object_data["description"], "Updated twice")
+        self.assertEqual(ObjectChange.objects.count(), 6)
+
     def test_change_webhook_enqueued(self):
         """Test that the webhook resides on the queue"""
         # TODO(john): come back to this with a way to actually do it without a running worker
@@ -346,6 +346,10 @@ class ObjectChangeListView(generic.ObjectListView):
     template_name = "extras/objectchange_list.html"
     action_buttons = ("export",)
 
+    def get(self, request):
+        self.queryset = self.queryset.within_retention()
+        return super().get(request)
+
 
 class ObjectChangeView(generic.ObjectView):
     queryset = ObjectChange.objects.all()
@@ -366,18 +370,23 @@ class ObjectChangeView(generic.ObjectView):
         next_change = objectchanges.filter(time__gt=instance.time).order_by("time").first()
         prev_change = objectchanges.filter(time__lt=instance.time).order_by("-time").first()
 
+        # Reconstruct the complete object data if only the changed fields were recorded
+        object_data = instance.get_object_data()
         if prev_change:
+            prev_object_data = prev_change.get_object_data()
             diff_added = shallow_compare_dict(
-                prev_change.object_data,
-                instance.object_data,
+                prev_object_data,
+                object_data,
                 exclude=["last_updated"],
             )
-            diff_removed = {x: prev_change.object_data.get(x) for x in diff_added}
+            diff_removed = {x: prev_object_data.get(x) for x in diff_added}
         else:
             # No previous change; this is the initial change that added the object
-            diff_added = diff_removed = instance.object_data
+            diff_added = diff_removed = object_data
 
         return {
+            "object_data": object_data,
+            "object_data_complete": instance.is_object_data_complete(),
             "diff_added": diff_added,
             "diff_removed": diff_removed,
             "next_change": next_change,
@@ -408,6 +417,7 @@ class ObjectChangeLogView(View):
         content_type = ContentType.objects.get_for_model(model)
         objectchanges = (
             ObjectChange.objects.restrict(request.user, "view")
+            .within_retention()
             .prefetch_related("user", "changed_object_type")
             .filter(
                 Q(changed_object_type=content_type, changed_object_id=obj.pk)
@@ -279,11 +279,34 @@ class VLANSerializer(TaggedObjectSerializer, StatusModelSerializerMixin, CustomF
         return data
 
 
+class AvailableVLANSerializer(serializers.Serializer):
+    """
+    Representation of a VLAN ID which is not in use within a VLAN group.
+    """
+
+    vid = serializers.IntegerField(read_only=True)
+    group = NestedVLANGroupSerializer(read_only=True)
+
+    def to_representation(self, instance):
+        group = NestedVLANGroupSerializer(self.context["group"], context={"request": self.context["request"]}).data
+        return OrderedDict(
+            [
+                ("vid", instance),
+                ("group", group),
+            ]
+        )
+
+
 #
 # Prefixes
 #
 
 
+class PrefixUtilizationSerializer(serializers.Serializer):
+    numerator = serializers.IntegerField(read_only=True)
+    denominator = serializers.IntegerField(read_only=True)
+
+
 class PrefixSerializer(TaggedObjectSerializer, StatusModelSerializerMixin, CustomFieldModelSerializer):
     url = serializers.HyperlinkedIdentityField(view_name="ipam-api:prefix-detail")
     family = ChoiceField(choices=IPAddressFamilyChoices, read_only=True)
@@ -293,6 +316,7 @@ class PrefixSerializer(TaggedObjectSerializer, StatusModelSerializerMixin, Custo
     tenant = NestedTenantSerializer(required=False, allow_null=True)
     vlan = NestedVLANSerializer(required=False, allow_null=True)
     role = NestedRoleSerializer(required=False, allow_null=True)
+    utilization = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Prefix
@@ -314,9 +338,16 @@ class PrefixSerializer(TaggedObjectSerializer, StatusModelSerializerMixin, Custo
             "created",
             "last_updated",
             "computed_fields",
+            "utilization",
         ]
         read_only_fields = ["family"]
-        opt_in_fields = ["computed_fields"]
+        opt_in_fields = ["computed_fields", "utilization"]
+
+    @swagger_serializer_method(serializer_or_field=PrefixUtilizationSerializer)
+    def get_utilization(self, obj):
+        # Use the utilization computed by PrefixQuerySet.annotate_utilization(), if available
+        utilization = getattr(obj, "utilization", None) or obj.get_utilization()
+        return PrefixUtilizationSerializer(utilization).data
 
 
 class PrefixLengthSerializer(serializers.Serializer):
@@ -342,6 +373,28 @@ class PrefixLengthSerializer(serializers.Serializer):
         return data
 
 
+class PrefixAllocationSerializer(serializers.Serializer):
+    """
+    Representation of a request to allocate a new Prefix of the given length from within a parent Prefix. Any
+    additional attributes are applied to the new Prefix.
+    """
+
+    parent = serializers.PrimaryKeyRelatedField(queryset=Prefix.objects.all())
+    prefix_length = serializers.IntegerField(min_value=0)
+
+    def validate(self, data):
+        parent, prefix_length = data["parent"], data["prefix_length"]
+        if parent.family == 4 and prefix_length > 32:
+            raise serializers.ValidationError(
+                {"prefix_length": "Invalid prefix length ({}) for IPv4".format(prefix_length)}
+            )
+        elif parent.family == 6 and prefix_length > 128:
+            raise serializers.ValidationError(
+                {"prefix_length": "Invalid prefix length ({}) for IPv6".format(prefix_length)}
+            )
+        return data
+
+
 class AvailablePrefixSerializer(serializers.Serializer):
     """
     Representation of a prefix which does not exist in the database.
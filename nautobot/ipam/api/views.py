@@ -1,9 +1,18 @@
+from contextlib import ExitStack
+from itertools import islice
+
+import netaddr
 from django.conf import settings
 from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.routers import APIRootView
 
@@ -21,6 +30,7 @@ from nautobot.ipam.models import (
     VLANGroup,
     VRF,
 )
+from nautobot.ipam.utils import get_available_prefixes
 from nautobot.utilities.utils import count_related
 from . import serializers
 
@@ -120,8 +130,44 @@ class PrefixViewSet(StatusViewSetMixin, CustomFieldModelViewSet):
     def get_serializer_class(self):
         if self.action == "available_prefixes" and self.request.method == "POST":
             return serializers.PrefixLengthSerializer
+        if self.action == "allocate":
+            return serializers.PrefixAllocationSerializer
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Compute the utilization of the requested Prefixes in bulk if it was opted into via `?include=utilization`
+        include = self.request.query_params.get("include", "").split(",")
+        if "utilization" in include and queryset.model is Prefix:
+            queryset = queryset.annotate_utilization()
+        return queryset
+
+    @staticmethod
+    def get_allocation_lock_name(prefix, name):
+        """
+        Return the name of the lock serializing allocations of `name` ("available-ips" or "available-prefixes") from
+        within the hierarchy of the given Prefix.
+
+        The lock is keyed on the VRF and the outermost Prefix containing (or equal to) `prefix`, so that concurrent
+        allocations from overlapping prefixes are serialized, while allocations from disjoint prefixes may proceed in
+        parallel.
+        """
+        root = (
+            Prefix.objects.net_contains_or_equals(prefix.prefix)
+            .filter(vrf_id=prefix.vrf_id)
+            .order_by("prefix_length", "pk")
+            .values_list("network", "prefix_length")
+            .first()
+        )
+        root = f"{root[0]}/{root[1]}" if root else prefix.prefix
+        return f"{name}.{prefix.vrf_id or 'global'}.{root}"
+
+    def get_allocation_lock(self, prefix, name):
+        """
+        Return a lock serializing allocations of `name` from within the hierarchy of the given Prefix.
+        """
+        return cache.lock(self.get_allocation_lock_name(prefix, name), blocking_timeout=5)
+
     @swagger_auto_schema(method="get", responses={200: serializers.AvailablePrefixSerializer(many=True)})
     @swagger_auto_schema(method="post", responses={201: serializers.PrefixSerializer(many=False)})
     @action(detail=True, url_path="available-prefixes", methods=["get", "post"])
@@ -129,13 +175,13 @@ class PrefixViewSet(StatusViewSetMixin, CustomFieldModelViewSet):
         """
         A convenience method for returning available child prefixes within a parent.
 
-        The advisory lock decorator uses a PostgreSQL advisory lock to prevent this API from being
-        invoked in parallel, which results in a race condition where multiple insertions can occur.
+        Allocations are serialized by a lock scoped to the prefix hierarchy (see `get_allocation_lock()`) to prevent a
+        race condition where multiple insertions of the same prefix or IP address can occur.
         """
         prefix = get_object_or_404(self.queryset, pk=pk)
         if request.method == "POST":
 
-            with cache.lock("available-prefixes", blocking_timeout=5):
+            with self.get_allocation_lock(prefix, "available-prefixes"):
                 available_prefixes = prefix.get_available_prefixes()
 
                 # Validate Requested Prefixes' length
@@ -214,22 +260,23 @@ class PrefixViewSet(StatusViewSetMixin, CustomFieldModelViewSet):
         returned will be equivalent to PAGINATE_COUNT. An arbitrary limit (up to MAX_PAGE_SIZE, if set) may be passed,
         however results will not be paginated.
 
-        The advisory lock decorator uses a PostgreSQL advisory lock to prevent this API from being
-        invoked in parallel, which results in a race condition where multiple insertions can occur.
+        Allocations are serialized by a lock scoped to the prefix hierarchy (see `get_allocation_lock()`) to prevent a
+        race condition where multiple insertions of the same prefix or IP address can occur.
         """
         prefix = get_object_or_404(Prefix.objects.restrict(request.user), pk=pk)
 
         # Create the next available IP within the prefix
         if request.method == "POST":
 
-            with cache.lock("available-ips", blocking_timeout=5):
+            with self.get_allocation_lock(prefix, "available-ips"):
 
                 # Normalize to a list of objects
                 requested_ips = request.data if isinstance(request.data, list) else [request.data]
 
-                # Determine if the requested number of IPs is available
-                available_ips = prefix.get_available_ips()
-                if available_ips.size < len(requested_ips):
+                # Determine if the requested number of IPs is available. (If fewer were found, all available IPs
+                # within the prefix have been exhausted.)
+                available_ips = list(islice(prefix.iter_available_ips(), len(requested_ips)))
+                if len(available_ips) < len(requested_ips):
                     return Response(
                         {
                             "detail": "An insufficient number of IP addresses are available within the prefix {} ({} "
@@ -267,11 +314,7 @@ class PrefixViewSet(StatusViewSetMixin, CustomFieldModelViewSet):
                 limit = min(limit, settings.MAX_PAGE_SIZE)
 
             # Calculate available IPs within the prefix
-            ip_list = []
-            for index, ip in enumerate(prefix.get_available_ips(), start=1):
-                ip_list.append(ip)
-                if index == limit:
-                    break
+            ip_list = list(islice(prefix.iter_available_ips(), limit))
             serializer = serializers.AvailableIPSerializer(
                 ip_list,
                 many=True,
@@ -284,6 +327,109 @@ class PrefixViewSet(StatusViewSetMixin, CustomFieldModelViewSet):
 
             return Response(serializer.data)
 
+    @swagger_auto_schema(
+        method="post",
+        request_body=serializers.PrefixAllocationSerializer(many=True),
+        responses={201: serializers.PrefixSerializer(many=True)},
+    )
+    @action(detail=False, url_path="allocate", methods=["post"])
+    def allocate(self, request):
+        """
+        Allocate new child prefixes from within any number of parent prefixes in a single request. Each requested
+        prefix specifies its `parent` and `prefix_length`, along with any other attributes to be assigned to the new
+        prefix (its VRF is copied from the parent). Requests are fulfilled in order, each from the first available
+        space within its parent; all of the new prefixes are created in a single transaction.
+        """
+        requested_data = request.data if isinstance(request.data, list) else [request.data]
+        allocation_serializer = serializers.PrefixAllocationSerializer(
+            data=requested_data, many=True, context={"request": request}
+        )
+        allocation_serializer.is_valid(raise_exception=True)
+
+        # Parent prefixes must be visible within the view's (permission-restricted) queryset
+        parent_pks = {allocation["parent"].pk for allocation in allocation_serializer.validated_data}
+        parents = {parent.pk: parent for parent in self.queryset.filter(pk__in=parent_pks)}
+        if len(parents) != len(parent_pks):
+            raise Http404
+
+        # Acquire the allocation lock of each affected prefix hierarchy, in a consistent order to avoid deadlocks
+        lock_names = sorted(
+            {self.get_allocation_lock_name(parent, "available-prefixes") for parent in parents.values()}
+        )
+        with ExitStack() as stack:
+            for lock_name in lock_names:
+                stack.enter_context(cache.lock(lock_name, blocking_timeout=5))
+
+            available = get_available_prefixes(parents.values())
+            global_containers = {
+                parent.pk
+                for parent in parents.values()
+                if parent.vrf_id is None and parent.status_id == Prefix.STATUS_CONTAINER.pk
+            }
+
+            requested_prefixes = []
+            requested_parents = []
+            for allocation, data in zip(allocation_serializer.validated_data, requested_data):
+                parent, prefix_length = parents[allocation["parent"].pk], allocation["prefix_length"]
+
+                # Find the first available prefix equal to or larger than the requested size
+                for available_prefix in available[parent.pk].iter_cidrs():
+                    if prefix_length >= available_prefix.prefixlen:
+                        allocated_prefix = netaddr.IPNetwork(f"{available_prefix.network}/{prefix_length}")
+                        break
+                else:
+                    return Response(
+                        {
+                            "detail": "Insufficient space is available within {} to accommodate the requested prefix "
+                            "size(s)".format(parent)
+                        },
+                        status=status.HTTP_204_NO_CONTENT,
+                    )
+
+                # Remove the allocated prefix from the available space of its parent, and of any other requested parent
+                # which contains it
+                for other in parents.values():
+                    if (
+                        other.vrf_id == parent.vrf_id or other.pk in global_containers
+                    ) and allocated_prefix in other.prefix:
+                        available[other.pk].remove(allocated_prefix)
+
+                requested_prefix = {k: v for k, v in data.items() if k not in ("parent", "prefix_length")}
+                requested_prefix["prefix"] = str(allocated_prefix)
+                requested_prefix["vrf"] = parent.vrf_id
+                requested_prefixes.append(requested_prefix)
+                requested_parents.append(parent)
+
+            context = {"request": request}
+            serializer = serializers.PrefixSerializer(data=requested_prefixes, many=True, context=context)
+            serializer.is_valid(raise_exception=True)
+
+            # Create the new Prefixes in bulk, then send post_save for each so that change logging and webhooks apply.
+            # Each new Prefix lies within the available space of its parent, so that is its closest parent; post_save
+            # takes care of adopting any IPAddresses within it, so the hierarchy need not be updated by bulk_create().
+            try:
+                with transaction.atomic():
+                    instances = []
+                    tags = []
+                    for attrs, parent in zip(serializer.validated_data, requested_parents):
+                        attrs = dict(attrs)
+                        tags.append(attrs.pop("tags", None))
+                        instances.append(Prefix(parent=parent, **attrs))
+                    Prefix.objects.bulk_create(instances, update_hierarchy=False)
+                    for instance, instance_tags in zip(instances, tags):
+                        post_save.send(
+                            sender=Prefix, instance=instance, created=True, raw=False, using=instance._state.db
+                        )
+                        if instance_tags:
+                            instance.tags.set(*[t.name for t in instance_tags])
+                    self._validate_objects(instances)
+            except ObjectDoesNotExist:
+                raise PermissionDenied()
+
+        return Response(
+            serializers.PrefixSerializer(instances, many=True, context=context).data, status=status.HTTP_201_CREATED
+        )
+
 
 #
 # IP addresses
@@ -314,6 +460,88 @@ class VLANGroupViewSet(CustomFieldModelViewSet):
     serializer_class = serializers.VLANGroupSerializer
     filterset_class = filters.VLANGroupFilterSet
 
+    @swagger_auto_schema(method="get", responses={200: serializers.AvailableVLANSerializer(many=True)})
+    @swagger_auto_schema(
+        method="post",
+        responses={201: serializers.VLANSerializer(many=True)},
+        request_body=serializers.VLANSerializer(many=True),
+    )
+    @action(
+        detail=True,
+        url_path="available-vlans",
+        methods=["get", "post"],
+        queryset=VLAN.objects.all(),
+    )
+    def available_vlans(self, request, pk=None):
+        """
+        A convenience method for returning available VLAN IDs within a VLAN group. By default, the number of VLAN IDs
+        returned will be equivalent to PAGINATE_COUNT. An arbitrary limit (up to MAX_PAGE_SIZE, if set) may be passed,
+        however results will not be paginated.
+
+        Allocations are serialized by a lock scoped to the VLAN group to prevent a race condition where multiple
+        insertions of the same VLAN ID can occur.
+        """
+        vlan_group = get_object_or_404(VLANGroup.objects.restrict(request.user), pk=pk)
+
+        # Create the next available VLAN(s) within the group
+        if request.method == "POST":
+
+            with cache.lock(f"available-vlans.{vlan_group.pk}", blocking_timeout=5):
+
+                # Normalize to a list of objects
+                requested_vlans = request.data if isinstance(request.data, list) else [request.data]
+
+                # Determine if the requested number of VLAN IDs is available. (If fewer were found, all available VLAN
+                # IDs within the group have been exhausted.)
+                available_vids = list(islice(vlan_group.iter_available_vids(), len(requested_vlans)))
+                if len(available_vids) < len(requested_vlans):
+                    return Response(
+                        {
+                            "detail": "An insufficient number of VLAN IDs are available within the VLAN group {} ({} "
+                            "requested, {} available)".format(vlan_group, len(requested_vlans), len(available_vids))
+                        },
+                        status=status.HTTP_204_NO_CONTENT,
+                    )
+
+                # Assign VLAN IDs from the list of available IDs and copy the site assignment from the group
+                for requested_vlan, vid in zip(requested_vlans, available_vids):
+                    requested_vlan["vid"] = vid
+                    requested_vlan["group"] = vlan_group.pk
+                    requested_vlan["site"] = vlan_group.site_id
+
+                # Initialize the serializer with a list or a single object depending on what was requested
+                context = {"request": request}
+                if isinstance(request.data, list):
+                    serializer = serializers.VLANSerializer(data=requested_vlans, many=True, context=context)
+                else:
+                    serializer = serializers.VLANSerializer(data=requested_vlans[0], context=context)
+
+                # Create the new VLAN(s)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        # Determine the maximum number of VLAN IDs to return
+        else:
+            try:
+                limit = int(request.query_params.get("limit", settings.PAGINATE_COUNT))
+            except ValueError:
+                limit = settings.PAGINATE_COUNT
+            if settings.MAX_PAGE_SIZE:
+                limit = min(limit, settings.MAX_PAGE_SIZE)
+
+            vid_list = list(islice(vlan_group.iter_available_vids(), limit))
+            serializer = serializers.AvailableVLANSerializer(
+                vid_list,
+                many=True,
+                context={
+                    "request": request,
+                    "group": vlan_group,
+                },
+            )
+
+            return Response(serializer.data)
+
 
 #
 # VLANs
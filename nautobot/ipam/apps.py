@@ -4,3 +4,7 @@ from nautobot.core.apps import NautobotConfig
 class IPAMConfig(NautobotConfig):
     name = "nautobot.ipam"
     verbose_name = "IPAM"
+
+    def ready(self):
+        super().ready()
+        import nautobot.ipam.signals  # noqa: F401
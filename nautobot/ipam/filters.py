@@ -501,7 +501,7 @@ class IPAddressFilterSet(
     def filter_address(self, queryset, name, value):
         try:
             return queryset.net_in(value)
-        except ValidationError:
+        except (ValidationError, AddrFormatError):
             return queryset.none()
 
     def filter_mask_length(self, queryset, name, value):
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from nautobot.ipam.models import IPAddress, Prefix, VRF
+from nautobot.ipam.tree import prefix_tree_index, rebuild_hierarchy
+
+
+class Command(BaseCommand):
+    help = "Recalculate the parent Prefix of all Prefixes and IP addresses"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--vrf",
+            action="append",
+            dest="vrfs",
+            metavar="RD_OR_NAME",
+            help="Limit recalculation to the specified VRF (by RD or name); may be given more than once. "
+            'Use "global" for the global table.',
+        )
+
+    def _get_vrf_ids(self, vrfs):
+        """
+        Resolve the VRFs specified on the command line to a set of VRF IDs (with None representing the global table).
+        """
+        vrf_ids = set()
+        for value in vrfs:
+            if value == "global":
+                vrf_ids.add(None)
+                continue
+            vrf = VRF.objects.filter(rd=value).first() or VRF.objects.filter(name=value).first()
+            if vrf is None:
+                raise CommandError(f"Unknown VRF: {value}")
+            vrf_ids.add(vrf.pk)
+        return vrf_ids
+
+    def handle(self, *args, **options):
+        vrf_ids = self._get_vrf_ids(options["vrfs"]) if options["vrfs"] else None
+
+        self.stdout.write("Recalculating prefix hierarchy...")
+        with transaction.atomic():
+            prefix_count, ipaddress_count = rebuild_hierarchy(Prefix, IPAddress, vrf_ids=vrf_ids)
+
+        # Ensure that all processes rebuild their in-memory prefix trees from the database
+        if vrf_ids is None:
+            vrf_ids = [None, *VRF.objects.values_list("pk", flat=True)]
+        for vrf_id in vrf_ids:
+            prefix_tree_index.invalidate(vrf_id)
+
+        self.stdout.write(self.style.SUCCESS(f"  Updated {prefix_count} prefixes and {ipaddress_count} IP addresses"))
+        self.stdout.write(self.style.SUCCESS("Finished."))
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+from nautobot.ipam.tree import rebuild_hierarchy
+
+
+def populate_prefix_hierarchy(apps, schema_editor):
+    """Populate the new "parent" field of all existing Prefixes and IPAddresses."""
+    Prefix = apps.get_model("ipam", "Prefix")
+    IPAddress = apps.get_model("ipam", "IPAddress")
+
+    rebuild_hierarchy(Prefix, IPAddress)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ipam", "0004_fixup_p2p_broadcast"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ipaddress",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="ipam.prefix",
+            ),
+        ),
+        migrations.AddField(
+            model_name="prefix",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="ipam.prefix",
+            ),
+        ),
+        migrations.RunPython(
+            code=populate_prefix_hierarchy,
+            reverse_code=migrations.RunPython.noop,
+        ),
+    ]
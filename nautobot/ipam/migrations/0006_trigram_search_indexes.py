@@ -0,0 +1,60 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+# (table, column) pairs searched case-insensitively by the IPAM `string_search()` querysets
+TRIGRAM_INDEXED_COLUMNS = (
+    ("ipam_aggregate", "description"),
+    ("ipam_prefix", "description"),
+    ("ipam_ipaddress", "description"),
+    ("ipam_ipaddress", "dns_name"),
+)
+
+
+def _get_index_name(table, column):
+    return f"{table}_{column}_trgm"
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    On PostgreSQL, create trigram GIN indexes to accelerate `icontains` lookups on the searched text columns.
+
+    These indexes are an optimization only; if the pg_trgm extension is not available (or cannot be created by the
+    database user), they are skipped.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        return
+
+    for table, column in TRIGRAM_INDEXED_COLUMNS:
+        # Django implements `icontains` on PostgreSQL as `UPPER(column::text) LIKE UPPER(pattern)`
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{_get_index_name(table, column)}" '
+            f'ON "{table}" USING gin ((UPPER("{column}"::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    for table, column in TRIGRAM_INDEXED_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{_get_index_name(table, column)}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ipam", "0005_prefix_hierarchy"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            code=create_trigram_indexes,
+            reverse_code=drop_trigram_indexes,
+        ),
+    ]
@@ -2,9 +2,10 @@ import netaddr
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models
 from django.db.models import F
 from django.urls import reverse
 from django.utils.functional import classproperty
@@ -357,15 +358,59 @@ class Aggregate(PrimaryModel):
         utilization = self.get_utilization()
         return int(utilization.numerator / float(utilization.denominator) * 100)
 
+    @staticmethod
+    def get_utilization_cache_key(pk):
+        return f"nautobot.ipam.aggregate_utilization.{pk}"
+
     def get_utilization(self):
         """Gets the numerator and denominator for calculating utilization of an Aggregrate.
 
+        The numerator is cached, and invalidated whenever a Prefix within this Aggregate is created, modified, or
+        deleted. Within a database transaction, it is always computed from the database.
+
         Returns:
             UtilizationData: Aggregate utilization (numerator=size of child prefixes, denominator=prefix size)
         """
-        queryset = Prefix.objects.net_contained_or_equal(self.prefix)
-        child_prefixes = netaddr.IPSet([p.prefix for p in queryset])
-        return UtilizationData(numerator=child_prefixes.size, denominator=self.prefix.size)
+        if connections[Prefix.objects.db].in_atomic_block:
+            return UtilizationData(numerator=self._get_child_prefix_coverage(), denominator=self.prefix.size)
+
+        cache_key = self.get_utilization_cache_key(self.pk)
+        cached = cache.get(cache_key)
+        # The Aggregate's prefix is stored alongside the numerator in case the Aggregate itself has been modified
+        if cached is not None and cached[0] == self.cidr_str:
+            numerator = cached[1]
+        else:
+            numerator = self._get_child_prefix_coverage()
+            cache.set(cache_key, (self.cidr_str, numerator))
+        return UtilizationData(numerator=numerator, denominator=self.prefix.size)
+
+    def _get_child_prefix_coverage(self):
+        """
+        Return the number of addresses within this Aggregate which are covered by one or more Prefixes.
+
+        Prefixes are streamed from the database in order of network address, and overlapping (or adjacent) ranges are
+        merged as they arrive, so that the child Prefixes are never all held in memory at once.
+        """
+        queryset = (
+            Prefix.objects.net_contained_or_equal(self.prefix)
+            .order_by("network")
+            .values_list("network", "prefix_length")
+        )
+        covered = 0
+        start = end = None
+        for network, prefix_length in queryset.iterator():
+            prefix = netaddr.IPNetwork(f"{network}/{prefix_length}")
+            if prefix.version != self.family:
+                continue
+            if end is not None and prefix.first <= end + 1:
+                end = max(end, prefix.last)
+                continue
+            if end is not None:
+                covered += end - start + 1
+            start, end = prefix.first, prefix.last
+        if end is not None:
+            covered += end - start + 1
+        return covered
 
 
 @extras_features(
@@ -476,6 +521,15 @@ class Prefix(PrimaryModel, StatusModel):
         help_text="All IP addresses within this prefix are considered usable",
     )
     description = models.CharField(max_length=200, blank=True)
+    parent = models.ForeignKey(
+        to="ipam.Prefix",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="The most specific Prefix in the same VRF which contains this Prefix (maintained automatically)",
+    )
 
     objects = PrefixQuerySet.as_manager()
 
@@ -515,9 +569,22 @@ class Prefix(PrimaryModel, StatusModel):
         super(Prefix, self).__init__(*args, **kwargs)
         self._deconstruct_prefix(prefix)
 
+        # Cache the original VRF and prefix so that changes to the prefix hierarchy can be detected
+        self._original_vrf_id = self.__dict__.get("vrf_id")
+        self._original_cidr = self._get_cidr_from_dict()
+
     def __str__(self):
         return str(self.prefix)
 
+    def _get_cidr_from_dict(self):
+        """
+        Return the CIDR string of this Prefix without triggering a database query for any deferred fields.
+        """
+        network, prefix_length = self.__dict__.get("network"), self.__dict__.get("prefix_length")
+        if network is not None and prefix_length is not None:
+            return "%s/%s" % (network, prefix_length)
+        return None
+
     def _deconstruct_prefix(self, pre):
         if pre:
             if isinstance(pre, str):
@@ -538,6 +605,13 @@ class Prefix(PrimaryModel, StatusModel):
     def get_absolute_url(self):
         return reverse("ipam:prefix", args=[self.pk])
 
+    @property
+    def hierarchy_changed(self):
+        """
+        Return True if the VRF or prefix of this Prefix differs from the values it was loaded with.
+        """
+        return self.vrf_id != self._original_vrf_id or self.cidr_str != self._original_cidr
+
     @classproperty
     def STATUS_CONTAINER(cls):
         """Return a cached "container" `Status` object for later reference."""
@@ -623,6 +697,15 @@ class Prefix(PrimaryModel, StatusModel):
         else:
             return Prefix.objects.net_contained(self.prefix).filter(vrf=self.vrf)
 
+    def get_direct_child_prefixes(self):
+        """
+        Return the Prefixes whose closest parent is this Prefix (or a duplicate of it) according to the materialized
+        prefix hierarchy. Together these cover the same address space as all of the child Prefixes within this VRF.
+        """
+        return Prefix.objects.filter(
+            parent__vrf=self.vrf, parent__network=self.network, parent__prefix_length=self.prefix_length
+        )
+
     def get_child_ips(self):
         """
         Return all IPAddresses within this Prefix and VRF. If this Prefix is a container in the global table, return
@@ -637,8 +720,12 @@ class Prefix(PrimaryModel, StatusModel):
         """
         Return all available Prefixes within this prefix as an IPSet.
         """
+        if self.vrf is None and self.status == Prefix.STATUS_CONTAINER:
+            queryset = self.get_child_prefixes()
+        else:
+            queryset = self.get_direct_child_prefixes()
         prefix = netaddr.IPSet(self.prefix)
-        child_prefixes = netaddr.IPSet([child.prefix for child in self.get_child_prefixes()])
+        child_prefixes = netaddr.IPSet([child.prefix for child in queryset])
         available_prefixes = prefix - child_prefixes
 
         return available_prefixes
@@ -665,6 +752,35 @@ class Prefix(PrimaryModel, StatusModel):
         )
         return available_ips
 
+    def iter_available_ips(self):
+        """
+        Yield each available IP within this prefix (as a `netaddr.IPAddress`), in ascending order.
+
+        Rather than building an IPSet of all child IPs, the assigned host addresses are streamed from the database in
+        order and merged against the range of the prefix, so that memory use does not depend on the number of
+        assigned IPs and only as many rows are read as are needed to find the next available IP.
+        """
+        first, last = self.prefix.first, self.prefix.last
+
+        # For "normal" IPv4 prefixes, omit first and last addresses
+        if self.family == 4 and self.prefix.prefixlen < 31 and not self.is_pool:
+            first, last = first + 1, last - 1
+
+        candidate = first
+        hosts = self.get_child_ips().order_by("host").values_list("host", flat=True)
+        for host in hosts.iterator():
+            host = netaddr.IPAddress(host)
+            if host.version != self.family or int(host) < candidate:
+                continue
+            for value in range(candidate, min(int(host), last + 1)):
+                yield netaddr.IPAddress(value, self.family)
+            candidate = int(host) + 1
+            if candidate > last:
+                return
+
+        for value in range(candidate, last + 1):
+            yield netaddr.IPAddress(value, self.family)
+
     def get_first_available_prefix(self):
         """
         Return the first available child prefix within the prefix (or None).
@@ -678,10 +794,10 @@ class Prefix(PrimaryModel, StatusModel):
         """
         Return the first available IP within the prefix (or None).
         """
-        available_ips = self.get_available_ips()
-        if not available_ips:
+        first_available_ip = next(self.iter_available_ips(), None)
+        if first_available_ip is None:
             return None
-        return "{}/{}".format(next(available_ips.__iter__()), self.prefix.prefixlen)
+        return "{}/{}".format(first_available_ip, self.prefix.prefixlen)
 
     def get_utilization(self):
         """Get the child prefix size and parent size.
@@ -692,8 +808,7 @@ class Prefix(PrimaryModel, StatusModel):
             UtilizationData (namedtuple): (numerator, denominator)
         """
         if self.status == Prefix.STATUS_CONTAINER:
-            queryset = Prefix.objects.net_contained(self.prefix).filter(vrf=self.vrf)
-            child_prefixes = netaddr.IPSet([p.prefix for p in queryset])
+            child_prefixes = netaddr.IPSet([p.prefix for p in self.get_direct_child_prefixes()])
             return UtilizationData(numerator=child_prefixes.size, denominator=self.prefix.size)
 
         else:
@@ -782,6 +897,15 @@ class IPAddress(PrimaryModel, StatusModel):
         help_text="Hostname or FQDN (not case-sensitive)",
     )
     description = models.CharField(max_length=200, blank=True)
+    parent = models.ForeignKey(
+        to="ipam.Prefix",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="The most specific Prefix in the same VRF which contains this IP address (maintained automatically)",
+    )
 
     csv_headers = [
         "address",
@@ -815,6 +939,10 @@ class IPAddress(PrimaryModel, StatusModel):
         super(IPAddress, self).__init__(*args, **kwargs)
         self._deconstruct_address(address)
 
+        # Cache the original VRF and host so that changes affecting the parent Prefix can be detected
+        self._original_vrf_id = self.__dict__.get("vrf_id")
+        self._original_host = self.__dict__.get("host")
+
     def __str__(self):
         return str(self.address)
 
@@ -838,6 +966,13 @@ class IPAddress(PrimaryModel, StatusModel):
     def get_absolute_url(self):
         return reverse("ipam:ipaddress", args=[self.pk])
 
+    @property
+    def hierarchy_changed(self):
+        """
+        Return True if the VRF or host of this IPAddress differs from the values it was loaded with.
+        """
+        return self.vrf_id != self._original_vrf_id or self.host != self._original_host
+
     def get_duplicates(self):
         return IPAddress.objects.filter(vrf=self.vrf, host=self.host).exclude(pk=self.pk)
 
@@ -1014,15 +1149,63 @@ class VLANGroup(OrganizationalModel):
             self.description,
         )
 
+    @staticmethod
+    def get_vid_bitmap_cache_key(pk):
+        return f"nautobot.ipam.vlangroup_vids.{pk}"
+
+    def get_vid_bitmap(self):
+        """
+        Return the VLAN IDs in use within the group as a bitmap, in which bit N is set if VLAN ID N is in use.
+
+        The bitmap is cached, and invalidated whenever a VLAN in this group is created, modified, or deleted. Within a
+        database transaction, it is always computed from the database.
+        """
+        use_cache = not connections[VLAN.objects.db].in_atomic_block
+        cache_key = self.get_vid_bitmap_cache_key(self.pk)
+        if use_cache:
+            bitmap = cache.get(cache_key)
+            if bitmap is not None:
+                return bitmap
+
+        bitmap = 0
+        for vid in VLAN.objects.filter(group=self).values_list("vid", flat=True):
+            bitmap |= 1 << vid
+        if use_cache:
+            cache.set(cache_key, bitmap)
+        return bitmap
+
+    def get_available_vid_ranges(self):
+        """
+        Return a list of `(vid, count)` tuples, one for each range of consecutive available VLAN IDs in the group.
+        """
+        bitmap = self.get_vid_bitmap()
+        ranges = []
+        vid = VLAN_VID_MIN
+        while vid <= VLAN_VID_MAX:
+            # Skip to the lowest unset bit at or above `vid`
+            free = ~(bitmap >> vid)
+            vid += (free & -free).bit_length() - 1
+            if vid > VLAN_VID_MAX:
+                break
+            # Find the next set bit above it (if any) to determine the length of the range
+            used = bitmap >> vid
+            end = min(vid + (used & -used).bit_length() - 1 if used else VLAN_VID_MAX + 1, VLAN_VID_MAX + 1)
+            ranges.append((vid, end - vid))
+            vid = end
+        return ranges
+
+    def iter_available_vids(self):
+        """
+        Iterate over the available VLAN IDs (1-4094) in the group, in ascending order.
+        """
+        for vid, count in self.get_available_vid_ranges():
+            yield from range(vid, vid + count)
+
     def get_next_available_vid(self):
         """
         Return the first available VLAN ID (1-4094) in the group.
         """
-        vlan_ids = VLAN.objects.filter(group=self).values_list("vid", flat=True)
-        for i in range(1, 4095):
-            if i not in vlan_ids:
-                return i
-        return None
+        return next(self.iter_available_vids(), None)
 
 
 @extras_features(
@@ -1111,6 +1294,12 @@ class VLAN(PrimaryModel, StatusModel):
         verbose_name = "VLAN"
         verbose_name_plural = "VLANs"
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Cache the original group so that the available VLAN IDs of both groups can be updated if it changes
+        self._original_group_id = self.__dict__.get("group_id")
+
     def __str__(self):
         return self.display or super().__str__()
 
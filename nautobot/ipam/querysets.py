@@ -1,22 +1,19 @@
+import operator
 import re
 import uuid
+from functools import reduce
+from itertools import islice
 
 import netaddr
-from django.db.models import (
-    Count,
-    ExpressionWrapper,
-    IntegerField,
-    F,
-    OuterRef,
-    Subquery,
-    Q,
-    QuerySet,
-    UUIDField,
-    Value,
-)
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, UUIDField, Value
 from django.db.models.functions import Coalesce, Length
+from django.db.models.query import ModelIterable
 
 from nautobot.ipam.constants import IPV4_BYTE_LENGTH, IPV6_BYTE_LENGTH
+from nautobot.ipam.tree import PrefixTree, prefix_tree_index
 from nautobot.utilities.querysets import RestrictedQuerySet
 
 
@@ -34,6 +31,10 @@ class BaseNetworkQuerySet(RestrictedQuerySet):
     # Match string from "0000" to "ffff" with no trailing ":"
     RE_HEXTET = re.compile("^[a-f0-9]{4}$")
 
+    # Match string which may be a (partial) IPv4 or IPv6 address or network, e.g. "10.20", "2001:db8:" or "fe80::/64".
+    # Words made up only of the letters a-f (e.g. "cafe") are not matched.
+    RE_NETWORK = re.compile(r"^(?=[a-f0-9.:]*[0-9.:])[a-f0-9.:]+(/[0-9]{1,3})?$", re.IGNORECASE)
+
     @staticmethod
     def _get_last_ip(network):
         """
@@ -44,10 +45,13 @@ class BaseNetworkQuerySet(RestrictedQuerySet):
         """
         return network.broadcast if network.broadcast else network[-1]
 
-    def parse_network_string(self, search):
+    def parse_network_string(self, search, strict=False):
         """
         Attempts to parse a (potentially incomplete) IPAddress and return an IPNetwork.
         eg: '10.10' should be interpreted as netaddr.IPNetwork('10.10.0.0/16')
+
+        If the string cannot be parsed, an empty host network is returned, or if `strict` is True, `AddrFormatError`
+        is raised.
         """
         version = 4
 
@@ -90,6 +94,8 @@ class BaseNetworkQuerySet(RestrictedQuerySet):
             return call_map[version](search)
 
         except netaddr.core.AddrFormatError:
+            if strict:
+                raise
             ver_map = {4: "0/32", 6: "::/128"}
             return netaddr.IPNetwork(ver_map[version])
 
@@ -135,23 +141,38 @@ class BaseNetworkQuerySet(RestrictedQuerySet):
         ip = f"{network}/{prefix_len}"
         return netaddr.IPNetwork(ip)
 
+    def get_search_network(self, search):
+        """
+        Return the IPNetwork to match for the given search string, or None if it is not (part of) an IP address or
+        network.
+        """
+        if not self.RE_NETWORK.match(search):
+            return None
+        try:
+            return self.parse_network_string(search, strict=True)
+        except netaddr.core.AddrFormatError:
+            return None
+
     def string_search(self, search):
         """
         Interpret a search string and return useful results.
+
+        The search string is only matched against network ranges if it parses as (part of) an IP address or network;
+        otherwise only the text fields are searched, which on PostgreSQL can be served by their trigram indexes.
         """
         if not search:
             return self.none()
 
-        network = self.parse_network_string(search)
-        last_ip = self._get_last_ip(network)
-
-        return self.filter(
-            Q(description__icontains=search)
-            | Q(network__gte=network.network, broadcast__lte=last_ip)  # same as `net_contained()`
-            | Q(
+        query = Q(description__icontains=search)
+        network = self.get_search_network(search)
+        if network is not None:
+            last_ip = self._get_last_ip(network)
+            query |= Q(network__gte=network.network, broadcast__lte=last_ip)  # same as `net_contained()`
+            query |= Q(
                 prefix_length__lte=network.prefixlen, network__lte=network.network, broadcast__gte=last_ip
             )  # same as `net_contains_or_equals()`
-        )
+
+        return self.filter(query)
 
 
 class NetworkQuerySet(BaseNetworkQuerySet):
@@ -237,23 +258,66 @@ class AggregateQuerySet(NetworkQuerySet):
     """Queryset for `Aggregate` objects."""
 
 
-class PrefixQuerySet(NetworkQuerySet):
-    """Queryset for `Prefix` objects."""
-
-    def annotate_tree(self):
+class PrefixIterable(ModelIterable):
+    """
+    Iterable which populates the per-Prefix values requested by `PrefixQuerySet.annotate_tree()` and
+    `PrefixQuerySet.annotate_utilization()`, which are computed for each batch of `chunk_size` retrieved Prefixes
+    rather than as part of the query itself.
+    """
+
+    chunk_size = 500
+
+    def __iter__(self):
+        objs = super().__iter__()
+        while True:
+            chunk = list(islice(objs, self.chunk_size))
+            if not chunk:
+                break
+            if self.queryset._with_utilization:
+                chunk = self._populate_utilization(chunk)
+            if self.queryset._with_tree:
+                chunk = self._populate_tree(chunk)
+            yield from chunk
+
+    def _populate_tree(self, objs):
         """
-        Annotate the number of parent and child prefixes for each Prefix.
-
-        The UUID being used is fake for purposes of satisfying the COALESCE condition.
+        Set the number of prefixes which contain each Prefix (`parents`) and which it contains (`children`) within the
+        same VRF, as looked up from the in-memory prefix tree index.
         """
+        # The index reflects only committed changes; inside a transaction, count from the database instead
+        if connections[self.queryset.db].in_atomic_block:
+            objs = list(objs)
+            counts = self._count_tree(objs)
+            for obj in objs:
+                obj.parents, obj.children = counts.get(obj.pk, (0, 0))
+                yield obj
+            return
+
+        trees = {}
+        for obj in objs:
+            if obj.vrf_id not in trees:
+                trees[obj.vrf_id] = prefix_tree_index.get_tree(obj.vrf_id)
+            prefix = obj.prefix
+            obj.parents = trees[obj.vrf_id].count_parents(prefix)
+            obj.children = trees[obj.vrf_id].count_children(prefix)
+            yield obj
+
+    def _count_tree(self, objs):
+        """
+        Return a dictionary mapping the primary key of each of the given Prefixes to a tuple of its number of parent
+        and child prefixes, counted by the database in a single query.
+        """
+        from nautobot.ipam.models import Prefix
+
+        if not objs:
+            return {}
+
         # The COALESCE needs a valid, non-zero, non-null UUID value to do the comparison.
         # The value itself has no meaning, so we just generate a random UUID for the query.
         FAKE_UUID = uuid.uuid4()
 
-        from nautobot.ipam.models import Prefix
-
-        return self.annotate(
-            parents=Subquery(
+        def count(query):
+            return Subquery(
                 Prefix.objects.annotate(
                     maybe_vrf=ExpressionWrapper(
                         Coalesce(F("vrf_id"), FAKE_UUID),
@@ -261,9 +325,7 @@ class PrefixQuerySet(NetworkQuerySet):
                     )
                 )
                 .filter(
-                    Q(prefix_length__lt=OuterRef("prefix_length"))
-                    & Q(network__lte=OuterRef("network"))
-                    & Q(broadcast__gte=OuterRef("broadcast"))
+                    query
                     & Q(
                         maybe_vrf=ExpressionWrapper(
                             Coalesce(OuterRef("vrf_id"), FAKE_UUID),
@@ -277,33 +339,205 @@ class PrefixQuerySet(NetworkQuerySet):
                 .annotate(count=Count("*"))
                 .values("count")[:1],
                 output_field=IntegerField(),
-            ),
-            children=Subquery(
-                Prefix.objects.annotate(
-                    maybe_vrf=ExpressionWrapper(
-                        Coalesce(F("vrf_id"), FAKE_UUID),
-                        output_field=UUIDField(),
-                    )
-                )
-                .filter(
+            )
+
+        return {
+            pk: (parents or 0, children or 0)
+            for pk, parents, children in Prefix.objects.filter(pk__in=[obj.pk for obj in objs])
+            .order_by()
+            .annotate(
+                parent_count=count(
+                    Q(prefix_length__lt=OuterRef("prefix_length"))
+                    & Q(network__lte=OuterRef("network"))
+                    & Q(broadcast__gte=OuterRef("broadcast"))
+                ),
+                child_count=count(
                     Q(prefix_length__gt=OuterRef("prefix_length"))
                     & Q(network__gte=OuterRef("network"))
                     & Q(broadcast__lte=OuterRef("broadcast"))
-                    & Q(
-                        maybe_vrf=ExpressionWrapper(
-                            Coalesce(OuterRef("vrf_id"), FAKE_UUID),
-                            output_field=UUIDField(),
+                ),
+            )
+            .values_list("pk", "parent_count", "child_count")
+        }
+
+    def _populate_utilization(self, objs):
+        """
+        Set the `utilization` of each Prefix, equivalent to the return value of `Prefix.get_utilization()`, using one
+        query for the child prefixes of all container Prefixes and one for the child IP count of all other Prefixes.
+        """
+        from nautobot.ipam.models import IPAddress, Prefix
+        from nautobot.utilities.utils import UtilizationData
+
+        container_status_id = Prefix.STATUS_CONTAINER.pk
+        containers = [obj for obj in objs if obj.status_id == container_status_id]
+        others = [obj for obj in objs if obj.status_id != container_status_id]
+
+        # The direct children of a Prefix (or its duplicates) do not overlap one another, so the number of addresses
+        # they cover is the sum of their sizes.
+        child_sizes = {}
+        if containers:
+            # The children of duplicate Prefixes may be assigned to any one of them
+            duplicates = Q()
+            for obj in containers:
+                duplicates |= Q(vrf_id=obj.vrf_id, network=obj.network, prefix_length=obj.prefix_length)
+            children = (
+                Prefix.objects.filter(parent__in=Prefix.objects.filter(duplicates).values("pk"))
+                .order_by()
+                .values_list("parent__vrf_id", "parent__network", "parent__prefix_length", "network", "prefix_length")
+                .distinct()
+            )
+            for parent_vrf_id, parent_network, parent_prefix_length, network, prefix_length in children:
+                key = (parent_vrf_id, parent_network, parent_prefix_length)
+                child_sizes[key] = child_sizes.get(key, 0) + netaddr.IPNetwork(f"{network}/{prefix_length}").size
+        for obj in containers:
+            numerator = child_sizes.get((obj.vrf_id, obj.network, obj.prefix_length), 0)
+            obj.utilization = UtilizationData(numerator=numerator, denominator=obj.prefix.size)
+
+        host_counts = {}
+        if others:
+            # The COALESCE needs a valid, non-zero, non-null UUID value to do the comparison.
+            # The value itself has no meaning, so we just generate a random UUID for the query.
+            FAKE_UUID = uuid.uuid4()
+            host_counts = dict(
+                Prefix.objects.filter(pk__in=[obj.pk for obj in others])
+                .order_by()
+                .annotate(
+                    host_count=Subquery(
+                        IPAddress.objects.annotate(
+                            maybe_vrf=ExpressionWrapper(
+                                Coalesce(F("vrf_id"), FAKE_UUID),
+                                output_field=UUIDField(),
+                            )
+                        )
+                        .filter(
+                            Q(host__gte=OuterRef("network"))
+                            & Q(host__lte=OuterRef("broadcast"))
+                            & Q(
+                                maybe_vrf=ExpressionWrapper(
+                                    Coalesce(OuterRef("vrf_id"), FAKE_UUID),
+                                    output_field=UUIDField(),
+                                )
+                            )
                         )
+                        .order_by()
+                        .annotate(dummy_group_by=Value(1))  # This is an ORM hack to remove the unwanted GROUP BY clause
+                        .values("dummy_group_by")
+                        .annotate(count=Count("host", distinct=True))
+                        .values("count")[:1],
+                        output_field=IntegerField(),
                     )
                 )
-                .order_by()
-                .annotate(dummy_group_by=Value(1))  # This is an ORM hack to remove the unwanted GROUP BY clause
-                .values("dummy_group_by")
-                .annotate(count=Count("*"))
-                .values("count")[:1],
-                output_field=IntegerField(),
-            ),
-        )
+                .values_list("pk", "host_count")
+            )
+        for obj in others:
+            prefix_size = obj.prefix.size
+            if obj.prefix.version == 4 and obj.prefix.prefixlen < 31 and not obj.is_pool:
+                prefix_size -= 2
+            obj.utilization = UtilizationData(numerator=host_counts.get(obj.pk) or 0, denominator=prefix_size)
+
+        return objs
+
+
+class PrefixQuerySet(NetworkQuerySet):
+    """Queryset for `Prefix` objects."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._with_tree = False
+        self._with_utilization = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._with_tree = self._with_tree
+        clone._with_utilization = self._with_utilization
+        return clone
+
+    def annotate_tree(self):
+        """
+        Annotate the number of parent and child prefixes for each Prefix.
+
+        Counts are taken from the in-memory prefix tree index as each Prefix is retrieved, rather than being computed
+        by the database. As such, they are not available for filtering or ordering the queryset.
+        """
+        clone = self._chain()
+        clone._iterable_class = PrefixIterable
+        clone._with_tree = True
+        return clone
+
+    def annotate_utilization(self):
+        """
+        Annotate each Prefix with its `utilization`, as would be returned by `Prefix.get_utilization()`.
+
+        Utilization is computed for each batch of retrieved Prefixes (e.g. a page of results) in two queries, rather
+        than in one or more queries per Prefix. As such, it is not available for filtering or ordering the queryset.
+        """
+        clone = self._chain()
+        clone._iterable_class = PrefixIterable
+        clone._with_utilization = True
+        return clone
+
+    def bulk_create(self, objs, *args, update_hierarchy=True, **kwargs):
+        """
+        Create Prefixes in bulk, then assign the parent of each new Prefix and of any existing Prefixes and IPAddresses
+        within it, and discard the cached utilization of the Aggregates containing them. (As the `post_save` signal is
+        not sent, these must be maintained here.)
+
+        If `update_hierarchy` is False, the Prefixes are created with their `parent` as given, and the caller is
+        responsible for sending `post_save` for each of them.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if not objs or not update_hierarchy:
+            return objs
+
+        IPAddress = apps.get_model("ipam", "IPAddress")
+        for obj in objs:
+            obj.parent_id = (
+                self.model.objects.net_contains(obj.prefix)
+                .filter(vrf_id=obj.vrf_id)
+                .order_by("-prefix_length", "pk")
+                .values_list("pk", flat=True)
+                .first()
+            )
+        self.model.objects.bulk_update(objs, ["parent"], batch_size=1000)
+
+        # Adopt the Prefixes and IPAddresses within each new Prefix for which it is now the most specific parent
+        for obj in objs:
+            is_less_specific = Q(parent__isnull=True) | Q(parent__prefix_length__lt=obj.prefix_length)
+            self.model.objects.net_contained(obj.prefix).filter(vrf_id=obj.vrf_id).filter(is_less_specific).update(
+                parent_id=obj.pk
+            )
+            IPAddress.objects.net_host_contained(obj.prefix).filter(vrf_id=obj.vrf_id).filter(is_less_specific).update(
+                parent_id=obj.pk
+            )
+
+        def on_commit_callback():
+            changes = {}
+            for obj in objs:
+                changes.setdefault(obj.vrf_id, []).append(obj)
+            for vrf_id, vrf_objs in changes.items():
+                if len(vrf_objs) > prefix_tree_index.max_replay:
+                    prefix_tree_index.invalidate(vrf_id)
+                    continue
+                for obj in vrf_objs:
+                    prefix_tree_index.update(vrf_id, obj.pk, obj.prefix)
+
+            Aggregate = apps.get_model("ipam", "Aggregate")
+            query = Q()
+            for obj in objs:
+                query |= Q(
+                    prefix_length__lte=obj.prefix_length,
+                    network__lte=obj.prefix.network,
+                    broadcast__gte=self._get_last_ip(obj.prefix),
+                )
+            cache.delete_many(
+                [
+                    Aggregate.get_utilization_cache_key(pk)
+                    for pk in Aggregate.objects.filter(query).values_list("pk", flat=True)
+                ]
+            )
+
+        transaction.on_commit(on_commit_callback)
+        return objs
 
 
 class IPAddressQuerySet(BaseNetworkQuerySet):
@@ -330,17 +564,20 @@ class IPAddressQuerySet(BaseNetworkQuerySet):
     def string_search(self, search):
         """
         Interpret a search string and return useful results.
+
+        The search string is only matched against host addresses if it parses as (part of) an IP address or network;
+        otherwise only the text fields are searched, which on PostgreSQL can be served by their trigram indexes.
         """
         if not search:
             return self.none()
 
-        network = self.parse_network_string(search)
-        last_ip = self._get_last_ip(network)
-        return self.filter(
-            Q(dns_name__icontains=search)
-            | Q(description__icontains=search)
-            | Q(host__lte=last_ip, host__gte=network.network)  # same as `net_host_contained()`
-        )
+        query = Q(dns_name__icontains=search) | Q(description__icontains=search)
+        network = self.get_search_network(search)
+        if network is not None:
+            last_ip = self._get_last_ip(network)
+            query |= Q(host__lte=last_ip, host__gte=network.network)  # same as `net_host_contained()`
+
+        return self.filter(query)
 
     def net_host_contained(self, network):
         # consider only host ip address when
@@ -353,12 +590,54 @@ class IPAddressQuerySet(BaseNetworkQuerySet):
         )
 
     def net_in(self, networks):
-        # for a tuple of IP addresses, filter queryset for matches.
-        # values may or may not have netmasks: ['10.0.0.1', '10.0.0.1/24', '10.0.0.1/25']
-        masked_hosts = [bytes(netaddr.IPNetwork(val).ip) for val in networks if "/" in val]
-        masked_prefixes = [netaddr.IPNetwork(val).prefixlen for val in networks if "/" in val]
-        unmasked_hosts = [bytes(netaddr.IPNetwork(val).ip) for val in networks if "/" not in val]
-        return self.filter(Q(host__in=masked_hosts, prefix_length__in=masked_prefixes) | Q(host__in=unmasked_hosts))
+        """
+        Filter for IP addresses matching any of the given values, which may or may not include a mask (e.g.
+        `["10.0.0.1", "10.0.0.1/24", "10.0.0.1/25"]`). Values with a mask match only that host with that mask; values
+        without a mask match that host with any mask.
+
+        Hosts are grouped by mask length, so that each host is only ever compared with its own mask.
+        """
+        masked_hosts = {}
+        unmasked_hosts = set()
+        for value in networks:
+            network = netaddr.IPNetwork(value)
+            if "/" in str(value):
+                masked_hosts.setdefault(network.prefixlen, set()).add(bytes(network.ip))
+            else:
+                unmasked_hosts.add(bytes(network.ip))
+
+        query = Q(host__in=unmasked_hosts) if unmasked_hosts else Q(pk__in=[])
+        for prefix_length, hosts in masked_hosts.items():
+            query |= Q(prefix_length=prefix_length, host__in=hosts)
+        return self.filter(query)
+
+    def bulk_lookup(self, addresses, batch_size=1000):
+        """
+        Look up many IP addresses at once, each matched exactly by its host, mask, and VRF.
+
+        `addresses` is an iterable of `(address, vrf)` tuples, where `address` is a string or `netaddr.IPNetwork` and
+        `vrf` is a VRF, its primary key, or None for the global table. Returns a dictionary mapping each `(address,
+        vrf_id)` tuple which was found (with `address` normalized to a CIDR string) to a list of the matching
+        IPAddresses. Addresses are queried in batches of `batch_size`, grouped by mask length and VRF.
+        """
+        keys = set()
+        for address, vrf in addresses:
+            address = netaddr.IPNetwork(address)
+            keys.add((bytes(address.ip), address.prefixlen, getattr(vrf, "pk", vrf)))
+        keys = list(keys)
+
+        results = {}
+        for i in range(0, len(keys), batch_size):
+            groups = {}
+            for host, prefix_length, vrf_id in keys[i : i + batch_size]:
+                groups.setdefault((prefix_length, vrf_id), []).append(host)
+            query = Q()
+            for (prefix_length, vrf_id), hosts in groups.items():
+                query |= Q(prefix_length=prefix_length, vrf_id=vrf_id, host__in=hosts)
+            for ip in self.filter(query):
+                results.setdefault((str(ip.address), ip.vrf_id), []).append(ip)
+
+        return results
 
     def get(self, *args, address=None, **kwargs):
         """
@@ -383,3 +662,30 @@ class IPAddressQuerySet(BaseNetworkQuerySet):
             kwargs["host"] = address.ip
             kwargs["broadcast"] = last_ip
         return super().filter(*args, **kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """
+        Create IPAddresses in bulk, assigning the parent Prefix of each from the prefix tree of its VRF.
+
+        Inside a transaction, where uncommitted changes are not yet reflected by the prefix tree index, the parents
+        are instead found from a tree of only those Prefixes which contain any of the new IPAddresses.
+        """
+        objs = list(objs)
+        if connections[self.db].in_atomic_block:
+            Prefix = apps.get_model("ipam", "Prefix")
+            trees = {}
+            for vrf_id in {obj.vrf_id for obj in objs}:
+                hosts = {obj.host for obj in objs if obj.vrf_id == vrf_id}
+                trees[vrf_id] = PrefixTree()
+                for pk, network, prefix_length in Prefix.objects.filter(
+                    Q(vrf_id=vrf_id),
+                    reduce(operator.or_, (Q(network__lte=host, broadcast__gte=host) for host in hosts)),
+                ).values_list("pk", "network", "prefix_length"):
+                    trees[vrf_id].insert(netaddr.IPNetwork(f"{network}/{prefix_length}"), pk)
+        else:
+            trees = {vrf_id: prefix_tree_index.get_tree(vrf_id) for vrf_id in {obj.vrf_id for obj in objs}}
+
+        for obj in objs:
+            parents = trees[obj.vrf_id].get_closest_parents(netaddr.IPNetwork(obj.host), inclusive=True)
+            obj.parent_id = min(parents) if parents else None
+        return super().bulk_create(objs, *args, **kwargs)
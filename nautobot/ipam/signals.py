@@ -0,0 +1,157 @@
+import netaddr
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Aggregate, IPAddress, Prefix, VLAN, VLANGroup
+from .tree import prefix_tree_index
+
+
+def _get_closest_prefix(prefix, vrf_id, inclusive=False, exclude=None):
+    """
+    Return the most specific Prefix in the given VRF which contains `prefix` (or which contains or is equal to
+    `prefix`, if `inclusive` is True).
+    """
+    queryset = Prefix.objects.net_contains_or_equals(prefix) if inclusive else Prefix.objects.net_contains(prefix)
+    queryset = queryset.filter(vrf_id=vrf_id)
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset.order_by("-prefix_length", "pk").first()
+
+
+def _adopt_children(instance):
+    """
+    Assign a newly created or modified Prefix as the parent of any Prefixes and IPAddresses within it for which it is
+    now the most specific parent.
+    """
+    is_less_specific = Q(parent__isnull=True) | Q(parent__prefix_length__lt=instance.prefix_length)
+    Prefix.objects.net_contained(instance.prefix).filter(vrf_id=instance.vrf_id).filter(is_less_specific).update(
+        parent=instance
+    )
+    IPAddress.objects.net_host_contained(instance.prefix).filter(vrf_id=instance.vrf_id).filter(
+        is_less_specific
+    ).update(parent=instance)
+
+
+def _release_children(pk, prefix, vrf_id):
+    """
+    Reassign the child Prefixes and IPAddresses of a Prefix which has been moved or resized to its closest remaining
+    parent (or to a duplicate of it, if one exists).
+    """
+    replacement = _get_closest_prefix(prefix, vrf_id, inclusive=True, exclude=pk)
+    Prefix.objects.filter(parent_id=pk).update(parent=replacement)
+    IPAddress.objects.filter(parent_id=pk).update(parent=replacement)
+
+
+def _invalidate_aggregate_utilization(*prefixes):
+    """
+    Discard the cached utilization of all Aggregates containing any of the given prefixes.
+    """
+    pks = set()
+    for prefix in prefixes:
+        pks.update(Aggregate.objects.net_contains_or_equals(prefix).values_list("pk", flat=True))
+    cache.delete_many([Aggregate.get_utilization_cache_key(pk) for pk in pks])
+
+
+#
+# Prefix hierarchy
+#
+
+
+@receiver(pre_save, sender=Prefix)
+def assign_prefix_parent(instance, raw=False, **kwargs):
+    """
+    Assign the parent of a Prefix which is being created or whose VRF or prefix has changed.
+    """
+    if raw or not (instance._state.adding or instance.hierarchy_changed):
+        return
+    instance.parent = _get_closest_prefix(instance.prefix, instance.vrf_id, exclude=instance.pk)
+
+
+@receiver(post_save, sender=Prefix)
+def update_prefix_hierarchy(instance, created, raw=False, **kwargs):
+    """
+    Update the parent of any affected Prefixes and IPAddresses, along with the in-memory prefix tree(s) and cached
+    Aggregate utilization, once a Prefix has been created or its VRF or prefix has been modified.
+    """
+    if raw or not (created or instance.hierarchy_changed):
+        return
+
+    pk, vrf_id, original_vrf_id, prefix = instance.pk, instance.vrf_id, instance._original_vrf_id, instance.prefix
+    original_prefix = None if created else netaddr.IPNetwork(instance._original_cidr)
+    if not created:
+        _release_children(pk, original_prefix, original_vrf_id)
+    _adopt_children(instance)
+
+    instance._original_vrf_id, instance._original_cidr = vrf_id, instance.cidr_str
+
+    def on_commit_callback():
+        if original_vrf_id != vrf_id:
+            prefix_tree_index.update(original_vrf_id, pk)
+        prefix_tree_index.update(vrf_id, pk, prefix)
+        if original_prefix is None or original_prefix == prefix:
+            _invalidate_aggregate_utilization(prefix)
+        else:
+            _invalidate_aggregate_utilization(original_prefix, prefix)
+
+    transaction.on_commit(on_commit_callback)
+
+
+@receiver(post_delete, sender=Prefix)
+def remove_from_prefix_hierarchy(instance, **kwargs):
+    """
+    Reassign the children of a deleted Prefix (which were orphaned by the deletion) to its closest remaining parent,
+    remove it from the in-memory prefix tree, and invalidate the cached utilization of its Aggregate(s).
+    """
+    pk, vrf_id = instance.pk, instance._original_vrf_id
+
+    if instance._original_cidr is not None:
+        prefix = netaddr.IPNetwork(instance._original_cidr)
+        replacement = _get_closest_prefix(prefix, vrf_id, inclusive=True)
+    else:
+        prefix = replacement = None
+    if replacement is not None:
+        Prefix.objects.net_contained(prefix).filter(vrf_id=vrf_id, parent__isnull=True).update(parent=replacement)
+        IPAddress.objects.net_host_contained(prefix).filter(vrf_id=vrf_id, parent__isnull=True).update(
+            parent=replacement
+        )
+
+    def on_commit_callback():
+        prefix_tree_index.update(vrf_id, pk)
+        if prefix is not None:
+            _invalidate_aggregate_utilization(prefix)
+
+    transaction.on_commit(on_commit_callback)
+
+
+@receiver(pre_save, sender=IPAddress)
+def assign_ipaddress_parent(instance, raw=False, **kwargs):
+    """
+    Assign the parent of an IPAddress which is being created or whose VRF or host has changed.
+    """
+    if raw or not (instance._state.adding or instance.hierarchy_changed):
+        return
+    instance.parent = _get_closest_prefix(netaddr.IPNetwork(instance.host), instance.vrf_id, inclusive=True)
+    instance._original_vrf_id, instance._original_host = instance.vrf_id, instance.host
+
+
+#
+# VLAN groups
+#
+
+
+@receiver(post_save, sender=VLAN)
+@receiver(post_delete, sender=VLAN)
+def invalidate_vlangroup_vids(instance, **kwargs):
+    """
+    Discard the cached VLAN ID bitmap of the group(s) to which a created, modified, or deleted VLAN belongs (or
+    belonged).
+    """
+    group_ids = {instance.group_id, instance._original_group_id} - {None}
+    instance._original_group_id = instance.group_id
+    if not group_ids:
+        return
+
+    transaction.on_commit(lambda: cache.delete_many([VLANGroup.get_vid_bitmap_cache_key(pk) for pk in group_ids]))
@@ -1,5 +1,6 @@
 import django_tables2 as tables
 from django.utils.safestring import mark_safe
+from django_tables2.data import TableQuerysetData
 from django_tables2.utils import Accessor
 
 from nautobot.dcim.models import Interface
@@ -35,6 +36,13 @@ UTILIZATION_GRAPH = """
 {% if record.present_in_database %}{% utilization_graph record.get_utilization %}{% else %}&mdash;{% endif %}
 """
 
+PREFIX_UTILIZATION_GRAPH = """
+{% load helpers %}
+{% if not record.present_in_database %}&mdash;
+{% elif record.utilization %}{% utilization_graph record.utilization %}
+{% else %}{% utilization_graph record.get_utilization %}{% endif %}
+"""
+
 PREFIX_LINK = """
 {% load helpers %}
 {% for i in record.parents|as_range %}
@@ -318,12 +326,14 @@ class PrefixTable(StatusTableMixin, BaseTable):
     prefix = tables.TemplateColumn(
         template_code=PREFIX_LINK, attrs={"td": {"class": "text-nowrap"}}, order_by=("network", "prefix_length")
     )
+    children = tables.Column(orderable=False)
     vrf = tables.TemplateColumn(template_code=VRF_LINK, verbose_name="VRF")
     tenant = tables.TemplateColumn(template_code=TENANT_LINK)
     site = tables.Column(linkify=True)
     vlan = tables.Column(linkify=True, verbose_name="VLAN")
     role = tables.TemplateColumn(template_code=PREFIX_ROLE_LINK)
     is_pool = BooleanColumn(verbose_name="Pool")
+    utilization = tables.TemplateColumn(template_code=PREFIX_UTILIZATION_GRAPH, orderable=False)
 
     class Meta(BaseTable.Meta):
         model = Prefix
@@ -333,6 +343,7 @@ class PrefixTable(StatusTableMixin, BaseTable):
             "status",
             "children",
             "vrf",
+            "utilization",
             "tenant",
             "site",
             "vlan",
@@ -355,9 +366,18 @@ class PrefixTable(StatusTableMixin, BaseTable):
             "class": lambda record: "success" if not record.present_in_database else "",
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Compute the utilization of the displayed Prefixes in bulk, only if it is shown
+        if (
+            isinstance(self.data, TableQuerysetData)
+            and self.columns["utilization"].visible
+            and hasattr(self.data.data, "annotate_utilization")
+        ):
+            self.data.data = self.data.data.annotate_utilization()
+
 
 class PrefixDetailTable(PrefixTable):
-    utilization = tables.TemplateColumn(template_code=UTILIZATION_GRAPH, orderable=False)
     tenant = tables.TemplateColumn(template_code=COL_TENANT)
     tags = TagColumn(url_name="ipam:prefix_list")
 
@@ -8,7 +8,7 @@ from netaddr import IPNetwork
 from rest_framework import status
 
 from nautobot.dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
-from nautobot.extras.models import Status
+from nautobot.extras.models import ObjectChange, Status
 from nautobot.ipam.choices import *
 from nautobot.ipam.models import (
     Aggregate,
@@ -22,6 +22,7 @@ from nautobot.ipam.models import (
     VLANGroup,
     VRF,
 )
+from nautobot.ipam.api.views import PrefixViewSet
 from nautobot.utilities.testing import APITestCase, APIViewTestCases, disable_warnings
 from nautobot.utilities.testing.api import APITransactionTestCase
 
@@ -331,6 +332,76 @@ class PrefixTest(APIViewTestCases.APIViewTestCase):
         self.assertHttpStatus(response, status.HTTP_201_CREATED)
         self.assertEqual(len(response.data), 4)
 
+    def test_list_prefixes_with_utilization(self):
+        """
+        Test the opt-in `utilization` field of prefixes.
+        """
+        prefix = Prefix.objects.get(prefix="192.168.1.0/24")
+        IPAddress.objects.create(address=IPNetwork("192.168.1.1/24"))
+        self.add_permissions("ipam.view_prefix")
+
+        response = self.client.get(self._get_detail_url(prefix), **self.header)
+        self.assertNotIn("utilization", response.data)
+
+        response = self.client.get(f"{self._get_list_url()}?include=utilization", **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        utilization = {result["prefix"]: result["utilization"] for result in response.data["results"]}
+        self.assertEqual(utilization["192.168.1.0/24"], {"numerator": 1, "denominator": 254})
+        self.assertEqual(utilization["192.168.2.0/24"], {"numerator": 0, "denominator": 254})
+
+    def test_allocate_prefixes(self):
+        """
+        Test the allocation of prefixes from within multiple parent prefixes in a single request.
+        """
+        vrf = VRF.objects.create(name="Test VRF 1", rd="1234")
+        parent_1 = Prefix.objects.create(prefix=IPNetwork("10.0.0.0/29"), status=self.status_active)
+        parent_2 = Prefix.objects.create(prefix=IPNetwork("10.1.0.0/28"), vrf=vrf, status=self.status_active)
+        Prefix.objects.create(prefix=IPNetwork("10.1.0.0/31"), vrf=vrf, status=self.status_active)
+        nested = Prefix.objects.create(prefix=IPNetwork("10.0.0.4/30"), status=self.status_active)
+        ip = IPAddress.objects.create(address=IPNetwork("10.0.0.1/29"), status=self.status_active)
+        url = reverse("ipam-api:prefix-allocate")
+        self.add_permissions("ipam.add_prefix")
+
+        data = [
+            {"parent": str(parent_1.pk), "prefix_length": 31, "status": "active", "description": "Test 1"},
+            {"parent": str(parent_2.pk), "prefix_length": 31, "status": "active", "description": "Test 2"},
+            {"parent": str(parent_2.pk), "prefix_length": 30, "status": "active", "description": "Test 3"},
+            {"parent": str(nested.pk), "prefix_length": 31, "status": "active", "description": "Test 4"},
+            {"parent": str(parent_1.pk), "prefix_length": 31, "status": "active", "description": "Test 5"},
+        ]
+        response = self.client.post(url, data, format="json", **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [p["prefix"] for p in response.data],
+            ["10.0.0.0/31", "10.1.0.2/31", "10.1.0.4/30", "10.0.0.4/31", "10.0.0.2/31"],
+        )
+        self.assertEqual([p["description"] for p in response.data], [d["description"] for d in data])
+        self.assertIsNone(response.data[0]["vrf"])
+        self.assertEqual(response.data[1]["vrf"]["id"], str(vrf.pk))
+        self.assertEqual(Prefix.objects.get(prefix="10.0.0.4/31", vrf__isnull=True).parent, nested)
+        self.assertEqual(Prefix.objects.get(prefix="10.0.0.0/31", vrf__isnull=True).parent, parent_1)
+        ip.refresh_from_db()
+        self.assertEqual(ip.parent.prefix, IPNetwork("10.0.0.0/31"))
+        self.assertEqual(
+            ObjectChange.objects.filter(changed_object_id__in=[p["id"] for p in response.data]).count(), len(data)
+        )
+
+        # Insufficient space within one of the parents
+        response = self.client.post(
+            url,
+            [{"parent": str(parent_1.pk), "prefix_length": 30}, {"parent": str(nested.pk), "prefix_length": 31}],
+            format="json",
+            **self.header,
+        )
+        self.assertHttpStatus(response, status.HTTP_204_NO_CONTENT)
+        self.assertIn("detail", response.data)
+
+        # Invalid prefix length
+        response = self.client.post(
+            url, {"parent": str(parent_1.pk), "prefix_length": 33}, format="json", **self.header
+        )
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+
     def test_list_available_ips(self):
         """
         Test retrieval of all available IP addresses within a parent prefix.
@@ -429,6 +500,34 @@ class ParallelPrefixTest(APITransactionTestCase):
         ips = [str(o) for o in IPAddress.objects.filter().all()]
         self.assertEqual(len(ips), len(set(ips)), "Duplicate IPs should not exist")
 
+    def test_create_available_ips_parallel_nested_and_disjoint_prefixes(self):
+        parent = Prefix.objects.create(prefix=IPNetwork("192.0.2.0/28"), is_pool=True)
+        child = Prefix.objects.create(prefix=IPNetwork("192.0.2.0/29"), is_pool=True)
+        disjoint = Prefix.objects.create(prefix=IPNetwork("198.51.100.0/29"), is_pool=True)
+
+        # Allocations within the same prefix hierarchy share a lock; others do not
+        self.assertEqual(
+            PrefixViewSet.get_allocation_lock_name(parent, "available-ips"),
+            PrefixViewSet.get_allocation_lock_name(child, "available-ips"),
+        )
+        self.assertNotEqual(
+            PrefixViewSet.get_allocation_lock_name(parent, "available-ips"),
+            PrefixViewSet.get_allocation_lock_name(disjoint, "available-ips"),
+        )
+
+        requests = []
+        for i, prefix in enumerate((parent, child, disjoint) * 2):
+            url = reverse("ipam-api:prefix-available-ips", kwargs={"pk": prefix.pk})
+            requests.append((url, {"description": f"Test IP {i}", "status": "active"}))
+        shuffle(requests)
+        with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+            for url, data in requests:
+                executor.submit(self._threaded_post, url, data)
+
+        ips = [str(o) for o in IPAddress.objects.all()]
+        self.assertEqual(len(ips), 6)
+        self.assertEqual(len(ips), len(set(ips)), "Duplicate IPs should not exist")
+
     def _do_parallel_requests(self, url, requests):
         # Randomize request order, such that test run more closely simulates
         # a real calling pattern.
@@ -530,6 +629,58 @@ class VLANGroupTest(APIViewTestCases.APIViewTestCase):
         )
         VLANGroup.objects.bulk_create(vlan_groups)
 
+    def test_list_available_vlans(self):
+        """
+        Test retrieval of the available VLAN IDs within a VLAN group.
+        """
+        vlan_group = VLANGroup.objects.first()
+        VLAN.objects.bulk_create([VLAN(name=f"VLAN {vid}", vid=vid, group=vlan_group) for vid in (1, 2, 4)])
+        url = reverse("ipam-api:vlangroup-available-vlans", kwargs={"pk": vlan_group.pk})
+        self.add_permissions("ipam.view_vlangroup", "ipam.view_vlan")
+
+        response = self.client.get(f"{url}?limit=3", **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual([vlan["vid"] for vlan in response.data], [3, 5, 6])
+        self.assertEqual(response.data[0]["group"]["id"], str(vlan_group.pk))
+
+    def test_create_single_available_vlan(self):
+        """
+        Test the creation of the first available VLAN within a VLAN group.
+        """
+        site = Site.objects.create(name="Site 1", slug="site-1")
+        vlan_group = VLANGroup.objects.create(name="VLAN Group 4", slug="vlan-group-4", site=site)
+        VLAN.objects.create(name="VLAN 1", vid=1, group=vlan_group, site=site)
+        url = reverse("ipam-api:vlangroup-available-vlans", kwargs={"pk": vlan_group.pk})
+        self.add_permissions("ipam.view_vlangroup", "ipam.add_vlan", "extras.view_status")
+
+        data = {"name": "VLAN 2", "status": "active"}
+        response = self.client.post(url, data, format="json", **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["vid"], 2)
+        self.assertEqual(response.data["group"]["id"], str(vlan_group.pk))
+        self.assertEqual(response.data["site"]["id"], str(site.pk))
+
+    def test_create_multiple_available_vlans(self):
+        """
+        Test the creation of multiple available VLANs within a VLAN group.
+        """
+        vlan_group = VLANGroup.objects.first()
+        VLAN.objects.bulk_create([VLAN(name=f"VLAN {vid}", vid=vid, group=vlan_group) for vid in range(1, 4091)])
+        url = reverse("ipam-api:vlangroup-available-vlans", kwargs={"pk": vlan_group.pk})
+        self.add_permissions("ipam.view_vlangroup", "ipam.add_vlan", "extras.view_status")
+
+        # Try to create five VLANs (only four are available)
+        data = [{"name": f"Test VLAN {i}", "status": "active"} for i in range(1, 6)]
+        response = self.client.post(url, data, format="json", **self.header)
+        self.assertHttpStatus(response, status.HTTP_204_NO_CONTENT)
+        self.assertIn("detail", response.data)
+
+        # Create all four available VLANs in a single request
+        data = [{"name": f"Test VLAN {i}", "status": "active"} for i in range(1, 5)]
+        response = self.client.post(url, data, format="json", **self.header)
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual([vlan["vid"] for vlan in response.data], [4091, 4092, 4093, 4094])
+
 
 class VLANTest(APIViewTestCases.APIViewTestCase):
     model = VLAN
@@ -838,6 +838,8 @@ class IPAddressTestCase(TestCase):
         self.assertEqual(self.filterset(params, self.queryset).qs.count(), 2)
         params = {"address": ["10.0.0.1/24", "10.0.0.1/25"]}
         self.assertEqual(self.filterset(params, self.queryset).qs.count(), 2)
+        params = {"address": ["10.0.0.1/24", "10.0.0.2/25"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 1)
         params = {"address": ["2001:db8::1/64"]}
         self.assertEqual(self.filterset(params, self.queryset).qs.count(), 1)
         params = {"address": ["2001:db8::1"]}
@@ -1,14 +1,19 @@
 import copy
-from unittest import skipIf
+from io import StringIO
+from itertools import islice
+from unittest import mock, skipIf
 
 import netaddr
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.db import connection
 from django.test import TestCase, override_settings
 
 from nautobot.extras.models import Status
 from nautobot.ipam.choices import IPAddressRoleChoices
 from nautobot.ipam.models import Aggregate, IPAddress, Prefix, RIR, VLAN, VLANGroup, VRF
+from nautobot.ipam.querysets import PrefixIterable
 
 
 class TestVarbinaryIPField(TestCase):
@@ -35,12 +40,12 @@ class TestVarbinaryIPField(TestCase):
         self.assertEqual(self.field.db_type(connection), expected)
 
     def test_value_to_string(self):
-        """"Test `VarbinaryIPField.value_to_string`."""
+        """ "Test `VarbinaryIPField.value_to_string`."""
         # value_to_string calls _parse_address so no need for negative tests here.
         self.assertEqual(self.field.value_to_string(self.prefix), self.network)
 
     def test_parse_address_success(self):
-        """"Test `VarbinaryIPField._parse_address` PASS."""
+        """ "Test `VarbinaryIPField._parse_address` PASS."""
 
         # str => netaddr.IPAddress
         obj = self.field._parse_address(self.prefix.network)
@@ -56,7 +61,7 @@ class TestVarbinaryIPField(TestCase):
         self.assertEqual(self.field._parse_address(obj), obj)
 
     def test_parse_address_failure(self):
-        """"Test `VarbinaryIPField._parse_address` FAIL."""
+        """ "Test `VarbinaryIPField._parse_address` FAIL."""
 
         bad_inputs = (
             None,
@@ -68,7 +73,7 @@ class TestVarbinaryIPField(TestCase):
             self.assertRaises(ValidationError, self.field._parse_address, bad)
 
     def test_to_python(self):
-        """"Test `VarbinaryIPField.to_python`."""
+        """ "Test `VarbinaryIPField.to_python`."""
 
         # to_python calls _parse_address so no need for negative tests here.
 
@@ -83,7 +88,7 @@ class TestVarbinaryIPField(TestCase):
         "postgres is not the database driver",
     )
     def test_get_db_prep_value_postgres(self):
-        """"Test `VarbinaryIPField.get_db_prep_value`."""
+        """ "Test `VarbinaryIPField.get_db_prep_value`."""
 
         # PostgreSQL escapes `bytes` in `::bytea` and you must call
         # `getquoted()` to extract the value.
@@ -96,7 +101,7 @@ class TestVarbinaryIPField(TestCase):
         "mysql is not the database driver",
     )
     def test_get_db_prep_value_mysql(self):
-        """"Test `VarbinaryIPField.get_db_prep_value` for MySQL."""
+        """ "Test `VarbinaryIPField.get_db_prep_value` for MySQL."""
 
         # MySQL uses raw `bytes`
         prepped = self.field.get_db_prep_value(self.network, connection)
@@ -129,6 +134,42 @@ class TestAggregate(TestCase):
         Prefix.objects.bulk_create((Prefix(prefix=netaddr.IPNetwork("10.128.0.0/9")),))
         self.assertEqual(aggregate.get_utilization(), (16777216, 16777216))
 
+    def test_get_utilization_overlapping_prefixes(self):
+        rir = RIR.objects.create(name="RIR 1", slug="rir-1")
+        aggregate = Aggregate.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"), rir=rir)
+        vrf = VRF.objects.create(name="VRF 1")
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/24"))
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/25"))  # Nested
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/24"), vrf=vrf)  # Duplicate in another VRF
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/24"))  # Adjacent
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.4.0/22"))
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.6.0/23"))  # Nested at the end of the range
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.1.0.0/24"))  # Outside of the aggregate
+
+        child_prefixes = netaddr.IPSet([p.prefix for p in Prefix.objects.net_contained_or_equal(aggregate.prefix)])
+        self.assertEqual(child_prefixes.size, 1536)
+        self.assertEqual(aggregate.get_utilization(), (1536, 65536))
+
+    def test_get_utilization_cached(self):
+        from nautobot.ipam.signals import _invalidate_aggregate_utilization
+
+        rir = RIR.objects.create(name="RIR 1", slug="rir-1")
+        aggregate = Aggregate.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"), rir=rir)
+        cache_key = Aggregate.get_utilization_cache_key(aggregate.pk)
+        cache.set(cache_key, (aggregate.cidr_str, 256))
+
+        # Outside of a transaction, the cached value is used
+        with mock.patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(aggregate.get_utilization(), (256, 65536))
+
+            _invalidate_aggregate_utilization(netaddr.IPNetwork("10.1.0.0/24"))
+            self.assertEqual(aggregate.get_utilization(), (256, 65536))
+
+            _invalidate_aggregate_utilization(netaddr.IPNetwork("10.0.1.0/24"))
+            self.assertEqual(aggregate.get_utilization(), (0, 65536))
+            self.assertEqual(cache.get(cache_key), (aggregate.cidr_str, 0))
+        cache.delete(cache_key)
+
 
 class TestPrefix(TestCase):
     def setUp(self):
@@ -261,6 +302,34 @@ class TestPrefix(TestCase):
 
         self.assertEqual(available_ips, missing_ips)
 
+    def test_iter_available_ips(self):
+
+        parent_prefix = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/29"))
+        IPAddress.objects.bulk_create(
+            (
+                IPAddress(address=netaddr.IPNetwork("10.0.0.0/29")),  # Network address
+                IPAddress(address=netaddr.IPNetwork("10.0.0.2/29")),
+                IPAddress(address=netaddr.IPNetwork("10.0.0.2/32")),  # Duplicate host
+                IPAddress(address=netaddr.IPNetwork("10.0.0.3/29")),
+                IPAddress(address=netaddr.IPNetwork("10.0.0.5/29")),
+                IPAddress(address=netaddr.IPNetwork("10.0.0.9/24")),  # Outside of the prefix
+            )
+        )
+        available_ips = [str(ip) for ip in parent_prefix.iter_available_ips()]
+        self.assertEqual(available_ips, ["10.0.0.1", "10.0.0.4", "10.0.0.6"])
+        self.assertEqual(netaddr.IPSet(available_ips), parent_prefix.get_available_ips())
+
+        # Pools are fully usable
+        parent_prefix.is_pool = True
+        available_ips = [str(ip) for ip in parent_prefix.iter_available_ips()]
+        self.assertEqual(available_ips, ["10.0.0.1", "10.0.0.4", "10.0.0.6", "10.0.0.7"])
+
+        ipv6_prefix = Prefix.objects.create(prefix=netaddr.IPNetwork("2001:db8::/64"))
+        IPAddress.objects.create(address=netaddr.IPNetwork("2001:db8::/64"))
+        IPAddress.objects.create(address=netaddr.IPNetwork("2001:db8::2/64"))
+        available_ips = [str(ip) for ip in islice(ipv6_prefix.iter_available_ips(), 3)]
+        self.assertEqual(available_ips, ["2001:db8::1", "2001:db8::3", "2001:db8::4"])
+
     def test_get_first_available_prefix(self):
 
         prefixes = Prefix.objects.bulk_create(
@@ -312,6 +381,40 @@ class TestPrefix(TestCase):
         )
         self.assertEqual(prefix.get_utilization(), (32, 254))
 
+    def test_annotate_utilization(self):
+        vrf = VRF.objects.create(name="VRF 1")
+        active = self.statuses.get(slug="active")
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"), status=Prefix.STATUS_CONTAINER)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"), status=Prefix.STATUS_CONTAINER)  # Duplicate
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/24"), status=active)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/24"), status=active)  # Duplicate
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/26"), status=active)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/31"), status=active)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"), status=Prefix.STATUS_CONTAINER, vrf=vrf)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.2.0/24"), status=active, vrf=vrf)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("2001:db8::/32"), status=Prefix.STATUS_CONTAINER)
+        Prefix.objects.create(prefix=netaddr.IPNetwork("2001:db8::/64"), status=active)
+        IPAddress.objects.create(address=netaddr.IPNetwork("10.0.0.1/24"))
+        IPAddress.objects.create(address=netaddr.IPNetwork("10.0.0.1/32"))  # Duplicate host
+        IPAddress.objects.create(address=netaddr.IPNetwork("10.0.0.100/24"))
+        IPAddress.objects.create(address=netaddr.IPNetwork("10.0.1.1/31"))
+        IPAddress.objects.create(address=netaddr.IPNetwork("10.0.2.1/24"), vrf=vrf)
+        IPAddress.objects.create(address=netaddr.IPNetwork("10.0.2.2/24"))  # Not in the VRF
+        IPAddress.objects.create(address=netaddr.IPNetwork("2001:db8::1/64"))
+
+        # One query each for the prefixes, the container status, the child prefixes and the child IP counts
+        with self.assertNumQueries(4):
+            prefixes = list(Prefix.objects.annotate_utilization())
+        for prefix in prefixes:
+            self.assertEqual(prefix.utilization, prefix.get_utilization(), prefix)
+
+        # Utilization is computed for each chunk of retrieved Prefixes in turn
+        with mock.patch.object(PrefixIterable, "chunk_size", 3):
+            prefixes = list(Prefix.objects.annotate_utilization())
+        self.assertEqual(len(prefixes), 10)
+        for prefix in prefixes:
+            self.assertEqual(prefix.utilization, prefix.get_utilization(), prefix)
+
     #
     # Uniqueness enforcement tests
     #
@@ -341,6 +444,106 @@ class TestPrefix(TestCase):
         self.assertRaises(ValidationError, duplicate_prefix.clean)
 
 
+class TestPrefixHierarchy(TestCase):
+    """Tests for maintenance of the `parent` field of Prefixes and IPAddresses."""
+
+    def assertParent(self, obj, parent):
+        obj.refresh_from_db()
+        self.assertEqual(obj.parent, parent)
+
+    def test_create(self):
+        vrf = VRF.objects.create(name="VRF 1")
+        ip = IPAddress.objects.create(address=netaddr.IPNetwork("10.0.1.1/24"))
+        child = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/24"))
+        parent = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/8"))
+        middle = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"))
+        other_vrf = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/12"), vrf=vrf)
+
+        self.assertParent(parent, None)
+        self.assertParent(middle, parent)
+        self.assertParent(child, middle)
+        self.assertParent(ip, child)
+        self.assertParent(other_vrf, None)
+
+    def test_modify(self):
+        parent = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/8"))
+        prefix = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"))
+        child = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/24"))
+        ip = IPAddress.objects.create(address=netaddr.IPNetwork("10.0.1.1/24"))
+        other_ip = IPAddress.objects.create(address=netaddr.IPNetwork("10.0.2.1/24"))
+        self.assertParent(child, prefix)
+        self.assertParent(other_ip, prefix)
+
+        # Shrinking the prefix releases children which are no longer within it
+        prefix.prefix = netaddr.IPNetwork("10.0.1.0/24")
+        prefix.save()
+        self.assertParent(prefix, parent)
+        self.assertParent(child, parent)
+        self.assertParent(ip, child)
+        self.assertParent(other_ip, parent)
+
+        # Moving the prefix to another VRF releases all of its children
+        prefix.vrf = VRF.objects.create(name="VRF 1")
+        prefix.save()
+        self.assertParent(prefix, None)
+
+        # Moving an IP address updates its parent
+        ip.vrf = prefix.vrf
+        ip.save()
+        self.assertParent(ip, prefix)
+
+    def test_delete(self):
+        parent = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/8"))
+        prefix = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"))
+        child = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/24"))
+        ip = IPAddress.objects.create(address=netaddr.IPNetwork("10.0.2.1/24"))
+
+        prefix.delete()
+        self.assertParent(child, parent)
+        self.assertParent(ip, parent)
+
+        parent.delete()
+        self.assertParent(child, None)
+        self.assertParent(ip, None)
+
+    def test_bulk_create(self):
+        prefix = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/16"))
+        child = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/24"))
+        prefixes = Prefix.objects.bulk_create(
+            (
+                Prefix(prefix=netaddr.IPNetwork("10.0.0.0/8")),
+                Prefix(prefix=netaddr.IPNetwork("10.0.1.0/25")),
+            )
+        )
+        ips = IPAddress.objects.bulk_create(
+            (
+                IPAddress(address=netaddr.IPNetwork("10.0.1.1/24")),
+                IPAddress(address=netaddr.IPNetwork("10.1.0.1/16")),
+                IPAddress(address=netaddr.IPNetwork("192.0.2.1/24")),
+            )
+        )
+
+        self.assertParent(prefix, prefixes[0])
+        self.assertParent(child, prefix)
+        self.assertParent(prefixes[1], child)
+        self.assertEqual(prefixes[1].parent_id, child.pk)
+        self.assertParent(ips[0], prefixes[1])
+        self.assertParent(ips[1], prefixes[0])
+        self.assertParent(ips[2], None)
+
+    def test_rebuild_prefix_hierarchy(self):
+        parent = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/8"))
+        child = Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.1.0/24"))
+        ip = IPAddress.objects.create(address=netaddr.IPNetwork("10.0.1.1/24"))
+        Prefix.objects.update(parent=None)
+        IPAddress.objects.update(parent=None)
+
+        call_command("rebuild_prefix_hierarchy", stdout=StringIO())
+        self.assertParent(parent, None)
+        self.assertParent(child, parent)
+        self.assertParent(ip, child)
+
+
 class TestIPAddress(TestCase):
     def test_get_duplicates(self):
         ips = (
@@ -408,3 +611,49 @@ class TestVLANGroup(TestCase):
 
         VLAN.objects.bulk_create((VLAN(name="VLAN 4", vid=4, group=vlangroup),))
         self.assertEqual(vlangroup.get_next_available_vid(), 6)
+
+    def test_get_available_vid_ranges(self):
+
+        vlangroup = VLANGroup.objects.create(name="VLAN Group 1", slug="vlan-group-1")
+        self.assertEqual(vlangroup.get_available_vid_ranges(), [(1, 4094)])
+
+        VLAN.objects.bulk_create(
+            (
+                VLAN(name="VLAN 2", vid=2, group=vlangroup),
+                VLAN(name="VLAN 3", vid=3, group=vlangroup),
+                VLAN(name="VLAN 100", vid=100, group=vlangroup),
+                VLAN(name="VLAN 4094", vid=4094, group=vlangroup),
+            )
+        )
+        self.assertEqual(vlangroup.get_available_vid_ranges(), [(1, 1), (4, 96), (101, 3993)])
+        self.assertEqual(list(islice(vlangroup.iter_available_vids(), 3)), [1, 4, 5])
+
+    def test_get_vid_bitmap_cached(self):
+
+        vlangroup = VLANGroup.objects.create(name="VLAN Group 1", slug="vlan-group-1")
+        vlan = VLAN.objects.create(name="VLAN 1", vid=1, group=vlangroup)
+        cache_key = VLANGroup.get_vid_bitmap_cache_key(vlangroup.pk)
+
+        # Outside of a transaction, the bitmap is cached until a VLAN in the group is modified
+        with mock.patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(vlangroup.get_vid_bitmap(), 0b10)
+        self.assertEqual(cache.get(cache_key), 0b10)
+        with mock.patch.object(connection, "in_atomic_block", False), self.assertNumQueries(0):
+            self.assertEqual(vlangroup.get_next_available_vid(), 2)
+
+        with mock.patch("nautobot.ipam.signals.transaction.on_commit", lambda func: func()):
+            vlan.vid = 2
+            vlan.save()
+        self.assertIsNone(cache.get(cache_key))
+        with mock.patch.object(connection, "in_atomic_block", False):
+            self.assertEqual(vlangroup.get_next_available_vid(), 1)
+
+        # Moving a VLAN to another group invalidates the bitmaps of both groups
+        other_vlangroup = VLANGroup.objects.create(name="VLAN Group 2", slug="vlan-group-2")
+        with mock.patch.object(connection, "in_atomic_block", False):
+            other_vlangroup.get_vid_bitmap()
+        with mock.patch("nautobot.ipam.signals.transaction.on_commit", lambda func: func()):
+            vlan.group = other_vlangroup
+            vlan.save()
+        self.assertIsNone(cache.get(cache_key))
+        self.assertIsNone(cache.get(VLANGroup.get_vid_bitmap_cache_key(other_vlangroup.pk)))
@@ -1,6 +1,6 @@
 import netaddr
 
-from nautobot.ipam.models import Prefix, Aggregate, IPAddress, RIR
+from nautobot.ipam.models import Prefix, Aggregate, IPAddress, RIR, VRF
 from nautobot.utilities.testing import TestCase
 
 
@@ -108,6 +108,36 @@ class IPAddressQuerySet(TestCase):
         args = ["10.0.0.1/24", "10.0.0.1/25"]
         self.assertEqual(self.queryset.net_in(args).count(), 2)
 
+        # Each host is matched only with its own mask
+        args = ["10.0.0.1/24", "10.0.0.2/25"]
+        self.assertEqual(self.queryset.net_in(args).count(), 1)
+
+        args = ["10.0.0.2/25", "10.0.0.3", "2001:db8::1/64"]
+        self.assertEqual(self.queryset.net_in(args).count(), 2)
+
+        self.assertEqual(self.queryset.net_in([]).count(), 0)
+
+    def test_bulk_lookup(self):
+        vrf = VRF.objects.create(name="VRF 1")
+        vrf_address = IPAddress.objects.create(address="10.0.0.1/24", vrf=vrf)
+        addresses = [
+            ("10.0.0.1/24", None),
+            (netaddr.IPNetwork("10.0.0.1/24"), vrf),
+            ("10.0.0.1/25", None),
+            ("10.0.0.2/25", None),  # Does not exist
+            ("2001:db8::2/64", None),
+            ("2001:db8::3/64", vrf.pk),  # Does not exist
+        ]
+        with self.assertNumQueries(2):
+            results = self.queryset.bulk_lookup(addresses, batch_size=3)
+
+        self.assertEqual(
+            set(results),
+            {("10.0.0.1/24", None), ("10.0.0.1/24", vrf.pk), ("10.0.0.1/25", None), ("2001:db8::2/64", None)},
+        )
+        self.assertEqual(results[("10.0.0.1/24", vrf.pk)], [vrf_address])
+        self.assertEqual(results[("10.0.0.1/24", None)], [IPAddress.objects.get(address="10.0.0.1/24", vrf=None)])
+
     def test_get_by_address(self):
         address = self.queryset.net_in(["10.0.0.1/24"])[0]
         self.assertEqual(self.queryset.get(address="10.0.0.1/24"), address)
@@ -277,3 +307,21 @@ class PrefixQuerysetTestCase(TestCase):
         }
         for term, cnt in search_terms.items():
             self.assertEqual(self.queryset.string_search(term).count(), cnt)
+
+    def test_string_search_text(self):
+        Prefix.objects.create(prefix=netaddr.IPNetwork("0.0.0.0/0"), description="Default route")
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.99.0.0/16"), description="Cafe network")
+        search_terms = {
+            "default": 1,
+            "ROUTE": 1,
+            # Not network strings, so they should not be matched against network ranges
+            "foo": 0,
+            "cafe": 1,
+            "bad": 0,
+            "cafe/16": 0,
+            # Resembles a network string, but does not parse as one
+            "1.2.3.4.5": 0,
+            "192.168.3.192": 4,
+        }
+        for term, cnt in search_terms.items():
+            self.assertEqual(self.queryset.string_search(term).count(), cnt)
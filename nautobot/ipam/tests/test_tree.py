@@ -0,0 +1,134 @@
+import random
+import uuid
+
+import netaddr
+from django.test import SimpleTestCase, TestCase
+
+from nautobot.ipam.models import Prefix, VRF
+from nautobot.ipam.tree import PrefixTree, PrefixTreeIndex
+
+
+class PrefixTreeTestCase(SimpleTestCase):
+
+    prefixes = (
+        "10.0.0.0/8",
+        "10.0.0.0/16",
+        "10.0.0.0/24",
+        "10.0.1.0/24",
+        "10.0.1.0/24",  # duplicate
+        "10.0.1.128/25",
+        "10.1.0.0/16",
+        "192.168.0.0/16",
+        "2001:db8::/32",
+        "2001:db8::/48",
+        "2001:db8:1::/48",
+    )
+
+    def setUp(self):
+        self.tree = PrefixTree()
+        for i, prefix in enumerate(self.prefixes):
+            self.tree.insert(netaddr.IPNetwork(prefix), i)
+
+    def test_len(self):
+        self.assertEqual(len(self.tree), len(self.prefixes))
+
+    def test_count_parents(self):
+        self.assertEqual(self.tree.count_parents("10.0.0.0/8"), 0)
+        self.assertEqual(self.tree.count_parents("10.0.0.0/16"), 1)
+        self.assertEqual(self.tree.count_parents("10.0.1.0/24"), 2)
+        self.assertEqual(self.tree.count_parents("10.0.1.128/25"), 4)
+        self.assertEqual(self.tree.count_parents("10.0.1.1/32"), 4)
+        self.assertEqual(self.tree.count_parents("10.0.1.129/32"), 5)
+        self.assertEqual(self.tree.count_parents("172.16.0.0/12"), 0)
+        self.assertEqual(self.tree.count_parents("2001:db8:1::/64"), 2)
+
+    def test_count_children(self):
+        self.assertEqual(self.tree.count_children("0.0.0.0/0"), 8)
+        self.assertEqual(self.tree.count_children("10.0.0.0/8"), 6)
+        self.assertEqual(self.tree.count_children("10.0.0.0/16"), 4)
+        self.assertEqual(self.tree.count_children("10.0.1.0/24"), 1)
+        self.assertEqual(self.tree.count_children("10.0.0.0/23"), 4)
+        self.assertEqual(self.tree.count_children("10.0.1.128/25"), 0)
+        self.assertEqual(self.tree.count_children("172.16.0.0/12"), 0)
+        self.assertEqual(self.tree.count_children("2001:db8::/32"), 2)
+
+    def test_get_parents_and_children(self):
+        parents = self.tree.get_parents("10.0.1.128/25")
+        self.assertEqual(parents[:2], [0, 1])
+        self.assertEqual(set(parents), {0, 1, 3, 4})
+        self.assertEqual(set(self.tree.get_closest_parents("10.0.1.128/25")), {3, 4})
+        self.assertEqual(self.tree.get_closest_parents("10.0.0.0/8"), [])
+        self.assertEqual(set(self.tree.get_children("10.0.0.0/16")), {2, 3, 4, 5})
+        self.assertEqual(set(self.tree.get_children("10.0.0.0/15")), {1, 2, 3, 4, 5, 6})
+
+    def test_remove(self):
+        self.assertTrue(self.tree.remove(1))
+        self.assertFalse(self.tree.remove(1))
+        self.assertEqual(self.tree.count_parents("10.0.1.0/24"), 1)
+        self.assertEqual(self.tree.count_children("10.0.0.0/8"), 5)
+        self.assertNotIn(1, self.tree)
+
+        self.assertTrue(self.tree.remove(0))
+        self.assertEqual(self.tree.count_children("0.0.0.0/0"), 6)
+        self.assertEqual(self.tree.count_parents("10.0.1.128/25"), 2)
+
+    def test_insert_existing_key_moves_prefix(self):
+        self.tree.insert(netaddr.IPNetwork("172.16.0.0/12"), 7)
+        self.assertEqual(self.tree.get(7), netaddr.IPNetwork("172.16.0.0/12"))
+        self.assertEqual(self.tree.count_children("192.168.0.0/15"), 0)
+        self.assertEqual(len(self.tree), len(self.prefixes))
+
+    def test_against_brute_force(self):
+        rng = random.Random(1234)
+        tree = PrefixTree()
+        stored = {}
+
+        for key in range(500):
+            prefix_length = rng.randint(8, 32)
+            prefix = netaddr.IPNetwork(f"10.0.0.0/{prefix_length}")
+            prefix.value = (10 << 24) | rng.getrandbits(24)
+            prefix = prefix.cidr
+            tree.insert(prefix, key)
+            stored[key] = prefix
+
+        for key in rng.sample(list(stored), 150):
+            tree.remove(key)
+            del stored[key]
+
+        for prefix in list(stored.values())[:100]:
+            parents = {k for k, p in stored.items() if p.prefixlen < prefix.prefixlen and prefix in p}
+            children = {k for k, p in stored.items() if p.prefixlen > prefix.prefixlen and p in prefix}
+            self.assertEqual(tree.count_parents(prefix), len(parents))
+            self.assertEqual(set(tree.get_parents(prefix)), parents)
+            self.assertEqual(tree.count_children(prefix), len(children))
+            self.assertEqual(set(tree.get_children(prefix)), children)
+
+
+class PrefixTreeIndexTestCase(TestCase):
+    def setUp(self):
+        self.vrf = VRF.objects.create(name="Tree Index VRF")
+        Prefix.objects.create(prefix=netaddr.IPNetwork("10.0.0.0/8"), vrf=self.vrf)
+
+    def test_replay_changes_from_other_process(self):
+        index, other_index = PrefixTreeIndex(), PrefixTreeIndex()
+        tree = index.get_tree(self.vrf.pk)
+        self.assertEqual(len(tree), 1)
+
+        key = uuid.uuid4()
+        other_index.update(self.vrf.pk, key, netaddr.IPNetwork("10.1.0.0/16"))
+        with self.assertNumQueries(0):
+            self.assertIs(index.get_tree(self.vrf.pk), tree)
+        self.assertEqual(tree.count_children("10.0.0.0/8"), 1)
+
+        other_index.update(self.vrf.pk, key)
+        with self.assertNumQueries(0):
+            self.assertIs(index.get_tree(self.vrf.pk), tree)
+        self.assertEqual(tree.count_children("10.0.0.0/8"), 0)
+
+    def test_rebuild_after_invalidation(self):
+        index, other_index = PrefixTreeIndex(), PrefixTreeIndex()
+        tree = index.get_tree(self.vrf.pk)
+
+        other_index.invalidate(self.vrf.pk)
+        with self.assertNumQueries(1):
+            self.assertIsNot(index.get_tree(self.vrf.pk), tree)
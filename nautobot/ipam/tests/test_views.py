@@ -4,6 +4,7 @@ from netaddr import IPNetwork
 
 from nautobot.dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
 from nautobot.extras.models import Status
+from nautobot.ipam import tables
 from nautobot.ipam.choices import *
 from nautobot.ipam.models import (
     Aggregate,
@@ -272,6 +273,11 @@ class PrefixTestCase(ViewTestCases.PrimaryObjectViewTestCase):
             "description": "New description",
         }
 
+    def test_table_annotates_utilization_if_shown(self):
+        # Utilization is shown by default by PrefixDetailTable, but not by PrefixTable
+        self.assertTrue(tables.PrefixDetailTable(Prefix.objects.all()).data.data._with_utilization)
+        self.assertFalse(tables.PrefixTable(Prefix.objects.all()).data.data._with_utilization)
+
 
 class IPAddressTestCase(ViewTestCases.PrimaryObjectViewTestCase):
     model = IPAddress
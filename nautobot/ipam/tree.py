@@ -0,0 +1,431 @@
+import threading
+
+import netaddr
+from django.core.cache import cache
+
+
+__all__ = (
+    "PrefixTree",
+    "PrefixTreeIndex",
+    "prefix_tree_index",
+    "rebuild_hierarchy",
+)
+
+
+class _Node:
+    """
+    A single node of a `PrefixTree`.
+
+    Nodes which have no `entries` are "glue" nodes, created only to join two diverging branches of the tree.
+    """
+
+    __slots__ = ("network", "prefix_length", "children", "entries", "count")
+
+    def __init__(self, network, prefix_length):
+        self.network = network
+        self.prefix_length = prefix_length
+        self.children = [None, None]
+        self.entries = set()
+        # Total number of entries stored at or beneath this node
+        self.count = 0
+
+
+class PrefixTree:
+    """
+    A path-compressed binary radix (Patricia) tree of IP prefixes.
+
+    Each prefix is stored against an arbitrary identifier (typically the primary key of a Prefix). Multiple identifiers
+    may be stored against the same prefix, as duplicate prefixes are permitted within a VRF. Lookups walk at most one
+    node per bit of the address, independent of the number of prefixes stored in the tree.
+    """
+
+    def __init__(self):
+        self._roots = {
+            4: _Node(0, 0),
+            6: _Node(0, 0),
+        }
+        self._max_length = {
+            4: 32,
+            6: 128,
+        }
+        # Map of identifier to the prefix it was stored against, used to support removal and updates by identifier
+        self._prefixes = {}
+
+    def __len__(self):
+        return len(self._prefixes)
+
+    def __contains__(self, key):
+        return key in self._prefixes
+
+    @staticmethod
+    def _parse(prefix):
+        if not isinstance(prefix, netaddr.IPNetwork):
+            prefix = netaddr.IPNetwork(prefix)
+        return prefix.version, prefix.first, prefix.prefixlen
+
+    def _bit(self, version, network, position):
+        """Return the bit of `network` at `position` (counting from the most significant bit)."""
+        return (network >> (self._max_length[version] - position - 1)) & 1
+
+    def _common_length(self, version, a, b, limit):
+        """Return the number of leading bits (up to `limit`) shared by networks `a` and `b`."""
+        max_length = self._max_length[version]
+        diff = (a ^ b) >> (max_length - limit) if limit else 0
+        if not diff:
+            return limit
+        return limit - diff.bit_length()
+
+    def _contains(self, version, node, network, prefix_length):
+        """Return True if `node` covers (or is equal to) the given network."""
+        if node.prefix_length > prefix_length:
+            return False
+        return self._common_length(version, node.network, network, node.prefix_length) == node.prefix_length
+
+    def get(self, key):
+        """
+        Return the `netaddr.IPNetwork` stored against `key`, or None.
+        """
+        stored = self._prefixes.get(key)
+        if stored is None:
+            return None
+        version, network, prefix_length = stored
+        return netaddr.IPNetwork((network, prefix_length), version=version)
+
+    def insert(self, prefix, key):
+        """
+        Store `key` against `prefix`. If `key` is already present in the tree, it is moved to the new prefix.
+        """
+        if key in self._prefixes:
+            self.remove(key)
+
+        version, network, prefix_length = self._parse(prefix)
+        self._prefixes[key] = (version, network, prefix_length)
+
+        node = self._roots[version]
+        while True:
+            node.count += 1
+            if node.prefix_length == prefix_length:
+                node.entries.add(key)
+                return
+
+            bit = self._bit(version, network, node.prefix_length)
+            child = node.children[bit]
+            if child is None:
+                leaf = _Node(network, prefix_length)
+                leaf.entries.add(key)
+                leaf.count = 1
+                node.children[bit] = leaf
+                return
+
+            common = self._common_length(version, network, child.network, min(prefix_length, child.prefix_length))
+            if common == child.prefix_length:
+                # The child covers the new prefix; descend into it
+                node = child
+                continue
+
+            if common == prefix_length:
+                # The new prefix covers the child; insert it between the current node and the child
+                new = _Node(network, prefix_length)
+                new.entries.add(key)
+                new.count = child.count + 1
+                new.children[self._bit(version, child.network, prefix_length)] = child
+                node.children[bit] = new
+                return
+
+            # The new prefix and the child diverge; join them beneath a new glue node
+            mask = ((1 << common) - 1) << (self._max_length[version] - common)
+            glue = _Node(network & mask, common)
+            glue.count = child.count + 1
+            leaf = _Node(network, prefix_length)
+            leaf.entries.add(key)
+            leaf.count = 1
+            glue.children[self._bit(version, child.network, common)] = child
+            glue.children[self._bit(version, network, common)] = leaf
+            node.children[bit] = glue
+            return
+
+    def remove(self, key):
+        """
+        Remove `key` from the tree. Returns True if the key was present.
+        """
+        stored = self._prefixes.pop(key, None)
+        if stored is None:
+            return False
+        version, network, prefix_length = stored
+
+        # Collect the path from the root to the node holding the key
+        path = [self._roots[version]]
+        while path[-1].prefix_length != prefix_length:
+            path.append(path[-1].children[self._bit(version, network, path[-1].prefix_length)])
+
+        path[-1].entries.discard(key)
+        for node in path:
+            node.count -= 1
+
+        # Prune nodes which no longer hold entries and no longer join two branches
+        for depth in range(len(path) - 1, 0, -1):
+            node, parent = path[depth], path[depth - 1]
+            if node.entries:
+                break
+            remaining = [child for child in node.children if child is not None]
+            if len(remaining) == 2:
+                break
+            parent.children[parent.children.index(node)] = remaining[0] if remaining else None
+
+        return True
+
+    def _walk(self, prefix):
+        """
+        Yield each node on the path from the root toward `prefix` which covers (or is equal to) `prefix`, followed by
+        the first node (if any) which is covered by `prefix`.
+        """
+        version, network, prefix_length = self._parse(prefix)
+        node = self._roots[version]
+        while node is not None:
+            if node.prefix_length >= prefix_length:
+                if self._common_length(version, node.network, network, prefix_length) == prefix_length:
+                    yield node
+                return
+            if not self._contains(version, node, network, prefix_length):
+                return
+            yield node
+            node = node.children[self._bit(version, network, node.prefix_length)]
+
+    def count_parents(self, prefix):
+        """
+        Return the number of stored prefixes which strictly contain `prefix`.
+        """
+        prefix_length = self._parse(prefix)[2]
+        return sum(len(node.entries) for node in self._walk(prefix) if node.prefix_length < prefix_length)
+
+    def count_children(self, prefix):
+        """
+        Return the number of stored prefixes which are strictly contained within `prefix`.
+        """
+        prefix_length = self._parse(prefix)[2]
+        for node in self._walk(prefix):
+            if node.prefix_length == prefix_length:
+                return node.count - len(node.entries)
+            if node.prefix_length > prefix_length:
+                return node.count
+        return 0
+
+    def get_parents(self, prefix):
+        """
+        Return the keys of all stored prefixes which strictly contain `prefix`, ordered from the least to the most
+        specific.
+        """
+        prefix_length = self._parse(prefix)[2]
+        keys = []
+        for node in self._walk(prefix):
+            if node.prefix_length < prefix_length:
+                keys.extend(node.entries)
+        return keys
+
+    def get_closest_parents(self, prefix, inclusive=False):
+        """
+        Return the keys of the most specific stored prefix(es) which strictly contain `prefix` (or which contain or are
+        equal to `prefix`, if `inclusive` is True).
+        """
+        prefix_length = self._parse(prefix)[2]
+        keys = []
+        for node in self._walk(prefix):
+            if not node.entries or node.prefix_length > prefix_length:
+                continue
+            if node.prefix_length < prefix_length or inclusive:
+                keys = list(node.entries)
+        return keys
+
+    def get_children(self, prefix):
+        """
+        Return the keys of all stored prefixes which are strictly contained within `prefix`.
+        """
+        prefix_length = self._parse(prefix)[2]
+        keys = []
+        start = None
+        for node in self._walk(prefix):
+            if node.prefix_length >= prefix_length:
+                start = node
+        if start is None:
+            return keys
+
+        stack = [child for child in start.children if child is not None]
+        if start.prefix_length > prefix_length:
+            keys.extend(start.entries)
+        while stack:
+            node = stack.pop()
+            keys.extend(node.entries)
+            stack.extend(child for child in node.children if child is not None)
+        return keys
+
+
+class PrefixTreeIndex:
+    """
+    A process-local cache of `PrefixTree`s of all Prefixes, one per VRF.
+
+    Trees are built lazily from the database on first use. The `post_save` and `post_delete` signal handlers for Prefix
+    bump a per-VRF version number held in the shared cache, and record each change in the cache against its version.
+    The process making a change applies it to its own tree directly; other processes bring their copy of the tree up
+    to date on next use by replaying the recorded changes, and only rebuild it from the database if any change is no
+    longer available (or too many have been made since their copy was last used).
+    """
+
+    cache_key_prefix = "nautobot.ipam.prefix_tree"
+    # Maximum number of recorded changes which will be replayed onto a stale tree, rather than rebuilding it
+    max_replay = 1000
+    # Number of seconds for which each change is retained in the cache
+    change_timeout = 3600
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Map of VRF ID (or None, for the global table) to a (version, PrefixTree) tuple
+        self._trees = {}
+
+    def _get_cache_key(self, vrf_id):
+        return f"{self.cache_key_prefix}.{vrf_id or 'global'}"
+
+    def _get_change_cache_key(self, vrf_id, version):
+        return f"{self._get_cache_key(vrf_id)}.{version}"
+
+    def _build(self, vrf_id):
+        from nautobot.ipam.models import Prefix
+
+        tree = PrefixTree()
+        for pk, network, prefix_length in (
+            Prefix.objects.filter(vrf_id=vrf_id).order_by().values_list("pk", "network", "prefix_length").iterator()
+        ):
+            tree.insert(netaddr.IPNetwork(f"{network}/{prefix_length}"), pk)
+        return tree
+
+    def _replay(self, vrf_id, tree, from_version, to_version):
+        """
+        Apply the changes recorded after `from_version` up to and including `to_version` to the given tree. Returns
+        False (leaving the tree unmodified) if any of those changes is not available from the cache.
+        """
+        cache_keys = [
+            self._get_change_cache_key(vrf_id, version) for version in range(from_version + 1, to_version + 1)
+        ]
+        changes = cache.get_many(cache_keys)
+        if len(changes) != len(cache_keys):
+            return False
+        for cache_key in cache_keys:
+            key, cidr = changes[cache_key]
+            if cidr is None:
+                tree.remove(key)
+            else:
+                tree.insert(netaddr.IPNetwork(cidr), key)
+        return True
+
+    def get_tree(self, vrf_id):
+        """
+        Return the `PrefixTree` for the given VRF ID (or None for the global table), building or updating it if
+        necessary.
+        """
+        version = cache.get(self._get_cache_key(vrf_id), 0)
+        with self._lock:
+            cached = self._trees.get(vrf_id)
+            if cached is not None:
+                tree_version, tree = cached
+                if tree_version == version:
+                    return tree
+                if tree_version < version <= tree_version + self.max_replay and self._replay(
+                    vrf_id, tree, tree_version, version
+                ):
+                    self._trees[vrf_id] = (version, tree)
+                    return tree
+            tree = self._build(vrf_id)
+            self._trees[vrf_id] = (version, tree)
+            return tree
+
+    def update(self, vrf_id, key, prefix=None):
+        """
+        Record a change to a Prefix in the given VRF. If `prefix` is None, the key is removed from the tree.
+        """
+        cache_key = self._get_cache_key(vrf_id)
+        cache.add(cache_key, 0, timeout=None)
+        version = cache.incr(cache_key)
+        cache.set(
+            self._get_change_cache_key(vrf_id, version),
+            (key, None if prefix is None else str(prefix)),
+            timeout=self.change_timeout,
+        )
+
+        with self._lock:
+            cached = self._trees.get(vrf_id)
+            if cached is None or cached[0] != version - 1:
+                # Our copy of this tree is missing or stale; it will be updated or rebuilt on next use
+                return
+            tree = cached[1]
+            if prefix is None:
+                tree.remove(key)
+            else:
+                tree.insert(prefix, key)
+            self._trees[vrf_id] = (version, tree)
+
+    def invalidate(self, vrf_id):
+        """
+        Mark the tree for the given VRF as stale in all processes, such as after a bulk change to its Prefixes. As no
+        change is recorded for the new version, each process will rebuild its copy of the tree on next use.
+        """
+        cache_key = self._get_cache_key(vrf_id)
+        cache.add(cache_key, 0, timeout=None)
+        version = cache.incr(cache_key)
+        cache.delete(self._get_change_cache_key(vrf_id, version))
+
+    def clear(self):
+        """
+        Discard all trees held by this process.
+        """
+        with self._lock:
+            self._trees = {}
+
+
+prefix_tree_index = PrefixTreeIndex()
+
+
+def rebuild_hierarchy(prefix_model, ipaddress_model, vrf_ids=None):
+    """
+    Recompute the `parent` of every Prefix and IPAddress (optionally limited to the given VRF IDs), updating only those
+    records whose parent has changed. Returns a tuple of the number of Prefixes and IPAddresses updated.
+
+    The model classes are passed in so that this function may also be used by data migrations.
+    """
+    if vrf_ids is None:
+        vrf_ids = set(prefix_model.objects.order_by().values_list("vrf_id", flat=True).distinct())
+        vrf_ids.update(ipaddress_model.objects.order_by().values_list("vrf_id", flat=True).distinct())
+
+    prefix_count = ipaddress_count = 0
+    for vrf_id in vrf_ids:
+        tree = PrefixTree()
+        prefixes = []
+        for pk, network, prefix_length, parent_id in (
+            prefix_model.objects.filter(vrf_id=vrf_id)
+            .order_by()
+            .values_list("pk", "network", "prefix_length", "parent_id")
+            .iterator()
+        ):
+            prefix = netaddr.IPNetwork(f"{network}/{prefix_length}")
+            tree.insert(prefix, pk)
+            prefixes.append((pk, prefix, parent_id))
+
+        changed = []
+        for pk, prefix, parent_id in prefixes:
+            parents = tree.get_closest_parents(prefix)
+            new_parent_id = min(parents) if parents else None
+            if new_parent_id != parent_id:
+                changed.append(prefix_model(pk=pk, parent_id=new_parent_id))
+        prefix_model.objects.bulk_update(changed, ["parent"], batch_size=1000)
+        prefix_count += len(changed)
+
+        changed = []
+        for pk, host, parent_id in (
+            ipaddress_model.objects.filter(vrf_id=vrf_id).order_by().values_list("pk", "host", "parent_id").iterator()
+        ):
+            parents = tree.get_closest_parents(netaddr.IPNetwork(host), inclusive=True)
+            new_parent_id = min(parents) if parents else None
+            if new_parent_id != parent_id:
+                changed.append(ipaddress_model(pk=pk, parent_id=new_parent_id))
+        ipaddress_model.objects.bulk_update(changed, ["parent"], batch_size=1000)
+        ipaddress_count += len(changed)
+
+    return prefix_count, ipaddress_count
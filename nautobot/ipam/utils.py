@@ -1,9 +1,48 @@
 import netaddr
+from django.db.models import Q
 
 from .constants import *
 from .models import Prefix, VLAN
 
 
+def get_available_prefixes(parents):
+    """
+    Return a dictionary mapping the primary key of each of the given Prefixes to an IPSet of its available space, as
+    would be returned by `Prefix.get_available_prefixes()`.
+
+    The direct children of all parents are retrieved in a single query. (Global container Prefixes, which also
+    contain Prefixes in any VRF, are handled individually.)
+    """
+    available = {}
+    children = {}
+    parents = list(parents)
+    grouped = [p for p in parents if not (p.vrf_id is None and p.status_id == Prefix.STATUS_CONTAINER.pk)]
+
+    grouped_pks = {p.pk for p in grouped}
+    if grouped:
+        # The children of duplicate Prefixes may be assigned to any one of them
+        duplicates = Q()
+        for p in grouped:
+            duplicates |= Q(vrf_id=p.vrf_id, network=p.network, prefix_length=p.prefix_length)
+        queryset = (
+            Prefix.objects.filter(parent__in=Prefix.objects.filter(duplicates).values("pk"))
+            .order_by()
+            .values_list("parent__vrf_id", "parent__network", "parent__prefix_length", "network", "prefix_length")
+        )
+        for vrf_id, parent_network, parent_prefix_length, network, prefix_length in queryset:
+            key = (vrf_id, parent_network, parent_prefix_length)
+            children.setdefault(key, []).append(f"{network}/{prefix_length}")
+
+    for parent in parents:
+        if parent.pk in grouped_pks:
+            key = (parent.vrf_id, parent.network, parent.prefix_length)
+            available[parent.pk] = netaddr.IPSet(parent.prefix) - netaddr.IPSet(children.get(key, []))
+        else:
+            available[parent.pk] = parent.get_available_prefixes()
+
+    return available
+
+
 def add_available_prefixes(parent, prefix_list):
     """
     Create fake Prefix objects for all unallocated space within a prefix.
@@ -74,20 +113,7 @@ def add_available_vlans(vlan_group, vlans):
     """
     Create fake records for all gaps between used VLANs
     """
-    if not vlans:
-        return [{"vid": VLAN_VID_MIN, "available": VLAN_VID_MAX - VLAN_VID_MIN + 1}]
-
-    prev_vid = VLAN_VID_MAX
-    new_vlans = []
-    for vlan in vlans:
-        if vlan.vid - prev_vid > 1:
-            new_vlans.append({"vid": prev_vid + 1, "available": vlan.vid - prev_vid - 1})
-        prev_vid = vlan.vid
-
-    if vlans[0].vid > VLAN_VID_MIN:
-        new_vlans.append({"vid": VLAN_VID_MIN, "available": vlans[0].vid - VLAN_VID_MIN})
-    if prev_vid < VLAN_VID_MAX:
-        new_vlans.append({"vid": prev_vid + 1, "available": VLAN_VID_MAX - prev_vid})
+    new_vlans = [{"vid": vid, "available": count} for vid, count in vlan_group.get_available_vid_ranges()]
 
     vlans = list(vlans) + new_vlans
     vlans.sort(key=lambda v: v.vid if type(v) == VLAN else v["vid"])
@@ -225,7 +225,7 @@ class AggregateListView(generic.ObjectListView):
         for aggregate in self.queryset:
             if aggregate.prefix.version == 6:
                 # Report equivalent /64s for IPv6 to keep things sane
-                ipv6_total += int(aggregate.prefix.size / 2 ** 64)
+                ipv6_total += int(aggregate.prefix.size / 2**64)
             else:
                 ipv4_total += aggregate.prefix.size
 
@@ -246,6 +246,7 @@ class AggregateView(generic.ObjectView):
             .prefetch_related("site", "role")
             .order_by("network")
             .annotate_tree()
+            .annotate_utilization()
         )
 
         # Add available prefixes to the table if requested
@@ -457,6 +458,7 @@ class PrefixPrefixesView(generic.ObjectView):
             .restrict(request.user, "view")
             .prefetch_related("site", "status", "role", "vlan")
             .annotate_tree()
+            .annotate_utilization()
         )
 
         # Add available prefixes to the table if requested
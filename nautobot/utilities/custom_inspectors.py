@@ -37,6 +37,10 @@ class NautobotSwaggerAutoSchema(SwaggerAutoSchema):
     def get_request_serializer(self):
         serializer = super().get_request_serializer()
 
+        # A request body may be overridden with an explicit Schema rather than a serializer
+        if isinstance(serializer, openapi.Schema.OR_REF):
+            return serializer
+
         if serializer is not None and self.method in self.implicit_body_methods:
             writable_class = self.get_writable_class(serializer)
             if writable_class is not None:
@@ -1,5 +1,14 @@
+import datetime
+import json
+import logging
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.serializers import serialize
 from django.http import QueryDict
-from django.test import TestCase
+from django.test import TestCase, tag
+from netaddr import IPNetwork
 
 from nautobot.core.settings_funcs import is_truthy
 from nautobot.utilities.utils import (
@@ -7,8 +16,23 @@ from nautobot.utilities.utils import (
     deepmerge,
     dict_to_filter_params,
     normalize_querydict,
+    serialize_object,
+    _serialize_fields,
+)
+from nautobot.circuits.models import Circuit, CircuitType, Provider
+from nautobot.dcim.models import (
+    Cable,
+    Device,
+    DeviceRole,
+    DeviceType,
+    Interface,
+    Manufacturer,
+    Rack,
+    RackReservation,
+    Site,
 )
-from nautobot.dcim.models import Device, Site
+from nautobot.extras.models import ConfigContext, Status, Tag
+from nautobot.ipam.models import IPAddress, Prefix, VLAN
 from nautobot.dcim.filters import DeviceFilterSet, SiteFilterSet
 
 
@@ -158,3 +182,145 @@ class IsTruthyTest(TestCase):
         self.assertFalse(is_truthy("n"))
         self.assertFalse(is_truthy(0))
         self.assertFalse(is_truthy("0"))
+
+
+logger = logging.getLogger(__name__)
+
+
+def _serialize_fields_django(obj):
+    """
+    Return a dictionary of the field values of the given object using Django's built-in JSON serializer, as a reference
+    for `_serialize_fields()`.
+    """
+    return json.loads(serialize("json", [obj]))[0]["fields"]
+
+
+class SerializeObjectTest(TestCase):
+    """
+    Validate that serialize_object() represents objects as Django's built-in JSON serializer does.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        active = Status.objects.get(slug="active")
+        cls.tags = [Tag.objects.create(name=f"Tag {i}", slug=f"tag-{i}") for i in range(1, 3)]
+        cls.site = Site.objects.create(
+            name="Site 1",
+            slug="site-1",
+            status=active,
+            asn=65000,
+            latitude=Decimal("12.345678"),
+            time_zone="Europe/Paris",
+            _custom_field_data={"field_1": "value", "field_2": 2},
+        )
+        cls.site.tags.set(*cls.tags)
+        rack = Rack.objects.create(name="Rack 1", site=cls.site, status=active)
+        cls.rack_reservation = RackReservation.objects.create(
+            rack=rack, units=[1, 2], user=get_user_model().objects.create(username="user-1"), description="Reserved"
+        )
+        manufacturer = Manufacturer.objects.create(name="Manufacturer 1", slug="manufacturer-1")
+        device_type = DeviceType.objects.create(manufacturer=manufacturer, model="Device Type 1", slug="device-type-1")
+        device_role = DeviceRole.objects.create(name="Device Role 1", slug="device-role-1")
+        cls.device = Device.objects.create(
+            name="Device 1",
+            device_type=device_type,
+            device_role=device_role,
+            site=cls.site,
+            rack=rack,
+            status=active,
+            local_context_data={"a": [1, 2]},
+        )
+        vlans = [VLAN.objects.create(vid=i, name=f"VLAN {i}", site=cls.site, status=active) for i in range(1, 4)]
+        cls.interfaces = [Interface.objects.create(device=cls.device, name=f"eth{i}") for i in range(0, 2)]
+        for interface in cls.interfaces:
+            interface.tagged_vlans.set(vlans)
+            interface.tags.set(*cls.tags)
+        cls.cable = Cable.objects.create(
+            termination_a=cls.interfaces[0],
+            termination_b=cls.interfaces[1],
+            status=Status.objects.get_for_model(Cable).get(slug="connected"),
+            length=Decimal("1.50"),
+            length_unit="m",
+        )
+        cls.prefix = Prefix.objects.create(prefix=IPNetwork("192.0.2.0/24"), status=active)
+        cls.ip_address = IPAddress.objects.create(address=IPNetwork("192.0.2.1/24"), status=active)
+        cls.circuit = Circuit.objects.create(
+            cid="Circuit 1",
+            provider=Provider.objects.create(name="Provider 1", slug="provider-1"),
+            type=CircuitType.objects.create(name="Circuit Type 1", slug="circuit-type-1"),
+            status=active,
+            install_date=datetime.date(2021, 1, 1),
+            commit_rate=1000,
+        )
+        cls.config_context = ConfigContext.objects.create(name="Config Context 1", data={"b": {"c": None}})
+        cls.config_context.sites.set([cls.site])
+
+    def _get_objects(self):
+        return [
+            Site.objects.get(pk=self.site.pk),
+            RackReservation.objects.get(pk=self.rack_reservation.pk),
+            Device.objects.get(pk=self.device.pk),
+            Interface.objects.get(pk=self.interfaces[0].pk),
+            Cable.objects.get(pk=self.cable.pk),
+            Prefix.objects.get(pk=self.prefix.pk),
+            IPAddress.objects.get(pk=self.ip_address.pk),
+            Circuit.objects.get(pk=self.circuit.pk),
+            ConfigContext.objects.get(pk=self.config_context.pk),
+        ]
+
+    def test_serialize_fields(self):
+        for obj in self._get_objects() + [self.site, self.cable]:
+            with self.subTest(model=obj._meta.label):
+                self.assertEqual(_serialize_fields(obj), _serialize_fields_django(obj))
+
+    def test_serialize_object(self):
+        data = serialize_object(Site.objects.get(pk=self.site.pk), extra={"extra": True}, exclude=["slug"])
+
+        self.assertEqual(data["custom_fields"], {"field_1": "value", "field_2": 2})
+        self.assertEqual(data["tags"], ["Tag 1", "Tag 2"])
+        self.assertEqual(data["latitude"], "12.345678")
+        self.assertTrue(data["extra"])
+        self.assertNotIn("slug", data)
+        self.assertNotIn("_custom_field_data", data)
+        self.assertNotIn("_name", data)
+
+    def test_serialize_object_prefetched(self):
+        interfaces = list(Interface.objects.prefetch_related("tags", "tagged_vlans"))
+        with self.assertNumQueries(0):
+            data = [serialize_object(interface) for interface in interfaces]
+
+        for interface, interface_data in zip(interfaces, data):
+            self.assertEqual(interface_data["tags"], ["Tag 1", "Tag 2"])
+            self.assertEqual(interface_data["tagged_vlans"], _serialize_fields_django(interface)["tagged_vlans"])
+
+    def test_serialize_fields_repeated(self):
+        """
+        Serializing many objects of each model, reusing its cached field plan, matches Django's built-in serializer.
+        """
+        objects = self._get_objects()
+        expected = [_serialize_fields_django(obj) for obj in objects]
+        for _ in range(10):
+            self.assertEqual([_serialize_fields(obj) for obj in objects], expected)
+
+    @tag("performance")
+    def test_serialize_fields_benchmark(self):
+        """
+        Compare the time taken to serialize objects with and without using Django's built-in serializer. This is only
+        run if requested with `nautobot-server test --tag performance`, and logs its timings rather than asserting on
+        them.
+        """
+        objects = self._get_objects()
+        timings = {}
+        for serialize_fields in (_serialize_fields_django, _serialize_fields):
+            start = time.perf_counter()
+            for _ in range(100):
+                for obj in objects:
+                    serialize_fields(obj)
+            timings[serialize_fields.__name__] = time.perf_counter() - start
+
+        logger.info(
+            "Serialized %d objects in %.3fs (using Django's serializer: %.3fs)",
+            100 * len(objects),
+            timings["_serialize_fields"],
+            timings["_serialize_fields_django"],
+        )
@@ -1,5 +1,7 @@
 import copy
 import datetime
+import decimal
+import functools
 import json
 import inspect
 from importlib import import_module
@@ -8,8 +10,8 @@ from itertools import count, groupby
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.serializers import serialize
-from django.db.models import Count, OuterRef, Subquery, Model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Field, OuterRef, Subquery, Model
 from django.db.models.functions import Coalesce
 from django.template import engines
 
@@ -107,15 +109,79 @@ def count_related(model, field):
     return Coalesce(subquery, 0)
 
 
+@functools.lru_cache(maxsize=None)
+def get_serialization_plan(model):
+    """
+    Return the fields of the given model which are included by Django's built-in serializer, as a tuple of
+    (concrete fields, many-to-many fields). Each concrete field is given as a (field name, field, whether the field's
+    `value_to_string()` is simply `str()`) tuple.
+    """
+    meta = model._meta.concrete_model._meta
+    fields = tuple(
+        (field.name, field, type(field).value_to_string is Field.value_to_string)
+        for field in meta.local_fields
+        if field.serialize
+    )
+    m2m_fields = tuple(
+        field for field in meta.local_many_to_many if field.serialize and field.remote_field.through._meta.auto_created
+    )
+    return fields, m2m_fields
+
+
+_json_encoder = DjangoJSONEncoder()
+
+
+def _serialize_value(value):
+    """
+    Return a value retrieved from a model field as it would be represented by Django's JSON serializer.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (decimal.Decimal, datetime.date, datetime.time)):
+        return _json_encoder.default(value)
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+def _serialize_fields(obj):
+    """
+    Return a dictionary of the field values of the given object, identical to the "fields" of its representation by
+    Django's JSON serializer, but built directly from the object's attributes. Any prefetched many-to-many objects
+    (e.g. using `prefetch_related()`) are used rather than querying the database.
+    """
+    fields, m2m_fields = get_serialization_plan(type(obj))
+    data = {}
+    for name, field, is_str in fields:
+        value = field.value_from_object(obj)
+        # Primitive types (including dates and Decimals) are passed to the JSON encoder as is; others are stringified
+        if value is None or isinstance(value, (int, float, decimal.Decimal, datetime.date, datetime.time)):
+            data[name] = _serialize_value(value)
+        elif is_str:
+            data[name] = str(value)
+        else:
+            data[name] = _serialize_value(field.value_to_string(obj))
+
+    prefetched_objects = getattr(obj, "_prefetched_objects_cache", {})
+    for field in m2m_fields:
+        if field.name in prefetched_objects:
+            pks = [related.pk for related in prefetched_objects[field.name]]
+        else:
+            pks = getattr(obj, field.name).values_list("pk", flat=True)
+        data[field.name] = [pk if isinstance(pk, int) else str(pk) for pk in pks]
+
+    return data
+
+
 def serialize_object(obj, extra=None, exclude=None):
     """
-    Return a generic JSON representation of an object using Django's built-in serializer. (This is used for things like
-    change logging, not the REST API.) Optionally include a dictionary to supplement the object data. A list of keys
-    can be provided to exclude them from the returned dictionary. Private fields (prefaced with an underscore) are
-    implicitly excluded.
+    Return a generic JSON representation of an object, as would be produced by Django's built-in serializer. (This is
+    used for things like change logging, not the REST API.) Optionally include a dictionary to supplement the object
+    data. A list of keys can be provided to exclude them from the returned dictionary. Private fields (prefaced with an
+    underscore) are implicitly excluded.
+
+    Tags and many-to-many related objects which have been prefetched (for example, for a batch of objects using
+    `prefetch_related()`) are used rather than querying the database for each object.
     """
-    json_str = serialize("json", [obj])
-    data = json.loads(json_str)[0]["fields"]
+    data = _serialize_fields(obj)
 
     # Include custom_field_data as "custom_fields"
     if hasattr(obj, "_custom_field_data"):